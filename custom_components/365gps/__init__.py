@@ -1,13 +1,31 @@
 from __future__ import annotations
 
+from datetime import timedelta
+from pathlib import Path
 from typing import TYPE_CHECKING
 
 from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
-from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
 from .api import _365GPSAPI
-from .const import DOMAIN, PLATFORMS
-from .coordinator import _365GPSDataUpdateCoordinator
+from .config_flow import pop_login
+from .const import (
+    CONF_PLACES_FILE,
+    CONF_PUSH_MODE,
+    DATA_UPDATE_INTERVAL,
+    DOMAIN,
+    PLATFORMS,
+    PushMode,
+)
+from .coordinator import LOGGER, _365GPSDataUpdateCoordinator
+from .fleet_map import FleetMapView, async_setup_fleet_map
+from .geocode import ReverseGeocoder
+from .policy import async_setup_policy
+from .proximity import async_setup_proximity
+from .push import async_setup_push
+from .replay import async_setup_recording
+from .services import async_setup_services
+from .tracks import async_record_tracks, async_setup_tracks
 
 if TYPE_CHECKING:
     from homeassistant.config_entries import ConfigEntry
@@ -16,6 +34,9 @@ if TYPE_CHECKING:
 
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     hass.data.setdefault(DOMAIN, {})
+    hass.http.register_view(FleetMapView())
+    await async_setup_tracks(hass)
+    await async_setup_services(hass)
     return True
 
 
@@ -26,20 +47,58 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     api = _365GPSAPI(
         username=username,
         password=password,
-        session=async_create_clientsession(
-            hass,
-            verify_ssl=False,
-        ),
+        session=async_get_clientsession(hass, verify_ssl=False),
     )
-    coordinator = _365GPSDataUpdateCoordinator(api=api, hass=hass)
+    if (raw_devices := pop_login(hass, username)) is not None:
+        api.prime_ilist(raw_devices)
+    coordinator = _365GPSDataUpdateCoordinator(api=api, hass=hass, config_entry=entry)
+    if places_file := entry.options.get(CONF_PLACES_FILE):
+        try:
+            coordinator.geocoder = await hass.async_add_executor_job(
+                ReverseGeocoder.from_file,
+                Path(places_file),
+            )
+        except OSError as exc:
+            LOGGER.error("Could not load places from %s: %s", places_file, exc)
+        else:
+            LOGGER.info(
+                "Loaded %s places from %s",
+                coordinator.geocoder.index.size,
+                places_file,
+            )
+    await coordinator.overrides.async_load()
+    if (unsubscribe := async_setup_recording(hass, entry, coordinator)) is not None:
+        entry.async_on_unload(unsubscribe)
+    if coordinator.profiler.enabled:
+        entry.async_on_unload(coordinator.profiler.monitor_loop(hass.loop))
     await coordinator.async_config_entry_first_refresh()
 
     hass.data[DOMAIN][entry.entry_id] = coordinator
+    entry.async_on_unload(coordinator.commands.async_cancel_all)
 
+    if (unsubscribe := async_setup_proximity(hass, entry, coordinator)) is not None:
+        entry.async_on_unload(unsubscribe)
+    if (unsubscribe := async_setup_fleet_map(hass, entry, coordinator)) is not None:
+        entry.async_on_unload(unsubscribe)
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+    if (unsubscribe := await async_setup_push(hass, entry, coordinator)) is not None:
+        entry.async_on_unload(unsubscribe)
+    elif entry.options.get(CONF_PUSH_MODE, PushMode.DISABLED) != PushMode.DISABLED:
+        # Push could not be set up, keep the account monitored by polling
+        coordinator.update_interval = timedelta(seconds=DATA_UPDATE_INTERVAL)
+    if (unsubscribe := async_record_tracks(hass, entry, coordinator)) is not None:
+        entry.async_on_unload(unsubscribe)
+    if (unsubscribe := await async_setup_policy(hass, entry, coordinator)) is not None:
+        entry.async_on_unload(unsubscribe)
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
     return True
 
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
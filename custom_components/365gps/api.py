@@ -1,16 +1,35 @@
+import asyncio
+import hashlib
 import json
 import random
-from datetime import UTC, datetime, time
-from typing import Optional, TypedDict
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, time
+from functools import partial
+from time import monotonic
+from time import time as wall_time
+from typing import Awaitable, Callable, NamedTuple, Optional, TypedDict, TypeVar
 
 import aiohttp
+from aiohttp import hdrs
+from aiohttp.compression_utils import HAS_BROTLI
 from homeassistant.exceptions import IntegrationError
+from multidict import CIMultiDictProxy
+
+from .const import AK_RESYNC_INTERVAL
+from .ratelimit import Priority, RateGovernor
+
+T = TypeVar("T")
+
+# ak is the hex count of seconds since this moment with "70" appended
+AK_EPOCH = datetime.fromisoformat("2022-07-16T19:33:20+00:00").timestamp()
 
 
 def decode_content(content: bytes) -> dict | list:
     try:
-        return json.loads(content.decode("utf-8-sig"))
-    except json.decoder.JSONDecodeError as exc:
+        # Bytes go in as they are, json detects UTF-8, 16 and 32 with or without a BOM
+        return json.loads(content)
+    except ValueError as exc:
         raise IntegrationError(content) from exc
 
 
@@ -61,6 +80,11 @@ class Saving:
     def __str__(self):
         return self._value
 
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Saving):
+            return NotImplemented
+        return self._value == other._value
+
     @property
     def remote(self):
         return not bool(int(self._value[3]))
@@ -103,14 +127,39 @@ class Saving:
         self._value = "".join(saving)
 
 
+@dataclass
+class TransferStats:
+    requests: int = 0
+    not_modified: int = 0
+    unchanged: int = 0
+    wire_bytes: int = 0
+    decoded_bytes: int = 0
+    encodings: Counter[str] = field(default_factory=Counter)
+
+    @property
+    def compression_ratio(self) -> Optional[float]:
+        if not self.wire_bytes:
+            return None
+        return self.decoded_bytes / self.wire_bytes
+
+
+class RequestTemplate(NamedTuple):
+    # One URL per mirror and the parameters every request starts from
+    urls: tuple[str, ...]
+    params: dict[str, str]
+
+
 class _365GPSAPI:
     app_api_headers = {
         "User-Agent": "365App",
         "Connection": "Keep-Alive",
-        "Accept-Encoding": "gzip",
+        "Accept-Encoding": "gzip, deflate, br" if HAS_BROTLI else "gzip, deflate",
     }
+    hosts = ("www.365gps.com", "www.365gps.net", "www.topin.hk")
+    scheme = "https"
     ver = "2.0"
     timeout = 5
+    ilist_cache_ttl = 2
 
     def __init__(self, username: str, password: str, session: aiohttp.ClientSession):
         self.username = username
@@ -118,175 +167,279 @@ class _365GPSAPI:
         self.is_demo = False
 
         self._session = session
-
-    @property
-    def _host(self):
-        return random.choice(("www.365gps.com", "www.365gps.net", "www.topin.hk"))
+        self.governor = RateGovernor.for_account(username)
+        self._inflight: dict[tuple, asyncio.Task] = {}
+        self._generation = 0
+        self._ilist_cache: Optional[tuple[float, list[DeviceInfoType]]] = None
+        self._ilist_validators: dict[str, str] = {}
+        self._ilist_digest: Optional[bytes] = None
+        self._ilist: list[DeviceInfoType] = []
+        self._primed_ilist: Optional[list[DeviceInfoType]] = None
+        self.ilist_revision = 0
+        self.transfer_stats = TransferStats()
+        # Called with every response, see replay.TrafficRecorder
+        self.traffic_recorder: Optional[
+            Callable[[str, dict[str, str], int, bytes], None]
+        ] = None
+        self._templates: dict[str, RequestTemplate] = {}
+        self._templates_key: Optional[tuple] = None
+        self._ak_synced = -AK_RESYNC_INTERVAL
+        self._ak_offset = 0.0
+        self._ak_seconds: Optional[int] = None
+        self._ak = ""
 
     @property
     def ak(self) -> str:
-        return f"{int(datetime.now(UTC).timestamp() - datetime.fromisoformat('2022-07-16T19:33:20+00:00').timestamp()):x}70"
-
-    @property
-    def _common_params(self) -> dict[str, str]:
-        return {
-            "ver": self.ver,
-            "app": "wx",
-            "ak": self.ak,
-            "hw": "web",
-        }
-
-    async def get_ilist(self) -> list[DeviceInfoType]:
+        now = monotonic()
+        if now - self._ak_synced >= AK_RESYNC_INTERVAL:
+            # Carried forward on the monotonic clock, re-read now and then so
+            # adjustments of the system clock catch up
+            self._ak_offset = wall_time() - AK_EPOCH - now
+            self._ak_synced = now
+        seconds = int(now + self._ak_offset)
+        if seconds != self._ak_seconds:
+            self._ak_seconds = seconds
+            self._ak = f"{seconds:x}70"
+        return self._ak
+
+    def _template(self, path: str) -> RequestTemplate:
+        # Hosts, scheme and version are class attributes tests and replays
+        # override, a change rebuilds the templates
+        key = (self.scheme, self.hosts, self.ver)
+        if key != self._templates_key:
+            self._templates_key = key
+            self._templates = {}
+        if (template := self._templates.get(path)) is None:
+            template = self._templates[path] = RequestTemplate(
+                urls=tuple(f"{self.scheme}://{host}/{path}" for host in self.hosts),
+                params={"ver": self.ver, "app": "wx", "ak": "", "hw": "web"},
+            )
+        return template
+
+    def _query(self, template: RequestTemplate, params: dict[str, str]) -> dict:
+        query = template.params.copy()
+        query["ak"] = self.ak
+        query.update(params)
+        return query
+
+    async def _fetch(
+        self,
+        path: str,
+        params: dict[str, str],
+        headers: Optional[dict[str, str]] = None,
+        priority: Priority = Priority.READ,
+    ) -> tuple[int, CIMultiDictProxy[str], bytes]:
+        await self.governor.acquire(priority)
+        template = self._template(path)
         coro = self._session.post(
-            f"https://{self._host}/wx_ilist.php",
-            params=dict(**self._common_params, imei=self.username, pw=self.password),
-            headers=self.app_api_headers,
+            random.choice(template.urls),
+            params=self._query(template, params),
+            headers=self.app_api_headers if headers is None else headers,
             timeout=self.timeout,
         )
         async with coro as response:
             response.raise_for_status()
+            content = await response.content.read()
+
+        stats = self.transfer_stats
+        stats.requests += 1
+        stats.decoded_bytes += len(content)
+        # Content-Length is the size on the wire, missing for chunked responses
+        stats.wire_bytes += response.content_length or len(content)
+        stats.encodings[response.headers.get(hdrs.CONTENT_ENCODING, "identity")] += 1
+        if self.traffic_recorder is not None:
+            self.traffic_recorder(path, params, response.status, content)
+        return response.status, response.headers, content
+
+    async def _request(
+        self,
+        path: str,
+        error: str,
+        priority: Priority = Priority.READ,
+        **params: str,
+    ) -> dict | list:
+        _, _, content = await self._fetch(path, params, priority=priority)
+        try:
+            return decode_content(content)
+        except Exception as exc:
+            raise IntegrationError(error) from exc
+
+    async def _command(self, path: str, error: str, **params: str) -> ResultType:
+        try:
+            return await self._request(path, error, Priority.COMMAND, **params)
+        finally:
+            # Whatever the outcome, the device list may have changed
+            self.invalidate_cache()
+
+    async def _single_flight(
+        self,
+        key: tuple,
+        factory: Callable[[], Awaitable[T]],
+    ) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(factory())
+            self._inflight[key] = task
+            task.add_done_callback(partial(self._single_flight_done, key))
+        # Shielded, a cancelled caller must not cancel the read for everyone else
+        return await asyncio.shield(task)
+
+    def _single_flight_done(self, key: tuple, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()
+
+    def invalidate_cache(self) -> None:
+        self._generation += 1
+        self._ilist_cache = None
+        # Later reads must not join a fetch that started before the command
+        self._inflight.pop(("wx_ilist.php",), None)
+        # Forget validators too, so the next poll is a full one and picks up saving
+        self._ilist_validators = {}
+        self._ilist_digest = None
+        self._primed_ilist = None
+
+    def prime_ilist(self, raw_devices: list[DeviceInfoType]) -> None:
+        # A list fetched moments ago by someone else, served once by the next read
+        self._primed_ilist = raw_devices
+
+    async def get_ilist(self) -> list[DeviceInfoType]:
+        if self._primed_ilist is not None:
+            self._ilist, self._primed_ilist = self._primed_ilist, None
+            self._ilist_cache = (monotonic(), self._ilist)
+            self.ilist_revision += 1
+            return self._ilist
+        if (
+            self._ilist_cache is not None
+            and monotonic() - self._ilist_cache[0] < self.ilist_cache_ttl
+        ):
+            return self._ilist_cache[1]
+        return await self._single_flight(("wx_ilist.php",), self._fetch_ilist)
+
+    async def _fetch_ilist(self) -> list[DeviceInfoType]:
+        generation = self._generation
+        status, headers, content = await self._fetch(
+            "wx_ilist.php",
+            {"imei": self.username, "pw": self.password},
+            headers={**self.app_api_headers, **self._ilist_validators},
+        )
+
+        if generation != self._generation:
+            # Invalidated meanwhile, the payload may predate a command, so it
+            # is handed to the waiting callers but never cached
+            if status == 304:
+                return self._ilist
             try:
-                return decode_content(await response.content.read())
+                return decode_content(content)
             except Exception as exc:
                 raise IntegrationError("Error getting ilist") from exc
 
-    async def shutdown(self, imei: str) -> ResultType:
-        coro = self._session.post(
-            f"https://{self._host}/api_req.php",
-            params=dict(**self._common_params, imei=imei, req="49"),
-            headers=self.app_api_headers,
-            timeout=self.timeout,
-        )
-        async with coro as response:
-            response.raise_for_status()
+        if status == 304:
+            self.transfer_stats.not_modified += 1
+        elif (digest := hashlib.blake2b(content, digest_size=16).digest()) == (
+            self._ilist_digest
+        ):
+            self.transfer_stats.unchanged += 1
+        else:
             try:
-                return decode_content(await response.content.read())
+                self._ilist = decode_content(content)
             except Exception as exc:
-                raise IntegrationError("Error shutting down") from exc
+                raise IntegrationError("Error getting ilist") from exc
+            self._ilist_digest = digest
+            self._ilist_validators = {
+                request_header: headers[response_header]
+                for response_header, request_header in (
+                    (hdrs.ETAG, hdrs.IF_NONE_MATCH),
+                    (hdrs.LAST_MODIFIED, hdrs.IF_MODIFIED_SINCE),
+                )
+                if response_header in headers
+            }
+            self.ilist_revision += 1
+
+        self._ilist_cache = (monotonic(), self._ilist)
+        return self._ilist
+
+    async def shutdown(self, imei: str) -> ResultType:
+        return await self._command(
+            "api_req.php", "Error shutting down", imei=imei, req="49"
+        )
 
     async def reboot(self, imei: str) -> ResultType:
-        coro = self._session.post(
-            f"https://{self._host}/api_req.php",
-            params=dict(**self._common_params, imei=imei, req="48"),
-            headers=self.app_api_headers,
-            timeout=self.timeout,
+        return await self._command(
+            "api_req.php", "Error rebooting", imei=imei, req="48"
         )
-        async with coro as response:
-            response.raise_for_status()
-            try:
-                return decode_content(await response.content.read())
-            except Exception as exc:
-                raise IntegrationError("Error rebooting") from exc
 
     async def set_led(self, imei: str, value: bool) -> ResultType:
-        coro = self._session.post(
-            f"https://{self._host}/api_req.php",
-            params=dict(**self._common_params, imei=imei, req=str(44 + int(value))),
-            headers=self.app_api_headers,
-            timeout=self.timeout,
+        return await self._command(
+            "api_req.php",
+            "Error setting LED",
+            imei=imei,
+            req=str(44 + int(value)),
         )
-        async with coro as response:
-            response.raise_for_status()
-            try:
-                return decode_content(await response.content.read())
-            except Exception as exc:
-                raise IntegrationError("Error setting LED") from exc
 
     async def set_speaker(self, imei: str, value: bool) -> ResultType:
-        coro = self._session.post(
-            f"https://{self._host}/api_req.php",
-            params=dict(**self._common_params, imei=imei, req=str(50 + int(value))),
-            headers=self.app_api_headers,
-            timeout=self.timeout,
+        return await self._command(
+            "api_req.php",
+            "Error setting speaker",
+            imei=imei,
+            req=str(50 + int(value)),
         )
-        async with coro as response:
-            response.raise_for_status()
-            try:
-                return decode_content(await response.content.read())
-            except Exception as exc:
-                raise IntegrationError("Error setting speaker") from exc
 
     async def set_find(self, imei: str, value: bool) -> ResultType:
-        coro = self._session.post(
-            f"https://{self._host}/api_find.php",
-            params=dict(**self._common_params, imei=imei, status=str(int(value))),
-            headers=self.app_api_headers,
-            timeout=self.timeout,
+        return await self._command(
+            "api_find.php",
+            "Error setting find",
+            imei=imei,
+            status=str(int(value)),
         )
-        async with coro as response:
-            response.raise_for_status()
-            try:
-                return decode_content(await response.content.read())
-            except Exception as exc:
-                raise IntegrationError("Error setting find") from exc
 
-    async def get_sav(self, imei: str) -> list[SavingType]:
-        coro = self._session.post(
-            f"https://{self._host}/wx_sav.php",
-            params=dict(**self._common_params, imei=imei),
-            headers=self.app_api_headers,
-            timeout=self.timeout,
+    async def get_sav(
+        self,
+        imei: str,
+        priority: Priority = Priority.READ,
+    ) -> list[SavingType]:
+        return await self._single_flight(
+            ("wx_sav.php", imei),
+            partial(
+                self._request,
+                "wx_sav.php",
+                "Error getting sav",
+                priority,
+                imei=imei,
+            ),
         )
-        async with coro as response:
-            response.raise_for_status()
-            try:
-                return decode_content(await response.content.read())
-            except Exception as exc:
-                raise IntegrationError("Error getting sav") from exc
 
     async def set_sav(self, imei: str, saving: str | Saving) -> tuple[str, ResultType]:
-        coro = self._session.post(
-            f"https://{self._host}/api_sav.php",
-            params=dict(**self._common_params, imei=imei, msg=str(saving)),
-            headers=self.app_api_headers,
-            timeout=self.timeout,
+        return saving, await self._command(
+            "api_sav.php",
+            "Error setting sav",
+            imei=imei,
+            msg=str(saving),
         )
-        async with coro as response:
-            response.raise_for_status()
-            try:
-                return saving, decode_content(await response.content.read())
-            except Exception as exc:
-                raise IntegrationError("Error setting sav") from exc
 
     async def set_utime(self, imei: str, value: int) -> ResultType:
-        coro = self._session.post(
-            f"https://{self._host}/api_utime.php",
-            params=dict(**self._common_params, imei=imei, sec=str(value)),
-            headers=self.app_api_headers,
-            timeout=self.timeout,
+        return await self._command(
+            "api_utime.php",
+            "Error setting utime",
+            imei=imei,
+            sec=str(value),
         )
-        async with coro as response:
-            response.raise_for_status()
-            try:
-                return decode_content(await response.content.read())
-            except Exception as exc:
-                raise IntegrationError("Error setting utime") from exc
 
     async def get_notifications(self, since: Optional[datetime] = None) -> list[None]:
         sd = "null" if since is None else since.strftime("%Y-%m-%d %H:%M:%S")
-        coro = self._session.post(
-            f"https://{self._host}/wx_cwt.php",
-            params=dict(**self._common_params, imei=self.username, chat="2", sd=sd),
-            headers=self.app_api_headers,
-            timeout=self.timeout,
+        return await self._request(
+            "wx_cwt.php",
+            "Error getting sav",
+            imei=self.username,
+            chat="2",
+            sd=sd,
         )
-        async with coro as response:
-            response.raise_for_status()
-            try:
-                return decode_content(await response.content.read())
-            except Exception as exc:
-                raise IntegrationError("Error getting sav") from exc
 
     async def clear_notifications(self) -> ResultType:
-        coro = self._session.post(
-            f"https://{self._host}/api_dalert.php",
-            params=dict(**self._common_params, imei=self.username, req="2"),
-            headers=self.app_api_headers,
-            timeout=self.timeout,
+        return await self._command(
+            "api_dalert.php",
+            "Error clearing notifications",
+            imei=self.username,
+            req="2",
         )
-        async with coro as response:
-            response.raise_for_status()
-            try:
-                return decode_content(await response.content.read())
-            except Exception as exc:
-                raise IntegrationError("Error clearing notifications") from exc
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
+from functools import partial
 from typing import TYPE_CHECKING
 
 from homeassistant.components.button import ButtonEntity
 
-from .const import DOMAIN
+from .const import DOMAIN, UPDATE_INTERVAL_MODES
 from .coordinator import LOGGER, _365GPSEntity
 
 if TYPE_CHECKING:
@@ -15,13 +16,6 @@ if TYPE_CHECKING:
     from .coordinator import _365GPSDataUpdateCoordinator
 
 
-update_interval_map = {
-    "precision_mode": 10,
-    "power_saving_mode": 600,
-    "sleep_mode": 65535,
-}
-
-
 async def async_setup_entry(
     hass: HomeAssistant,
     entry: ConfigEntry,
@@ -64,27 +58,34 @@ async def async_setup_entry(
     async_add_entities(entities, update_before_add=True)
 
 
-class UpdateIntervalModeButton(ButtonEntity, _365GPSEntity):
+class UpdateIntervalModeButton(_365GPSEntity, ButtonEntity):
     async def async_press(self):
-        value = update_interval_map[self.entity_description.key]
+        value = UPDATE_INTERVAL_MODES[self.entity_description.key]
         LOGGER.debug(f"[{self._imei}] Setting {self.entity_description.key}")
         LOGGER.debug(f"[{self._imei}] Setting update_interval to {value}")
-        await self.coordinator.api.set_utime(
-            imei=self._imei,
-            value=value,
+        self.coordinator.commands.async_submit(
+            self._imei,
+            "set_utime",
+            partial(self.coordinator.api.set_utime, imei=self._imei, value=value),
+            expect=lambda data: data.update_interval == value,
         )
-        await self.coordinator.async_request_refresh()
 
 
-class ShutdownButton(ButtonEntity, _365GPSEntity):
+class ShutdownButton(_365GPSEntity, ButtonEntity):
     async def async_press(self):
         LOGGER.debug(f"[{self._imei}] Shutting down")
-        await self.coordinator.api.shutdown(self._imei)
-        await self.coordinator.async_request_refresh()
+        self.coordinator.commands.async_submit(
+            self._imei,
+            "shutdown",
+            partial(self.coordinator.api.shutdown, self._imei),
+        )
 
 
-class RebootButton(ButtonEntity, _365GPSEntity):
+class RebootButton(_365GPSEntity, ButtonEntity):
     async def async_press(self):
         LOGGER.debug(f"[{self._imei}] Rebooting")
-        await self.coordinator.api.reboot(self._imei)
-        await self.coordinator.async_request_refresh()
+        self.coordinator.commands.async_submit(
+            self._imei,
+            "reboot",
+            partial(self.coordinator.api.reboot, self._imei),
+        )
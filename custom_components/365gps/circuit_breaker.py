@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+
+@dataclass
+class _CircuitState:
+    failures: int = 0
+    open_until: Optional[float] = None
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        threshold: int,
+        probe_interval: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.threshold = threshold
+        self.probe_interval = probe_interval
+        self._clock = clock
+        self._states: dict[str, _CircuitState] = {}
+
+    def allow(self, key: str) -> bool:
+        state = self._states.get(key)
+        if state is None or state.open_until is None:
+            return True
+        now = self._clock()
+        if now < state.open_until:
+            return False
+
+        # Half-open: let a single probe through and re-arm until it reports back
+        state.open_until = now + self.probe_interval
+        return True
+
+    def record_success(self, key: str) -> None:
+        self._states.pop(key, None)
+
+    def record_failure(self, key: str) -> None:
+        state = self._states.setdefault(key, _CircuitState())
+        state.failures += 1
+        if state.failures >= self.threshold:
+            state.open_until = self._clock() + self.probe_interval
+
+    def is_open(self, key: str) -> bool:
+        state = self._states.get(key)
+        return state is not None and state.open_until is not None
+
+    def failures(self, key: str) -> int:
+        state = self._states.get(key)
+        return 0 if state is None else state.failures
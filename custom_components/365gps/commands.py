@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from itertools import count
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional
+
+from homeassistant.core import callback
+
+from .api import Saving
+from .const import (
+    COMMAND_CONFIRM_TIMEOUT,
+    COMMAND_HISTORY,
+    COMMAND_TIMEOUT,
+    DOMAIN,
+    CommandState,
+)
+
+if TYPE_CHECKING:
+    from .coordinator import DeviceData, _365GPSDataUpdateCoordinator
+
+LOGGER = logging.getLogger(DOMAIN)
+
+EVENT_COMMAND = f"{DOMAIN}_command"
+
+
+@dataclass
+class Command:
+    id: str
+    imei: str
+    action: str
+    # None for commands nothing in the device list reflects, like a reboot
+    expect: Optional[Callable[[DeviceData], bool]] = None
+    value: Any = None
+    state: CommandState = CommandState.PENDING
+    error: Optional[str] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False, compare=False)
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "imei": self.imei,
+            "action": self.action,
+            "state": self.state,
+            "error": self.error,
+        }
+
+
+# Commands run as background tasks, so entities and services return as soon as
+# one is submitted. A command stays pending until a later poll shows the device
+# applied it, and fails if that does not happen within `confirm_timeout`.
+class CommandExecutor:
+    def __init__(
+        self,
+        coordinator: _365GPSDataUpdateCoordinator,
+        timeout: float = COMMAND_TIMEOUT,
+        confirm_timeout: float = COMMAND_CONFIRM_TIMEOUT,
+        history: int = COMMAND_HISTORY,
+    ):
+        self.coordinator = coordinator
+        self.timeout = timeout
+        self.confirm_timeout = confirm_timeout
+        self.history = history
+        self.commands: OrderedDict[str, Command] = OrderedDict()
+        self.latest: dict[str, Command] = {}
+        self._ids = count(1)
+        self._listeners: list[Callable[[Command], None]] = []
+
+    @property
+    def pending(self) -> list[Command]:
+        return [
+            command
+            for command in self.commands.values()
+            if command.state == CommandState.PENDING
+        ]
+
+    @callback
+    def async_add_listener(
+        self,
+        listener: Callable[[Command], None],
+    ) -> Callable[[], None]:
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    @callback
+    def async_submit(
+        self,
+        imei: str,
+        action: str,
+        call: Callable[[], Awaitable],
+        expect: Optional[Callable[[DeviceData], bool]] = None,
+        value: Any = None,
+    ) -> Command:
+        # A newer command for the same setting replaces one still in flight
+        for command in self.pending:
+            if command.imei == imei and command.action == action:
+                self._finish(command, CommandState.CANCELLED, "superseded")
+
+        command = Command(f"{imei}-{next(self._ids)}", imei, action, expect, value)
+        self.commands[command.id] = command
+        while len(self.commands) > self.history:
+            self.commands.popitem(last=False)
+        command.task = self.coordinator.hass.async_create_background_task(
+            self._run(command, call),
+            f"{DOMAIN} {action} {imei}",
+        )
+        self._notify(command)
+        return command
+
+    def next_saving(self, imei: str) -> Saving:
+        # Starts from a saving still being written, so quick changes to different
+        # fields build on each other instead of undoing each other
+        for command in reversed(self.pending):
+            if command.imei == imei and command.action == "set_sav":
+                return Saving(str(command.value))
+        return Saving(str(self.coordinator.data[imei].saving))
+
+    @callback
+    def async_cancel(self, command_id: str) -> bool:
+        command = self.commands.get(command_id)
+        if command is None or command.state != CommandState.PENDING:
+            return False
+        self._finish(command, CommandState.CANCELLED, "cancelled")
+        return True
+
+    @callback
+    def async_cancel_all(self) -> None:
+        for command in self.pending:
+            self._finish(command, CommandState.CANCELLED, "unloaded")
+
+    async def _run(self, command: Command, call: Callable[[], Awaitable]) -> None:
+        try:
+            async with asyncio.timeout(self.timeout):
+                await call()
+        except TimeoutError:
+            self._finish(command, CommandState.FAILED, "timed out")
+            return
+        except Exception as exc:
+            self._finish(command, CommandState.FAILED, str(exc) or repr(exc))
+            return
+
+        if command.expect is None:
+            self._finish(command, CommandState.CONFIRMED)
+            return
+
+        confirmed = asyncio.get_running_loop().create_future()
+
+        @callback
+        def check() -> None:
+            data = (self.coordinator.data or {}).get(command.imei)
+            if data is not None and command.expect(data) and not confirmed.done():
+                confirmed.set_result(None)
+
+        unsubscribe = self.coordinator.async_add_listener(check)
+        try:
+            # Shielded, cancelling the command must not cancel the poll
+            await asyncio.shield(self.coordinator.async_request_refresh())
+            check()
+            async with asyncio.timeout(self.confirm_timeout):
+                await confirmed
+        except TimeoutError:
+            self._finish(command, CommandState.FAILED, "not confirmed by the device")
+            return
+        finally:
+            unsubscribe()
+        self._finish(command, CommandState.CONFIRMED)
+
+    @callback
+    def _finish(
+        self,
+        command: Command,
+        state: CommandState,
+        error: Optional[str] = None,
+    ) -> None:
+        command.state, command.error = state, error
+        task = command.task
+        if task is not None and not task.done() and task is not asyncio.current_task():
+            task.cancel()
+        LOGGER.debug("[%s] %s %s: %s", command.imei, command.action, state, error)
+        self.coordinator.hass.bus.async_fire(EVENT_COMMAND, command.as_dict())
+        self._notify(command)
+
+    @callback
+    def _notify(self, command: Command) -> None:
+        if (latest := self.latest.get(command.imei)) is not None and (
+            latest is not command and command.state != CommandState.PENDING
+        ):
+            # An older command finishing does not replace a newer one
+            return
+        self.latest[command.imei] = command
+        for listener in self._listeners:
+            listener(command)
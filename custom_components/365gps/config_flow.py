@@ -1,20 +1,78 @@
 import logging
+from time import monotonic
+from typing import Optional
 
+import aiohttp
 import voluptuous as vol
 from homeassistant import config_entries
+from homeassistant.components import webhook
 from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import IntegrationError
 from homeassistant.helpers import config_validation as cv
-from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
-from .api import _365GPSAPI
-from .const import DOMAIN
+from .api import _365GPSAPI, DeviceInfoType
+from .const import (
+    CONF_DATUM,
+    CONF_MQTT_TOPIC,
+    CONF_PLACES_FILE,
+    CONF_POLICY,
+    CONF_PROFILING,
+    CONF_PROXIMITY,
+    CONF_PUSH_MODE,
+    CONF_RECORD_TRAFFIC,
+    CONF_TRACKS,
+    CONF_WEBHOOK_ID,
+    DEFAULT_MQTT_TOPIC,
+    DOMAIN,
+    LOGIN_CACHE_TTL,
+    Datum,
+    PushMode,
+)
 
 LOGGER = logging.getLogger(DOMAIN)
 
+DATA_LOGINS = f"{DOMAIN}_logins"
+
+
+async def async_check_login(
+    api: _365GPSAPI,
+) -> tuple[Optional[str], list[DeviceInfoType]]:
+    # The device list is the only read that takes the password
+    try:
+        raw_devices = await api.get_ilist()
+    except aiohttp.ClientResponseError as exc:
+        if exc.status in (401, 403):
+            return "invalid_auth", []
+        return "cannot_connect", []
+    except (aiohttp.ClientError, TimeoutError):
+        return "cannot_connect", []
+    except IntegrationError:
+        return "invalid_response", []
+    if not isinstance(raw_devices, list):
+        # Refused logins come back as an object instead of a device list
+        return "invalid_auth", []
+    return None, raw_devices
+
+
+def pop_login(hass: HomeAssistant, username: str) -> Optional[list[DeviceInfoType]]:
+    checked = hass.data.get(DATA_LOGINS, {}).pop(username, None)
+    if checked is None or monotonic() - checked[0] > LOGIN_CACHE_TTL:
+        return None
+    return checked[1]
+
 
 class GPSConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> config_entries.OptionsFlow:
+        return GPSOptionsFlow()
+
     async def async_step_user(self, user_input: dict = None) -> dict:
         if user_input is not None:
             errors = await self.try_login(user_input)
@@ -39,24 +97,81 @@ class GPSConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             errors=errors,
         )
 
-    async def try_login(self, user_input: dict):
-        errors = {}
+    async def try_login(self, user_input: dict) -> dict[str, str]:
         username = user_input[CONF_USERNAME]
-        password = user_input[CONF_PASSWORD]
-
+        api = _365GPSAPI(
+            username=username,
+            password=user_input[CONF_PASSWORD],
+            session=async_get_clientsession(self.hass, verify_ssl=False),
+        )
         try:
-            api = _365GPSAPI(
-                username=username,
-                password=password,
-                session=async_create_clientsession(
-                    self.hass,
-                    verify_ssl=False,
-                ),
-            )
-            await api.get_ilist()
+            error, raw_devices = await async_check_login(api)
+        except Exception:
+            LOGGER.exception("Unexpected error checking the login")
+            return {"base": "unknown"}
+        if error is not None:
+            LOGGER.warning("Login check failed: %s", error)
+            return {"base": error}
 
-        except Exception as e:
-            errors["base"] = str(e)
-            LOGGER.error(e)
+        # Picked up by the first refresh of the entry about to be created
+        self.hass.data.setdefault(DATA_LOGINS, {})[username] = (
+            monotonic(),
+            raw_devices,
+        )
+        return {}
+
+
+class GPSOptionsFlow(config_entries.OptionsFlow):
+    async def async_step_init(self, user_input: dict = None) -> dict:
+        options = self.config_entry.options
+        if user_input is not None:
+            return self.async_create_entry(
+                data={
+                    **options,
+                    **user_input,
+                    CONF_WEBHOOK_ID: options.get(CONF_WEBHOOK_ID)
+                    or webhook.async_generate_id(),
+                },
+            )
 
-        return errors
+        data_schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_PUSH_MODE,
+                    default=options.get(CONF_PUSH_MODE, PushMode.DISABLED),
+                ): vol.In([mode.value for mode in PushMode]),
+                vol.Optional(
+                    CONF_MQTT_TOPIC,
+                    default=options.get(CONF_MQTT_TOPIC, DEFAULT_MQTT_TOPIC),
+                ): cv.string,
+                vol.Optional(
+                    CONF_POLICY,
+                    default=options.get(CONF_POLICY, False),
+                ): cv.boolean,
+                vol.Optional(
+                    CONF_TRACKS,
+                    default=options.get(CONF_TRACKS, False),
+                ): cv.boolean,
+                vol.Optional(
+                    CONF_PROXIMITY,
+                    default=options.get(CONF_PROXIMITY, False),
+                ): cv.boolean,
+                vol.Required(
+                    CONF_DATUM,
+                    default=options.get(CONF_DATUM, Datum.GCJ02),
+                ): vol.In([datum.value for datum in Datum]),
+                vol.Optional(
+                    CONF_PLACES_FILE,
+                    default=options.get(CONF_PLACES_FILE, ""),
+                ): cv.string,
+                vol.Optional(
+                    CONF_PROFILING,
+                    default=options.get(CONF_PROFILING, False),
+                ): cv.boolean,
+                vol.Optional(
+                    CONF_RECORD_TRAFFIC,
+                    default=options.get(CONF_RECORD_TRAFFIC, False),
+                ): cv.boolean,
+            },
+        )
+        return self.async_show_form(step_id="init", data_schema=data_schema)
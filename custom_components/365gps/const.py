@@ -1,8 +1,92 @@
+from datetime import time
 from enum import StrEnum
 
 DOMAIN = "365gps"
 PLATFORMS = ["device_tracker", "sensor", "number", "button", "switch", "time"]
 DATA_UPDATE_INTERVAL = 10
+CIRCUIT_BREAKER_THRESHOLD = 3
+CIRCUIT_BREAKER_PROBE_INTERVAL = 300
+PUSH_RECONCILE_INTERVAL = 300
+SAVING_REFRESH_INTERVAL = 300
+BULK_COMMAND_CONCURRENCY = 5
+AK_RESYNC_INTERVAL = 600
+# The device list fetched to check a login serves the first refresh within this
+LOGIN_CACHE_TTL = 60
+# Below this many devices to parse, the hop to the executor costs more than parsing
+OFFLOAD_MIN_DEVICES = 200
+LOOP_LAG_INTERVAL = 0.05
+# Seconds to get a command through, then for a poll to show the device applied it
+COMMAND_TIMEOUT = 30
+COMMAND_CONFIRM_TIMEOUT = 300
+COMMAND_HISTORY = 100
+
+# A 10 s poll of a few dozen trackers is 1 wx_ilist plus 1 wx_sav each, a full
+# bucket absorbs one such poll and 2/s sustains about 20 devices per poll.
+# Bigger fleets fall back to deferring saving refreshes rather than throttling.
+READ_BUCKET_CAPACITY = 60
+READ_BUCKET_RATE = 2
+READ_BUCKET_RESERVE = 10
+COMMAND_BUCKET_CAPACITY = 10
+COMMAND_BUCKET_RATE = 0.5
+GOVERNOR_NOTIFY_INTERVAL = 1
+
+TELEMETRY_WINDOW = 3600
+TELEMETRY_RESOLUTION = 60
+BATTERY_DRAIN_WINDOW = 6 * 3600
+BATTERY_DRAIN_MIN_SPAN = 600
+ODOMETER_MIN_DISTANCE = 0.02
+# 4 columns of 8 bytes, stored twice, is 8 KiB per tracker
+HISTORY_CAPACITY = 128
+
+TRACK_FLUSH_INTERVAL = 60
+TRACK_IMPORT_CHUNK = 10000
+TRACK_TOLERANCE = 10
+TRACK_MAX_GAP = 600
+TRACK_MAX_BUFFER = 120
+TRAFFIC_FLUSH_INTERVAL = 60
+
+# Cells of 0.25 degrees, and answers cached per geohash cell of about 1.2 x 0.6 km
+GEOCODE_CELL = 0.25
+GEOCODE_MAX_DISTANCE = 50
+GEOCODE_PRECISION = 6
+GEOCODE_CACHE_SIZE = 4096
+
+# Meters, pairs join within the first and separate beyond the second
+PROXIMITY_DISTANCE = 200
+SEPARATION_DISTANCE = 300
+
+# Pixels on a 256 px tile, trackers closer than this at the requested zoom are
+# served as one cluster. Past the max zoom every tracker stands on its own.
+CLUSTER_RADIUS = 40
+CLUSTER_MAX_ZOOM = 16
+
+EXPIRY_WARNING_DAYS = 30
+
+# Reporting policy, see policy.choose_target
+POLICY_BATTERY_LOW = 20
+POLICY_BATTERY_RECOVERED = 30
+POLICY_IDLE_INTERVAL = 60
+POLICY_QUIET_HOURS = (time(23), time(6))
+POLICY_MIN_DWELL = 600
+POLICY_MAX_WRITES = 5
+
+UPDATE_INTERVAL_MODES = {
+    "precision_mode": 10,
+    "power_saving_mode": 600,
+    "sleep_mode": 65535,
+}
+
+CONF_PUSH_MODE = "push_mode"
+CONF_MQTT_TOPIC = "mqtt_topic"
+CONF_WEBHOOK_ID = "webhook_id"
+CONF_PROFILING = "profiling"
+CONF_POLICY = "policy"
+CONF_TRACKS = "tracks"
+CONF_PLACES_FILE = "places_file"
+CONF_DATUM = "datum"
+CONF_PROXIMITY = "proximity"
+CONF_RECORD_TRAFFIC = "record_traffic"
+DEFAULT_MQTT_TOPIC = "365gps/devices"
 
 IS_DEMO_KEY = "Is demo?"
 
@@ -10,3 +94,22 @@ IS_DEMO_KEY = "Is demo?"
 class LocationSource(StrEnum):
     GPS = "gps"
     LBS = "lbs"
+
+
+class PushMode(StrEnum):
+    DISABLED = "disabled"
+    WEBHOOK = "webhook"
+    MQTT = "mqtt"
+
+
+class CommandState(StrEnum):
+    PENDING = "pending"
+    CONFIRMED = "confirmed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class Datum(StrEnum):
+    WGS84 = "wgs84"
+    GCJ02 = "gcj02"
+    BD09 = "bd09"
@@ -1,37 +1,78 @@
 from __future__ import annotations
 
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta
-from typing import TYPE_CHECKING, Optional, Type
+from time import monotonic, perf_counter
+from typing import TYPE_CHECKING, Callable, NamedTuple, Optional, Type
 
 from homeassistant.components.button import ButtonEntityDescription
 from homeassistant.components.device_tracker import TrackerEntityDescription
 from homeassistant.components.number import NumberEntityDescription, NumberMode
-from homeassistant.components.sensor import SensorDeviceClass, SensorEntityDescription
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntityDescription,
+    SensorStateClass,
+)
 from homeassistant.components.switch import SwitchEntityDescription
 from homeassistant.components.time import TimeEntityDescription
 from homeassistant.const import (
     DEGREE,
     PERCENTAGE,
+    EntityCategory,
     UnitOfLength,
     UnitOfSpeed,
     UnitOfTime,
 )
+from homeassistant.core import callback
+from homeassistant.helpers.device_registry import DeviceEntryType
 from homeassistant.helpers.entity import DeviceInfo, EntityDescription
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
-
-from .api import _365GPSAPI, Saving
-from .const import DATA_UPDATE_INTERVAL, DOMAIN, LocationSource
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .api import _365GPSAPI, DeviceInfoType, Saving
+from .circuit_breaker import CircuitBreaker
+from .commands import CommandExecutor
+from .const import (
+    CIRCUIT_BREAKER_PROBE_INTERVAL,
+    CIRCUIT_BREAKER_THRESHOLD,
+    CONF_DATUM,
+    CONF_PROFILING,
+    CONF_PUSH_MODE,
+    DATA_UPDATE_INTERVAL,
+    DOMAIN,
+    OFFLOAD_MIN_DEVICES,
+    PUSH_RECONCILE_INTERVAL,
+    SAVING_REFRESH_INTERVAL,
+    CommandState,
+    Datum,
+    LocationSource,
+    PushMode,
+)
+from .datum import convert
+from .expiry import ExpiryIndex
+from .geocode import ReverseGeocoder
+from .history import FixHistory
+from .overrides import DeviceOverrides
+from .profiling import PollProfiler
+from .proximity import ProximityTracker
+from .ratelimit import Priority
+from .telemetry import DeviceTelemetry
 
 if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
     from homeassistant.core import HomeAssistant
 
+    from .fleet_map import FleetIndex
 
 LOGGER = logging.getLogger(DOMAIN)
 
+EVENT_EXPIRY = f"{DOMAIN}_expiry"
+
 
-@dataclass
+# Snapshots are never changed after parsing, a poll or push swaps in new ones
+@dataclass(frozen=True, slots=True)
 class DeviceData:
     name: str
     imei: str
@@ -69,6 +110,118 @@ class DeviceData:
         )
 
 
+def parse_device_info(
+    raw_device: DeviceInfoType,
+    saving: Saving,
+    sw_version: str,
+    ignore_lbs: bool = False,
+) -> DeviceData:
+    imei = raw_device["imei"]
+    name = raw_device["name"]
+    device = raw_device["device"]
+    version = raw_device["ver"].split(";")[0]
+
+    gps_parts = raw_device["gps"].split(",")
+    update_time = gps_parts[0]
+    direction = int(gps_parts[4]) or None
+    lat_google = float(gps_parts[5])
+    lng_google = float(gps_parts[6])
+    altitude = int(gps_parts[7]) or None
+
+    update_time = datetime.strptime(
+        update_time + "+00:00",
+        "%Y-%m-%d %H:%M:%S%z",
+    )
+    speed = (
+        int(raw_device["speed"])
+        if raw_device["speed"] is not None
+        else raw_device["speed"]
+    )
+    status = "Offline" if raw_device["log"].startswith("OUT") else "Static"
+    status = "Moving" if speed else status
+
+    source_type = (
+        LocationSource.LBS
+        if direction is None and altitude is None
+        else LocationSource.GPS
+    )
+
+    battery_level = int(raw_device["bat"])
+    cellular_signal = int(raw_device["level"])
+
+    update_interval = int(raw_device["sec"])
+    _onoff = int(raw_device["onoff"], base=16)
+    led = bool((_onoff >> 0) & 1)
+    speaker = bool((_onoff >> 1) & 1)
+
+    return DeviceData(
+        name=name,
+        imei=imei,
+        device=device,
+        sw_version=sw_version,
+        hw_version=version,
+        latitude=lat_google,
+        longitude=lng_google,
+        update_time=update_time,
+        speed=speed,
+        altitude=altitude,
+        direction=direction,
+        status=status,
+        location_source=source_type,
+        ignore_lbs=ignore_lbs,
+        battery_level=battery_level,
+        cellular_signal=cellular_signal,
+        update_interval=update_interval,
+        led=led,
+        speaker=speaker,
+        saving=saving,
+    )
+
+
+class ParseResult(NamedTuple):
+    parsed: dict[str, DeviceData]
+    failed: dict[str, Exception]
+    seconds: dict[str, float]
+
+
+def parse_devices(
+    pending: dict[str, tuple[DeviceInfoType, Saving]],
+    sw_version: str,
+    ignore_lbs: frozenset[str],
+    datum: Datum,
+    timed: bool = False,
+) -> ParseResult:
+    # Touches nothing but its arguments, so it can run off the event loop
+    parsed, failed, seconds = {}, {}, {}
+    for imei, (raw_device, saving) in pending.items():
+        started = perf_counter() if timed else 0.0
+        try:
+            parsed[imei] = parse_device_info(
+                raw_device,
+                saving=saving,
+                sw_version=sw_version,
+                ignore_lbs=imei in ignore_lbs,
+            )
+        except Exception as exc:
+            failed[imei] = exc
+        if timed:
+            seconds[imei] = perf_counter() - started
+
+    # One batch per poll. Positions outside China are the same in every datum
+    # and come back unchanged.
+    if datum != Datum.WGS84 and parsed:
+        positions = convert(
+            ((data.latitude, data.longitude) for data in parsed.values()),
+            datum,
+            Datum.WGS84,
+        )
+        parsed = {
+            imei: replace(data, latitude=latitude, longitude=longitude)
+            for (imei, data), (latitude, longitude) in zip(parsed.items(), positions)
+        }
+    return ParseResult(parsed, failed, seconds)
+
+
 class _365GPSDataUpdateCoordinator(DataUpdateCoordinator):
     sensor_descriptions = (
         SensorEntityDescription(
@@ -80,12 +233,14 @@ class _365GPSDataUpdateCoordinator(DataUpdateCoordinator):
             key="speed",
             name="Speed",
             device_class=SensorDeviceClass.SPEED,
+            state_class=SensorStateClass.MEASUREMENT,
             native_unit_of_measurement=UnitOfSpeed.KILOMETERS_PER_HOUR,
         ),
         SensorEntityDescription(
             key="altitude",
             name="Altitude",
             device_class=SensorDeviceClass.DISTANCE,
+            state_class=SensorStateClass.MEASUREMENT,
             native_unit_of_measurement=UnitOfLength.METERS,
         ),
         SensorEntityDescription(
@@ -109,15 +264,105 @@ class _365GPSDataUpdateCoordinator(DataUpdateCoordinator):
             key="battery_level",
             name="Battery Level",
             device_class=SensorDeviceClass.BATTERY,
+            state_class=SensorStateClass.MEASUREMENT,
             native_unit_of_measurement=PERCENTAGE,
         ),
         SensorEntityDescription(
             key="cellular_signal",
             name="Cellular Signal",
+            state_class=SensorStateClass.MEASUREMENT,
             icon="mdi:signal",
         ),
     )
 
+    telemetry_descriptions = (
+        SensorEntityDescription(
+            key="odometer",
+            name="Odometer",
+            device_class=SensorDeviceClass.DISTANCE,
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            native_unit_of_measurement=UnitOfLength.KILOMETERS,
+            suggested_display_precision=2,
+            icon="mdi:counter",
+        ),
+        SensorEntityDescription(
+            key="daily_distance",
+            name="Daily Distance",
+            device_class=SensorDeviceClass.DISTANCE,
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            native_unit_of_measurement=UnitOfLength.KILOMETERS,
+            suggested_display_precision=2,
+        ),
+        SensorEntityDescription(
+            key="average_speed",
+            name="Average Speed",
+            device_class=SensorDeviceClass.SPEED,
+            state_class=SensorStateClass.MEASUREMENT,
+            native_unit_of_measurement=UnitOfSpeed.KILOMETERS_PER_HOUR,
+            suggested_display_precision=1,
+        ),
+        SensorEntityDescription(
+            key="max_speed",
+            name="Max Speed",
+            device_class=SensorDeviceClass.SPEED,
+            state_class=SensorStateClass.MEASUREMENT,
+            native_unit_of_measurement=UnitOfSpeed.KILOMETERS_PER_HOUR,
+        ),
+        SensorEntityDescription(
+            key="battery_drain",
+            name="Battery Drain",
+            state_class=SensorStateClass.MEASUREMENT,
+            native_unit_of_measurement=f"{PERCENTAGE}/h",
+            suggested_display_precision=2,
+            icon="mdi:battery-arrow-down",
+        ),
+        SensorEntityDescription(
+            key="last_gps_fix",
+            name="Last GPS Fix",
+            device_class=SensorDeviceClass.TIMESTAMP,
+            icon="mdi:crosshairs-gps",
+        ),
+    )
+
+    address_description = SensorEntityDescription(
+        key="address",
+        name="Address",
+        icon="mdi:map-marker",
+    )
+
+    expiry_descriptions = (
+        SensorEntityDescription(
+            key="expires",
+            name="Expiry Date",
+            device_class=SensorDeviceClass.DATE,
+            entity_category=EntityCategory.DIAGNOSTIC,
+            icon="mdi:calendar-alert",
+        ),
+        SensorEntityDescription(
+            key="platform_expires",
+            name="Platform Expiry Date",
+            device_class=SensorDeviceClass.DATE,
+            entity_category=EntityCategory.DIAGNOSTIC,
+            icon="mdi:calendar-alert",
+        ),
+    )
+
+    last_command_description = SensorEntityDescription(
+        key="last_command",
+        name="Last Command",
+        device_class=SensorDeviceClass.ENUM,
+        options=list(CommandState),
+        entity_category=EntityCategory.DIAGNOSTIC,
+        icon="mdi:console",
+    )
+
+    convoy_description = SensorEntityDescription(
+        key="convoy_size",
+        name="Convoy Size",
+        icon="mdi:car-multiple",
+        state_class=SensorStateClass.MEASUREMENT,
+    )
+
     led_descriptions = SwitchEntityDescription(
         key="led",
         name="LED",
@@ -192,6 +437,30 @@ class _365GPSDataUpdateCoordinator(DataUpdateCoordinator):
         icon="mdi:autorenew",
     )
 
+    governor_descriptions = (
+        SensorEntityDescription(
+            key="read_budget",
+            name="Read Budget",
+            icon="mdi:bucket-outline",
+            state_class=SensorStateClass.MEASUREMENT,
+            entity_category=EntityCategory.DIAGNOSTIC,
+        ),
+        SensorEntityDescription(
+            key="command_budget",
+            name="Command Budget",
+            icon="mdi:bucket-outline",
+            state_class=SensorStateClass.MEASUREMENT,
+            entity_category=EntityCategory.DIAGNOSTIC,
+        ),
+        SensorEntityDescription(
+            key="peak_queue_depth",
+            name="Request Queue Depth",
+            icon="mdi:tray-full",
+            state_class=SensorStateClass.MEASUREMENT,
+            entity_category=EntityCategory.DIAGNOSTIC,
+        ),
+    )
+
     device_tracker_description = TrackerEntityDescription(
         key="device_tracker",
         name="Device Tracker",
@@ -201,89 +470,319 @@ class _365GPSDataUpdateCoordinator(DataUpdateCoordinator):
         self,
         api: _365GPSAPI,
         hass: HomeAssistant,
+        config_entry: Optional[ConfigEntry] = None,
     ):
+        options = config_entry.options if config_entry is not None else {}
+        push_mode = options.get(CONF_PUSH_MODE, PushMode.DISABLED)
         super().__init__(
             hass,
             LOGGER,
+            config_entry=config_entry,
             name=f"{DOMAIN}_{api.username}",
-            update_interval=timedelta(seconds=DATA_UPDATE_INTERVAL),
+            update_interval=timedelta(
+                seconds=PUSH_RECONCILE_INTERVAL
+                if push_mode != PushMode.DISABLED
+                else DATA_UPDATE_INTERVAL,
+            ),
             update_method=self.get_device_data,
+            always_update=False,
         )
         self.api = api
+        self._ilist_revision: Optional[int] = None
+        self._raw_devices: dict[str, DeviceInfoType] = {}
+        self._sav_updated: dict[str, float] = {}
+        self.breaker = CircuitBreaker(
+            threshold=CIRCUIT_BREAKER_THRESHOLD,
+            probe_interval=CIRCUIT_BREAKER_PROBE_INTERVAL,
+        )
+        self.unavailable: set[str] = set()
+        self.profiler = PollProfiler(enabled=options.get(CONF_PROFILING, False))
+        self.telemetry: dict[str, DeviceTelemetry] = {}
+        self.history: dict[str, FixHistory] = {}
+        self.offload_threshold = OFFLOAD_MIN_DEVICES
+        self.geocoder: Optional[ReverseGeocoder] = None
+        self.proximity: Optional[ProximityTracker] = None
+        self.fleet_index: Optional[FleetIndex] = None
+        self.expiry = ExpiryIndex()
+        self.commands = CommandExecutor(self)
+        self.overrides = DeviceOverrides(
+            Store(hass, 1, f"{DOMAIN}.overrides_{config_entry.entry_id}")
+            if config_entry is not None
+            else None,
+        )
+        self.datum = Datum(options.get(CONF_DATUM, Datum.GCJ02))
+        self._fix_listeners: list[Callable[[list[DeviceData]], None]] = []
 
     async def get_device_data(self) -> dict[str, DeviceData]:
-        raw_devices = await self.api.get_ilist()
+        self.profiler.begin_poll()
+        try:
+            return await self._fetch_device_data()
+        finally:
+            self.profiler.end_poll()
+
+    async def _fetch_device_data(self) -> dict[str, DeviceData]:
+        with self.profiler.stage("http"):
+            raw_devices = await self.api.get_ilist()
+        if not isinstance(raw_devices, list):
+            raise UpdateFailed(f"Unexpected device list: {raw_devices!r}")
+        revision = self.api.ilist_revision
+        unchanged = self.data is not None and revision == self._ilist_revision
+        if unchanged:
+            self.profiler.counters["unchanged_polls"] += 1
+
+        previous = self.data or {}
         devices = {}
+        unavailable = set()
+        failed = {}
+
+        pending = {}
+        malformed = 0
+
+        # Oldest saving first, so deferral under a low budget rotates through the fleet
+        for raw_device in sorted(raw_devices, key=self._sav_age):
+            imei = raw_device.get("imei") if isinstance(raw_device, dict) else None
+            if not imei:
+                malformed += 1
+                LOGGER.warning("Skipping device record without IMEI: %r", raw_device)
+                continue
+
+            self._raw_devices[imei] = raw_device
+            self.expiry.update(imei, raw_device)
+            if not self.breaker.allow(imei):
+                unavailable.add(imei)
+                if imei in previous:
+                    devices[imei] = previous[imei]
+                continue
+
+            # Same payload and a good snapshot, only the saving can have moved on
+            reuse = unchanged and imei in previous and imei not in self.unavailable
+            try:
+                if (
+                    reuse
+                    and monotonic() - self._sav_age(raw_device)
+                    < SAVING_REFRESH_INTERVAL
+                ):
+                    saving = previous[imei].saving
+                elif imei in previous and self.api.governor.should_defer(
+                    Priority.BACKGROUND,
+                ):
+                    # Budget is low, keep the last saving and leave room for commands
+                    saving = previous[imei].saving
+                    self.profiler.counters["deferred_sav"] += 1
+                else:
+                    with self.profiler.stage("http"):
+                        sav = await self.api.get_sav(imei, self._sav_priority(imei))
+                    saving = Saving(sav[0]["saving"])
+                    self._sav_updated[imei] = monotonic()
+                if reuse:
+                    devices[imei] = (
+                        previous[imei]
+                        if saving == previous[imei].saving
+                        else replace(previous[imei], saving=saving)
+                    )
+                    continue
+                pending[imei] = (raw_device, saving)
+            except Exception as exc:
+                failed[imei] = exc
+                unavailable.add(imei)
+                if imei in previous:
+                    devices[imei] = previous[imei]
+
+        with self.profiler.stage("parse"):
+            result = await self._async_parse_devices(pending)
+        for imei, exc in result.failed.items():
+            failed[imei] = exc
+            unavailable.add(imei)
+            if imei in previous:
+                devices[imei] = previous[imei]
+        for imei, data in result.parsed.items():
+            LOGGER.debug("[%s] %s", imei, data)
+        devices.update(result.parsed)
+
+        if (failed or malformed) and len(failed) + malformed == len(raw_devices):
+            # Nothing parsed at all, this is an account-wide failure, not a device one.
+            # Devices failing only on the first refresh get entities after a reload.
+            exc = next(iter(failed.values()), None)
+            raise UpdateFailed(f"Failed to update all devices: {exc!r}") from exc
+
+        for imei in devices.keys() - failed.keys() - unavailable:
+            self.breaker.record_success(imei)
+        for imei, exc in failed.items():
+            self.breaker.record_failure(imei)
+            LOGGER.warning(
+                "[%s] Update failed (%s in a row): %r",
+                imei,
+                self.breaker.failures(imei),
+                exc,
+            )
 
-        for raw_device in raw_devices:
-            imei = raw_device["imei"]
-            name = raw_device["name"]
-            device = raw_device["device"]
-            version = raw_device["ver"].split(";")[0]
-
-            gps_parts = raw_device["gps"].split(",")
-            update_time = gps_parts[0]
-            direction = int(gps_parts[4]) or None
-            lat_google = float(gps_parts[5])
-            lng_google = float(gps_parts[6])
-            altitude = int(gps_parts[7]) or None
-
-            update_time = datetime.strptime(
-                update_time + "+00:00",
-                "%Y-%m-%d %H:%M:%S%z",
+        self._record_fixes(devices)
+        self._check_expiry()
+        availability_changed = unavailable != self.unavailable
+        self.unavailable = unavailable
+        self._ilist_revision = revision
+        if availability_changed and devices == self.data:
+            # always_update=False would drop this refresh, entities still need to
+            # pick up the new availability
+            self.async_update_listeners()
+        return devices
+
+    def _parse_args(self, pending: dict[str, tuple[DeviceInfoType, Saving]]) -> tuple:
+        return (
+            pending,
+            self.api.ver,
+            frozenset(self.overrides.ignore_lbs),
+            self.datum,
+            self.profiler.enabled,
+        )
+
+    async def _async_parse_devices(
+        self,
+        pending: dict[str, tuple[DeviceInfoType, Saving]],
+    ) -> ParseResult:
+        if len(pending) >= self.offload_threshold:
+            # Snapshots are frozen and the inputs are not touched until the
+            # result is back, so the batch can safely run in a worker thread
+            result = await self.hass.async_add_executor_job(
+                parse_devices,
+                *self._parse_args(pending),
             )
-            speed = (
-                int(raw_device["speed"])
-                if raw_device["speed"] is not None
-                else raw_device["speed"]
+            self.profiler.counters["offloaded_parses"] += 1
+        else:
+            result = parse_devices(*self._parse_args(pending))
+        self.profiler.device_parse.update(result.seconds)
+        return result
+
+    def _check_expiry(self) -> None:
+        today = dt_util.now().date()
+        for imei, stage, subscription in self.expiry.check(today):
+            expires = subscription.next_expiry
+            LOGGER.info("[%s] Subscription expires on %s", imei, expires)
+            self.hass.bus.async_fire(
+                EVENT_EXPIRY,
+                {
+                    "type": "expired" if stage == 2 else "warning",
+                    "imei": imei,
+                    "expires": expires.isoformat(),
+                    "days_left": (expires - today).days,
+                },
             )
-            status = "Offline" if raw_device["log"].startswith("OUT") else "Static"
-            status = "Moving" if speed else status
 
-            source_type = (
-                LocationSource.LBS
-                if direction is None and altitude is None
-                else LocationSource.GPS
-            )
+    def device_telemetry(self, imei: str) -> DeviceTelemetry:
+        if (telemetry := self.telemetry.get(imei)) is None:
+            telemetry = self.telemetry[imei] = DeviceTelemetry()
+        return telemetry
 
-            battery_level = int(raw_device["bat"])
-            cellular_signal = int(raw_device["level"])
-
-            update_interval = int(raw_device["sec"])
-            _onoff = int(raw_device["onoff"], base=16)
-            led = bool((_onoff >> 0) & 1)
-            speaker = bool((_onoff >> 1) & 1)
-
-            saving = await self.api.get_sav(imei)
-
-            devices[imei] = DeviceData(
-                name=name,
-                imei=imei,
-                device=device,
-                sw_version=self.api.ver,
-                hw_version=version,
-                latitude=lat_google,
-                longitude=lng_google,
-                update_time=update_time,
-                speed=speed,
-                altitude=altitude,
-                direction=direction,
-                status=status,
-                location_source=source_type,
-                ignore_lbs=False,
-                battery_level=battery_level,
-                cellular_signal=cellular_signal,
-                update_interval=update_interval,
-                led=led,
-                speaker=speaker,
-                saving=Saving(saving[0]["saving"]),
+    def fix_history(self, imei: str) -> FixHistory:
+        if (history := self.history.get(imei)) is None:
+            history = self.history[imei] = FixHistory()
+        return history
+
+    @callback
+    def async_add_fix_listener(
+        self,
+        listener: Callable[[list[DeviceData]], None],
+    ) -> Callable[[], None]:
+        self._fix_listeners.append(listener)
+        return lambda: self._fix_listeners.remove(listener)
+
+    def _record_fixes(self, devices: dict[str, DeviceData]) -> None:
+        # Snapshots reused from the last poll carry the same fix and are skipped
+        fixes = [
+            data
+            for imei, data in devices.items()
+            if self.device_telemetry(imei).update(
+                data,
+                dt_util.as_local(data.update_time).date(),
             )
-            LOGGER.debug(devices[imei])
+        ]
+        for data in fixes:
+            self.fix_history(data.imei).add(data)
+        if fixes:
+            for listener in self._fix_listeners:
+                listener(fixes)
+
+    def _sav_age(self, raw_device: DeviceInfoType) -> float:
+        if not isinstance(raw_device, dict):
+            return 0.0
+        return self._sav_updated.get(raw_device.get("imei"), 0.0)
+
+    def _sav_priority(self, imei: str) -> Priority:
+        if self.data is None:
+            return Priority.STARTUP
+        return Priority.BACKGROUND if imei in self.data else Priority.READ
+
+    @callback
+    def async_update_listeners(self) -> None:
+        with self.profiler.stage("state_write"):
+            super().async_update_listeners()
+        self.profiler.record_fan_out(self.listener_count)
+
+    @callback
+    def async_push_devices(self, raw_devices: list[dict]) -> int:
+        if self.data is None:
+            return 0
+
+        devices = dict(self.data)
+        pending = {}
+        for pushed in raw_devices:
+            imei = pushed["imei"]
+            if imei not in devices or imei not in self._raw_devices:
+                LOGGER.debug("[%s] Ignoring push for unknown device", imei)
+                continue
+
+            # Relays may send only the changed fields, fill the rest from the last poll
+            raw_device = pending.get(imei, (self._raw_devices[imei],))[0]
+            pending[imei] = ({**raw_device, **pushed}, devices[imei].saving)
+
+        # Pushes carry a handful of devices, they are parsed right here
+        result = parse_devices(*self._parse_args(pending))
+        for imei, exc in result.failed.items():
+            LOGGER.warning("[%s] Ignoring malformed push: %r", imei, exc)
+        for imei in result.parsed:
+            self._raw_devices[imei] = pending[imei][0]
+            self.unavailable.discard(imei)
+
+        if parsed := result.parsed:
+            devices.update(parsed)
+            # Not async_set_updated_data, pushes must not postpone the
+            # reconciliation poll
+            self._record_fixes(devices)
+            self.data = devices
+            self.async_update_listeners()
+        return len(parsed)
+
+    @callback
+    def async_set_ignore_lbs(self, imei: str, value: bool) -> None:
+        self.overrides.set_ignore_lbs(imei, value)
+        if self.data is not None and imei in self.data:
+            self.data = {**self.data, imei: replace(self.data[imei], ignore_lbs=value)}
+            self.async_update_listeners()
 
-        return devices
+    @property
+    def listener_count(self) -> int:
+        # async_contexts skips listeners added without a context, like ours
+        return len(self._listeners)
+
+    @property
+    def account_device_info(self) -> DeviceInfo:
+        return DeviceInfo(
+            name=self.config_entry.title if self.config_entry else self.name,
+            identifiers={(DOMAIN, f"account_{self.api.username}")},
+            entry_type=DeviceEntryType.SERVICE,
+        )
+
+    def is_device_available(self, imei: str) -> bool:
+        return (
+            self.last_update_success
+            and imei in (self.data or {})
+            and imei not in self.unavailable
+        )
 
 
 class _365GPSEntity:
+    _attr_should_poll = False
+
     def __init__(
         self,
         coordinator: _365GPSDataUpdateCoordinator,
@@ -299,8 +798,41 @@ class _365GPSEntity:
         self._attr_name = (
             self.coordinator.data[self._imei].name + " " + entity_description.name
         )
+        self._attr_available = self.coordinator.is_device_available(self._imei)
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_add_listener(self._handle_coordinator_update),
+        )
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        self._attr_available = self.coordinator.is_device_available(self._imei)
+        self.async_write_ha_state()
+
+
+class _365GPSAccountEntity:
+    _attr_should_poll = False
+
+    def __init__(
+        self,
+        coordinator: _365GPSDataUpdateCoordinator,
+        entity_description: Type[EntityDescription],
+    ):
+        self.coordinator = coordinator
+        self.entity_description = entity_description
+
+        self._attr_device_info = self.coordinator.account_device_info
+        self._attr_unique_id = (
+            f"account_{self.coordinator.api.username}_{self.entity_description.key}"
+        )
+        self._attr_name = (
+            self.coordinator.account_device_info["name"] + " " + entity_description.name
+        )
 
     async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
         self.async_on_remove(
             self.coordinator.async_add_listener(self.async_write_ha_state),
         )
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from math import atan2, cos, pi, sin, sqrt
+from typing import Iterable, Sequence
+
+from .const import Datum
+
+# Krasovsky 1940, the ellipsoid GCJ-02 is defined on
+SEMI_MAJOR_AXIS = 6378245.0
+ECCENTRICITY_SQUARED = 0.00669342162296594323
+BD09_FACTOR = pi * 3000.0 / 180.0
+INVERSE_TOLERANCE = 1e-9
+
+
+def out_of_china(latitude: float, longitude: float) -> bool:
+    # GCJ-02 is only applied inside this box, everywhere else it equals WGS-84
+    return not (73.66 < longitude < 135.05 and 3.86 < latitude < 53.55)
+
+
+def _offset(latitude: float, longitude: float) -> tuple[float, float]:
+    x, y = longitude - 105.0, latitude - 35.0
+    common = (20.0 * sin(6.0 * x * pi) + 20.0 * sin(2.0 * x * pi)) * 2.0 / 3.0
+    d_lat = (
+        -100.0
+        + 2.0 * x
+        + 3.0 * y
+        + 0.2 * y * y
+        + 0.1 * x * y
+        + 0.2 * sqrt(abs(x))
+        + common
+        + (20.0 * sin(y * pi) + 40.0 * sin(y / 3.0 * pi)) * 2.0 / 3.0
+        + (160.0 * sin(y / 12.0 * pi) + 320.0 * sin(y * pi / 30.0)) * 2.0 / 3.0
+    )
+    d_lng = (
+        300.0
+        + x
+        + 2.0 * y
+        + 0.1 * x * x
+        + 0.1 * x * y
+        + 0.1 * sqrt(abs(x))
+        + common
+        + (20.0 * sin(x * pi) + 40.0 * sin(x / 3.0 * pi)) * 2.0 / 3.0
+        + (150.0 * sin(x / 12.0 * pi) + 300.0 * sin(x / 30.0 * pi)) * 2.0 / 3.0
+    )
+
+    rad_lat = latitude / 180.0 * pi
+    magic = 1 - ECCENTRICITY_SQUARED * sin(rad_lat) ** 2
+    d_lat = (d_lat * 180.0) / (
+        (SEMI_MAJOR_AXIS * (1 - ECCENTRICITY_SQUARED)) / (magic * sqrt(magic)) * pi
+    )
+    d_lng = (d_lng * 180.0) / (SEMI_MAJOR_AXIS / sqrt(magic) * cos(rad_lat) * pi)
+    return d_lat, d_lng
+
+
+def wgs84_to_gcj02(latitude: float, longitude: float) -> tuple[float, float]:
+    if out_of_china(latitude, longitude):
+        return latitude, longitude
+    d_lat, d_lng = _offset(latitude, longitude)
+    return latitude + d_lat, longitude + d_lng
+
+
+def gcj02_to_wgs84(latitude: float, longitude: float) -> tuple[float, float]:
+    if out_of_china(latitude, longitude):
+        return latitude, longitude
+    # The offset has no closed form inverse, a few fixed point steps reach
+    # well below a millimeter
+    wgs_lat, wgs_lng = latitude, longitude
+    for _ in range(10):
+        gcj_lat, gcj_lng = wgs84_to_gcj02(wgs_lat, wgs_lng)
+        d_lat, d_lng = gcj_lat - latitude, gcj_lng - longitude
+        wgs_lat, wgs_lng = wgs_lat - d_lat, wgs_lng - d_lng
+        if abs(d_lat) < INVERSE_TOLERANCE and abs(d_lng) < INVERSE_TOLERANCE:
+            break
+    return wgs_lat, wgs_lng
+
+
+def gcj02_to_bd09(latitude: float, longitude: float) -> tuple[float, float]:
+    z = sqrt(longitude**2 + latitude**2) + 0.00002 * sin(latitude * BD09_FACTOR)
+    theta = atan2(latitude, longitude) + 0.000003 * cos(longitude * BD09_FACTOR)
+    return z * sin(theta) + 0.006, z * cos(theta) + 0.0065
+
+
+def bd09_to_gcj02(latitude: float, longitude: float) -> tuple[float, float]:
+    x, y = longitude - 0.0065, latitude - 0.006
+    z = sqrt(x * x + y * y) - 0.00002 * sin(y * BD09_FACTOR)
+    theta = atan2(y, x) - 0.000003 * cos(x * BD09_FACTOR)
+    return z * sin(theta), z * cos(theta)
+
+
+# Every datum goes through GCJ-02, the only one the others are defined against
+TO_GCJ02 = {
+    Datum.WGS84: wgs84_to_gcj02,
+    Datum.GCJ02: None,
+    Datum.BD09: bd09_to_gcj02,
+}
+FROM_GCJ02 = {
+    Datum.WGS84: gcj02_to_wgs84,
+    Datum.GCJ02: None,
+    Datum.BD09: gcj02_to_bd09,
+}
+
+
+def convert(
+    points: Iterable[Sequence[float]],
+    source: Datum,
+    target: Datum,
+) -> list[tuple[float, float]]:
+    if source == target:
+        return [(latitude, longitude) for latitude, longitude in points]
+
+    steps = [step for step in (TO_GCJ02[source], FROM_GCJ02[target]) if step]
+    result = []
+    for latitude, longitude in points:
+        for step in steps:
+            latitude, longitude = step(latitude, longitude)
+        result.append((latitude, longitude))
+    return result
@@ -27,7 +27,7 @@ async def async_setup_entry(
     )
 
 
-class GPSDeviceTracker(TrackerEntity, _365GPSEntity):
+class GPSDeviceTracker(_365GPSEntity, TrackerEntity):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._attr_name = self.coordinator.data[self._imei].name
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import TYPE_CHECKING
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+
+from .const import CONF_MQTT_TOPIC, CONF_WEBHOOK_ID, DOMAIN
+
+if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.core import HomeAssistant
+
+    from .coordinator import _365GPSDataUpdateCoordinator
+
+
+TO_REDACT = {CONF_USERNAME, CONF_PASSWORD, CONF_WEBHOOK_ID, CONF_MQTT_TOPIC}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+) -> dict:
+    coordinator: _365GPSDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
+    devices = coordinator.data or {}
+    profiler = coordinator.profiler
+
+    # Positions in the device list, names and IMEIs identify the tracker's owner
+    positions = {imei: index for index, imei in enumerate(devices)}
+    slowest = sorted(
+        profiler.device_parse.items(),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:10]
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": async_redact_data(dict(entry.options), TO_REDACT),
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": coordinator.update_interval.total_seconds(),
+            "ilist_revision": coordinator.api.ilist_revision,
+            "devices": len(devices),
+            "unavailable": len(coordinator.unavailable),
+            "open_circuits": sum(coordinator.breaker.is_open(imei) for imei in devices),
+            "listeners": coordinator.listener_count,
+            "pending_commands": len(coordinator.commands.pending),
+        },
+        "history": {
+            "devices": len(coordinator.history),
+            "bytes": sum(history.nbytes for history in coordinator.history.values()),
+        },
+        "transfer": {
+            **asdict(coordinator.api.transfer_stats),
+            "compression_ratio": coordinator.api.transfer_stats.compression_ratio,
+        },
+        "profiling": {
+            **profiler.as_dict(),
+            "slowest_devices": [
+                {"device": positions[imei], "parse_seconds": seconds}
+                for imei, seconds in slowest
+                if imei in positions
+            ],
+        },
+    }
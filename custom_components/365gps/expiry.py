@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Iterator, Optional
+
+from .const import EXPIRY_WARNING_DAYS
+
+DATE_FORMATS = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y/%m/%d")
+SUBSCRIPTION_FIELDS = ("expdate", "gexpdate", "startdate", "iccid")
+
+
+def parse_date(value: Optional[str]) -> Optional[date]:
+    if not value:
+        return None
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+@dataclass(frozen=True)
+class Subscription:
+    expires: Optional[date]
+    platform_expires: Optional[date]
+    started: Optional[date]
+    iccid: Optional[str]
+
+    @property
+    def next_expiry(self) -> Optional[date]:
+        return min(filter(None, (self.expires, self.platform_expires)), default=None)
+
+
+# Subscriptions sorted by their next expiry. A check walks the list from the
+# front and stops at the first one outside the warning window, so a poll only
+# touches trackers that are expired or about to be.
+class ExpiryIndex:
+    def __init__(self, warning_days: int = EXPIRY_WARNING_DAYS):
+        self.warning = timedelta(days=warning_days)
+        self.subscriptions: dict[str, Subscription] = {}
+        self._fields: dict[str, tuple] = {}
+        self._index: list[tuple[date, str]] = []
+        # Last stage reported per tracker and expiry, 1 warning and 2 expired
+        self._reported: dict[str, tuple[date, int]] = {}
+
+    def update(self, imei: str, raw_device: dict) -> bool:
+        fields = tuple(raw_device.get(field) for field in SUBSCRIPTION_FIELDS)
+        if self._fields.get(imei) == fields:
+            return False
+        self._fields[imei] = fields
+
+        if (previous := self.subscriptions.get(imei)) is not None and (
+            previous.next_expiry is not None
+        ):
+            del self._index[bisect_left(self._index, (previous.next_expiry, imei))]
+
+        expires, platform_expires, started, iccid = fields
+        subscription = self.subscriptions[imei] = Subscription(
+            expires=parse_date(expires),
+            platform_expires=parse_date(platform_expires),
+            started=parse_date(started),
+            iccid=iccid or None,
+        )
+        if subscription.next_expiry is not None:
+            insort(self._index, (subscription.next_expiry, imei))
+        return True
+
+    def check(self, today: date) -> Iterator[tuple[str, int, Subscription]]:
+        horizon = today + self.warning
+        for expires, imei in self._index:
+            if expires > horizon:
+                break
+            stage = 2 if expires < today else 1
+            reported = self._reported.get(imei)
+            # A renewal moves the expiry and starts over
+            if reported is not None and reported[0] == expires and reported[1] >= stage:
+                continue
+            self._reported[imei] = (expires, stage)
+            yield imei, stage, self.subscriptions[imei]
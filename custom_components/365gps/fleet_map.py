@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import json
+import struct
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from http import HTTPStatus
+from math import cos, floor, log, pi, radians, tan
+from typing import TYPE_CHECKING, Callable, Iterable, NamedTuple, Optional
+
+from aiohttp import web
+from homeassistant.components.http import KEY_HASS, HomeAssistantView
+from homeassistant.core import callback
+
+from .const import CLUSTER_MAX_ZOOM, CLUSTER_RADIUS, DOMAIN
+
+if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.core import HomeAssistant
+
+    from .coordinator import DeviceData, _365GPSDataUpdateCoordinator
+
+MAX_LATITUDE = 85.05112878
+TILE_SIZE = 256
+# imei, 0 for a cluster, longitude, latitude and the number of trackers
+BINARY_RECORD = struct.Struct("<QffI")
+
+
+def project(latitude: float, longitude: float) -> tuple[float, float]:
+    # Web Mercator onto the unit square every zoom level divides into tiles
+    latitude = radians(max(-MAX_LATITUDE, min(MAX_LATITUDE, latitude)))
+    x = (longitude + 180.0) / 360.0
+    y = (1.0 - log(tan(latitude) + 1.0 / cos(latitude)) / pi) / 2.0
+    return x, y
+
+
+class MapPoint(NamedTuple):
+    x: float
+    y: float
+    latitude: float
+    longitude: float
+    imei: str
+    # Serialized once per poll, a request only joins them
+    feature: str
+
+
+def map_point(data: DeviceData, available: bool) -> MapPoint:
+    feature = {
+        "type": "Feature",
+        "id": data.imei,
+        "geometry": {"type": "Point", "coordinates": [data.longitude, data.latitude]},
+        "properties": {
+            "name": data.name,
+            "status": data.status,
+            "source": data.location_source,
+            "battery": data.battery_level,
+            "speed": data.speed,
+            "updated": data.update_time.isoformat(),
+            "available": available,
+        },
+    }
+    return MapPoint(
+        *project(data.latitude, data.longitude),
+        data.latitude,
+        data.longitude,
+        data.imei,
+        json.dumps(feature, separators=(",", ":")),
+    )
+
+
+def parse_bbox(value: Optional[str]) -> Optional[tuple[float, float, float, float]]:
+    if not value:
+        return None
+    try:
+        west, south, east, north = (float(part) for part in value.split(","))
+    except ValueError as exc:
+        raise ValueError("bbox must be west,south,east,north") from exc
+    if south > north:
+        raise ValueError("bbox south is above north")
+    return west, south, east, north
+
+
+# Trackers sorted by their projected x, rebuilt once per poll. A bbox is one
+# or two bisected x ranges, two when it crosses the antimeridian.
+class FleetIndex:
+    def __init__(self):
+        self.points: list[MapPoint] = []
+        self._xs: list[float] = []
+
+    def update(self, points: Iterable[MapPoint]) -> None:
+        self.points = sorted(points, key=lambda point: point.x)
+        self._xs = [point.x for point in self.points]
+
+    def query(
+        self,
+        bbox: Optional[tuple[float, float, float, float]] = None,
+    ) -> list[MapPoint]:
+        if bbox is None:
+            return self.points
+        west, south, east, north = bbox
+        x_west, top = project(north, west)
+        x_east, bottom = project(south, east)
+        ranges = [(x_west, x_east)] if west <= east else [(x_west, 1.0), (0.0, x_east)]
+        return [
+            point
+            for low, high in ranges
+            for point in self.points[
+                bisect_left(self._xs, low) : bisect_right(self._xs, high)
+            ]
+            if top <= point.y <= bottom
+        ]
+
+
+def cluster(points: list[MapPoint], zoom: Optional[int]) -> list[list[MapPoint]]:
+    if zoom is None or zoom > CLUSTER_MAX_ZOOM:
+        return [[point] for point in points]
+    # Grid cells CLUSTER_RADIUS pixels wide at this zoom
+    scale = TILE_SIZE * 2**zoom / CLUSTER_RADIUS
+    cells: defaultdict[tuple[int, int], list[MapPoint]] = defaultdict(list)
+    for point in points:
+        cells[floor(point.x * scale), floor(point.y * scale)].append(point)
+    return list(cells.values())
+
+
+def centroid(group: list[MapPoint]) -> tuple[float, float]:
+    return (
+        sum(point.latitude for point in group) / len(group),
+        sum(point.longitude for point in group) / len(group),
+    )
+
+
+def to_geojson(groups: list[list[MapPoint]]) -> bytes:
+    features = []
+    for group in groups:
+        if len(group) == 1:
+            features.append(group[0].feature)
+            continue
+        latitude, longitude = centroid(group)
+        features.append(
+            json.dumps(
+                {
+                    "type": "Feature",
+                    "geometry": {"type": "Point", "coordinates": [longitude, latitude]},
+                    "properties": {"cluster": True, "point_count": len(group)},
+                },
+                separators=(",", ":"),
+            ),
+        )
+    return f'{{"type":"FeatureCollection","features":[{",".join(features)}]}}'.encode()
+
+
+def to_binary(groups: list[list[MapPoint]]) -> bytes:
+    payload = bytearray(BINARY_RECORD.size * len(groups))
+    for index, group in enumerate(groups):
+        if len(group) == 1:
+            point = group[0]
+            imei = int(point.imei) if point.imei.isdigit() else 0
+            latitude, longitude = point.latitude, point.longitude
+        else:
+            imei, (latitude, longitude) = 0, centroid(group)
+        BINARY_RECORD.pack_into(
+            payload,
+            index * BINARY_RECORD.size,
+            imei,
+            longitude,
+            latitude,
+            len(group),
+        )
+    return bytes(payload)
+
+
+class FleetMapView(HomeAssistantView):
+    url = f"/api/{DOMAIN}/{{entry_id}}/fleet"
+    name = f"api:{DOMAIN}:fleet"
+
+    async def get(self, request: web.Request, entry_id: str) -> web.Response:
+        coordinator = request.app[KEY_HASS].data.get(DOMAIN, {}).get(entry_id)
+        if coordinator is None or coordinator.fleet_index is None:
+            return self.json_message("Unknown entry", HTTPStatus.NOT_FOUND)
+        try:
+            bbox = parse_bbox(request.query.get("bbox"))
+            zoom = int(request.query["zoom"]) if "zoom" in request.query else None
+        except ValueError as exc:
+            return self.json_message(str(exc), HTTPStatus.BAD_REQUEST)
+
+        index = coordinator.fleet_index
+        groups = cluster(index.query(bbox), zoom)
+        if request.query.get("format") == "binary":
+            return web.Response(
+                body=to_binary(groups),
+                content_type="application/octet-stream",
+            )
+        return web.Response(
+            body=to_geojson(groups), content_type="application/geo+json"
+        )
+
+
+@callback
+def async_setup_fleet_map(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: _365GPSDataUpdateCoordinator,
+) -> Optional[Callable[[], None]]:
+    index = coordinator.fleet_index = FleetIndex()
+
+    @callback
+    def update() -> None:
+        index.update(
+            map_point(data, coordinator.is_device_available(imei))
+            for imei, data in coordinator.data.items()
+        )
+
+    update()
+    return coordinator.async_add_listener(update)
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import csv
+from collections import OrderedDict, defaultdict
+from math import ceil, cos, floor, radians
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .const import (
+    GEOCODE_CACHE_SIZE,
+    GEOCODE_CELL,
+    GEOCODE_MAX_DISTANCE,
+    GEOCODE_PRECISION,
+)
+from .telemetry import haversine
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+KM_PER_DEGREE = 111.195
+
+
+def geohash(latitude: float, longitude: float, precision: int) -> str:
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    result, bits, value, even = [], 0, 0, True
+    while len(result) < precision:
+        span, coordinate = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (span[0] + span[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            span[0] = middle
+        else:
+            span[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            result.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return "".join(result)
+
+
+def read_places(path: Path) -> Iterable[tuple[str, float, float]]:
+    # GeoNames dumps (cities500.txt and friends) or a CSV of name,latitude,longitude
+    with open(path, encoding="utf-8", newline="") as file:
+        for line in file:
+            if "\t" in line:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) < 9:
+                    continue
+                name = f"{fields[1]}, {fields[8]}" if fields[8] else fields[1]
+                latitude, longitude = fields[4], fields[5]
+            else:
+                fields = next(csv.reader([line]))
+                if len(fields) < 3:
+                    continue
+                name, latitude, longitude = fields[:3]
+            try:
+                yield name, float(latitude), float(longitude)
+            except ValueError:
+                # CSV header
+                continue
+
+
+# Places bucketed in a grid of `cell` degrees. A lookup searches rings of cells
+# around the point and stops once no unsearched cell can hold anything closer.
+class PlaceIndex:
+    def __init__(self, places: Iterable[tuple[str, float, float]], cell=GEOCODE_CELL):
+        self.cell = cell
+        self._grid: defaultdict[tuple[int, int], list[tuple[float, float, str]]] = (
+            defaultdict(list)
+        )
+        self.size = 0
+        for name, latitude, longitude in places:
+            self._grid[self._key(latitude, longitude)].append(
+                (latitude, longitude, name),
+            )
+            self.size += 1
+
+    def _key(self, latitude: float, longitude: float) -> tuple[int, int]:
+        return floor(latitude / self.cell), floor(longitude / self.cell)
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        max_distance: float = GEOCODE_MAX_DISTANCE,
+    ) -> Optional[tuple[str, float]]:
+        row, column = self._key(latitude, longitude)
+        # The narrowest a cell gets within max_distance of the point
+        cell_km = (
+            self.cell
+            * KM_PER_DEGREE
+            * max(
+                cos(radians(min(89.0, abs(latitude) + max_distance / KM_PER_DEGREE))),
+                0.01,
+            )
+        )
+        best: Optional[tuple[str, float]] = None
+
+        for ring in range(ceil(max_distance / cell_km) + 1):
+            if best is not None and best[1] <= (ring - 1) * cell_km:
+                break
+            for i in range(row - ring, row + ring + 1):
+                for j in range(column - ring, column + ring + 1):
+                    if max(abs(i - row), abs(j - column)) != ring:
+                        continue
+                    for place_lat, place_lng, name in self._grid.get((i, j), ()):
+                        distance = haversine(latitude, longitude, place_lat, place_lng)
+                        if distance <= max_distance and (
+                            best is None or distance < best[1]
+                        ):
+                            best = (name, distance)
+        return best
+
+
+class ReverseGeocoder:
+    def __init__(
+        self,
+        index: PlaceIndex,
+        precision: int = GEOCODE_PRECISION,
+        cache_size: int = GEOCODE_CACHE_SIZE,
+    ):
+        self.index = index
+        self.precision = precision
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[str, Optional[str]] = OrderedDict()
+
+    @classmethod
+    def from_file(cls, path: Path) -> ReverseGeocoder:
+        return cls(PlaceIndex(read_places(path)))
+
+    def lookup(self, latitude: float, longitude: float) -> Optional[str]:
+        cell = geohash(latitude, longitude, self.precision)
+        if cell in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(cell)
+            return self._cache[cell]
+
+        self.misses += 1
+        nearest = self.index.nearest(latitude, longitude)
+        name = nearest[0] if nearest is not None else None
+        self._cache[cell] = name
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return name
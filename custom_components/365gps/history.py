@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from array import array
+from math import isnan, nan
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
+from .const import HISTORY_CAPACITY
+
+if TYPE_CHECKING:
+    from .coordinator import DeviceData
+
+# (typecode, fill) per column
+COLUMNS = {
+    "time": ("q", 0),
+    "latitude": ("d", 0.0),
+    "longitude": ("d", 0.0),
+    # nan where the tracker reported no speed
+    "speed": ("d", nan),
+}
+
+
+class FixWindow(NamedTuple):
+    time: memoryview
+    latitude: memoryview
+    longitude: memoryview
+    speed: memoryview
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+
+# The last `capacity` fixes of one tracker, oldest first. Every column is
+# allocated once at twice the capacity and each fix is written to both halves,
+# so any window of the newest fixes is one contiguous slice and is handed out
+# as a memoryview without copying.
+class FixHistory:
+    def __init__(self, capacity: int = HISTORY_CAPACITY):
+        self.capacity = capacity
+        self._columns = {
+            name: array(typecode, [fill]) * (2 * capacity)
+            for name, (typecode, fill) in COLUMNS.items()
+        }
+        self._written = 0
+
+    def __len__(self) -> int:
+        return min(self._written, self.capacity)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.itemsize * len(column) for column in self._columns.values())
+
+    def append(
+        self,
+        timestamp: int,
+        latitude: float,
+        longitude: float,
+        speed: Optional[float],
+    ) -> None:
+        index = self._written % self.capacity
+        for name, value in (
+            ("time", timestamp),
+            ("latitude", latitude),
+            ("longitude", longitude),
+            ("speed", nan if speed is None else speed),
+        ):
+            column = self._columns[name]
+            column[index] = column[index + self.capacity] = value
+        self._written += 1
+
+    def add(self, data: DeviceData) -> None:
+        self.append(
+            int(data.update_time.timestamp()),
+            data.latitude,
+            data.longitude,
+            data.speed,
+        )
+
+    def window(self, size: Optional[int] = None) -> FixWindow:
+        size = len(self) if size is None else max(0, min(size, len(self)))
+        end = self._written % self.capacity + self.capacity
+        # Views pin the arrays, which is fine as they are never resized
+        return FixWindow(
+            *(
+                memoryview(self._columns[name])[end - size : end]
+                for name in FixWindow._fields
+            ),
+        )
+
+    def positions(self, size: Optional[int] = None) -> list[tuple[float, float]]:
+        window = self.window(size)
+        return list(zip(window.latitude, window.longitude))
+
+    def speeds(self, size: Optional[int] = None) -> list[Optional[float]]:
+        return [None if isnan(speed) else speed for speed in self.window(size).speed]
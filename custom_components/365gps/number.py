@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from functools import partial
 from typing import TYPE_CHECKING
 
 from homeassistant.components.number import NumberEntity
@@ -34,7 +35,7 @@ async def async_setup_entry(
     )
 
 
-class UpdateIntervalNumber(NumberEntity, _365GPSEntity):
+class UpdateIntervalNumber(_365GPSEntity, NumberEntity):
     @property
     def native_value(self) -> float:
         return self.coordinator.data[self._imei].update_interval
@@ -43,8 +44,10 @@ class UpdateIntervalNumber(NumberEntity, _365GPSEntity):
         LOGGER.debug(
             f"[{self._imei}] Setting {self.entity_description.key} to {int(value)}",
         )
-        await self.coordinator.api.set_utime(
-            imei=self._imei,
-            value=int(value),
+        interval = int(value)
+        self.coordinator.commands.async_submit(
+            self._imei,
+            "set_utime",
+            partial(self.coordinator.api.set_utime, imei=self._imei, value=interval),
+            expect=lambda data: data.update_interval == interval,
         )
-        await self.coordinator.async_request_refresh()
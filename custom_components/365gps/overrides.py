@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from homeassistant.helpers.storage import Store
+
+
+# Settings made on the Home Assistant side, kept apart from the snapshots so a
+# poll never drops them. Applied whenever a snapshot is parsed.
+class DeviceOverrides:
+    def __init__(self, store: Optional[Store] = None):
+        self.store = store
+        self.ignore_lbs: set[str] = set()
+
+    async def async_load(self) -> None:
+        if self.store is None:
+            return
+        if (stored := await self.store.async_load()) is not None:
+            self.ignore_lbs = set(stored.get("ignore_lbs", []))
+
+    def set_ignore_lbs(self, imei: str, value: bool) -> None:
+        if value:
+            self.ignore_lbs.add(imei)
+        else:
+            self.ignore_lbs.discard(imei)
+        if self.store is not None:
+            self.store.async_delay_save(
+                lambda: {"ignore_lbs": sorted(self.ignore_lbs)},
+                1,
+            )
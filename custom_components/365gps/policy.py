@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from datetime import time
+from time import monotonic
+from typing import TYPE_CHECKING, Callable, Optional
+
+from homeassistant.components.zone import async_active_zone
+from homeassistant.core import callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .api import Saving
+from .const import (
+    BULK_COMMAND_CONCURRENCY,
+    CONF_POLICY,
+    DOMAIN,
+    POLICY_BATTERY_LOW,
+    POLICY_BATTERY_RECOVERED,
+    POLICY_IDLE_INTERVAL,
+    POLICY_MAX_WRITES,
+    POLICY_MIN_DWELL,
+    POLICY_QUIET_HOURS,
+    UPDATE_INTERVAL_MODES,
+    LocationSource,
+)
+from .coordinator import LOGGER
+from .ratelimit import Priority
+
+if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.core import HomeAssistant
+
+    from .coordinator import DeviceData, _365GPSDataUpdateCoordinator
+
+
+@dataclass(frozen=True)
+class PolicyTarget:
+    update_interval: int
+    # None leaves the tracker's own power saving setting alone
+    power_saving: Optional[bool] = None
+
+
+def in_quiet_hours(now: time) -> bool:
+    start, end = POLICY_QUIET_HOURS
+    if start <= end:
+        return start <= now < end
+    return now >= start or now < end
+
+
+def choose_target(
+    data: DeviceData,
+    in_zone: bool,
+    now: time,
+    forced_saving: bool,
+) -> PolicyTarget:
+    # Hysteresis, power saving switched on at a low battery stays on until it recovers
+    threshold = POLICY_BATTERY_RECOVERED if forced_saving else POLICY_BATTERY_LOW
+    if data.battery_level <= threshold:
+        return PolicyTarget(UPDATE_INTERVAL_MODES["power_saving_mode"], True)
+
+    power_saving = False if forced_saving else None
+    if data.status == "Moving":
+        return PolicyTarget(UPDATE_INTERVAL_MODES["precision_mode"], power_saving)
+    if in_zone or in_quiet_hours(now):
+        return PolicyTarget(UPDATE_INTERVAL_MODES["power_saving_mode"], power_saving)
+    return PolicyTarget(POLICY_IDLE_INTERVAL, power_saving)
+
+
+@dataclass(frozen=True)
+class PolicyWrite:
+    imei: str
+    update_interval: Optional[int]
+    power_saving: Optional[bool]
+
+
+class PolicyEngine:
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        coordinator: _365GPSDataUpdateCoordinator,
+        store: Store,
+    ):
+        self.hass = hass
+        self.coordinator = coordinator
+        self.store = store
+        self.forced_saving: set[str] = set()
+        self._written: dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def async_load(self) -> None:
+        if (stored := await self.store.async_load()) is not None:
+            self.forced_saving = set(stored.get("forced_saving", []))
+
+    def plan(self, now: time, clock: float) -> list[PolicyWrite]:
+        writes = []
+        for imei, data in (self.coordinator.data or {}).items():
+            if not self.coordinator.is_device_available(imei):
+                continue
+            if data.status == "Offline":
+                # Commands are only delivered once the tracker is back online
+                continue
+            if clock - self._written.get(imei, float("-inf")) < POLICY_MIN_DWELL:
+                continue
+
+            radius = 10 if data.location_source == LocationSource.GPS else 100
+            zone = async_active_zone(self.hass, data.latitude, data.longitude, radius)
+            target = choose_target(
+                data,
+                zone is not None,
+                now,
+                imei in self.forced_saving,
+            )
+
+            update_interval = (
+                target.update_interval
+                if target.update_interval != data.update_interval
+                else None
+            )
+            power_saving = (
+                target.power_saving
+                if target.power_saving is not None
+                and target.power_saving != data.saving.power_saving
+                else None
+            )
+            if update_interval is None and power_saving is None:
+                if target.power_saving is False:
+                    self._forget_saving(imei)
+                continue
+            writes.append(PolicyWrite(imei, update_interval, power_saving))
+        return writes
+
+    @callback
+    def async_schedule(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._task = self.hass.async_create_background_task(
+            self.async_apply(),
+            f"{DOMAIN} reporting policy",
+        )
+
+    async def async_apply(self) -> None:
+        if self.coordinator.api.governor.should_defer(Priority.BACKGROUND):
+            LOGGER.debug("Reporting policy postponed, the request budget is low")
+            return
+
+        # A slice per poll, the rest follows on the next ones
+        writes = self.plan(dt_util.now().time(), monotonic())[:POLICY_MAX_WRITES]
+        semaphore = asyncio.Semaphore(BULK_COMMAND_CONCURRENCY)
+
+        async def write(policy_write: PolicyWrite) -> None:
+            async with semaphore:
+                try:
+                    await self._write(policy_write)
+                except Exception as exc:
+                    LOGGER.warning(
+                        "[%s] Reporting policy write failed: %r",
+                        policy_write.imei,
+                        exc,
+                    )
+
+        await asyncio.gather(*(write(policy_write) for policy_write in writes))
+
+    async def _write(self, policy_write: PolicyWrite) -> None:
+        imei = policy_write.imei
+        api = self.coordinator.api
+        self._written[imei] = monotonic()
+
+        if policy_write.update_interval is not None:
+            LOGGER.debug(
+                "[%s] Policy setting update_interval to %s",
+                imei,
+                policy_write.update_interval,
+            )
+            await api.set_utime(imei=imei, value=policy_write.update_interval)
+
+        if policy_write.power_saving is not None:
+            LOGGER.debug(
+                "[%s] Policy setting power_saving to %s",
+                imei,
+                policy_write.power_saving,
+            )
+            # A copy, the snapshot keeps what the tracker reported
+            saving = Saving(str(self.coordinator.data[imei].saving))
+            saving.power_saving = policy_write.power_saving
+            await api.set_sav(imei=imei, saving=saving)
+            if policy_write.power_saving:
+                self.forced_saving.add(imei)
+                self._save()
+            else:
+                self._forget_saving(imei)
+
+    def _forget_saving(self, imei: str) -> None:
+        if imei in self.forced_saving:
+            self.forced_saving.discard(imei)
+            self._save()
+
+    def _save(self) -> None:
+        self.store.async_delay_save(
+            lambda: {"forced_saving": sorted(self.forced_saving)},
+            1,
+        )
+
+
+async def async_setup_policy(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: _365GPSDataUpdateCoordinator,
+) -> Optional[Callable[[], None]]:
+    if not entry.options.get(CONF_POLICY, False):
+        return None
+
+    engine = PolicyEngine(
+        hass,
+        coordinator,
+        Store(hass, 1, f"{DOMAIN}.policy_{entry.entry_id}"),
+    )
+    await engine.async_load()
+    engine.async_schedule()
+    return coordinator.async_add_listener(engine.async_schedule)
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import asyncio
+from collections import Counter, deque
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Callable, Iterable, Iterator, Optional
+
+from .const import LOOP_LAG_INTERVAL
+
+STAGES = ("http", "parse", "state_write")
+
+
+def percentiles(
+    samples: Iterable[float],
+    points: tuple[int, ...] = (50, 90, 99),
+) -> dict[str, Optional[float]]:
+    ordered = sorted(samples)
+    if not ordered:
+        return {f"p{point}": None for point in points}
+    return {
+        f"p{point}": ordered[min(len(ordered) - 1, len(ordered) * point // 100)]
+        for point in points
+    }
+
+
+class PollProfiler:
+    def __init__(self, enabled: bool = False, samples: int = 500):
+        self.enabled = enabled
+        self.polls: deque[float] = deque(maxlen=samples)
+        self.stages: dict[str, deque[float]] = {
+            stage: deque(maxlen=samples) for stage in STAGES
+        }
+        self.device_parse: dict[str, float] = {}
+        self.fan_out: deque[int] = deque(maxlen=samples)
+        self.loop_lag: deque[float] = deque(maxlen=samples)
+        self.counters: Counter[str] = Counter()
+
+        self._poll_started: Optional[float] = None
+        self._current: dict[str, float] = {}
+
+    def begin_poll(self) -> None:
+        if not self.enabled:
+            return
+        self._poll_started = perf_counter()
+        self._current = dict.fromkeys(STAGES[:-1], 0.0)
+
+    def end_poll(self) -> None:
+        if not self.enabled or self._poll_started is None:
+            return
+        self.polls.append(perf_counter() - self._poll_started)
+        for stage, duration in self._current.items():
+            self.stages[stage].append(duration)
+        self._poll_started = None
+
+    @contextmanager
+    def stage(self, name: str, imei: Optional[str] = None) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            duration = perf_counter() - started
+            if name in self._current:
+                self._current[name] += duration
+            else:
+                self.stages[name].append(duration)
+            if imei is not None:
+                self.device_parse[imei] = duration
+
+    def monitor_loop(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        interval: float = LOOP_LAG_INTERVAL,
+    ) -> Callable[[], None]:
+        # A timer due every `interval`, how late it fires is how long something
+        # held the loop
+        handle: Optional[asyncio.TimerHandle] = None
+
+        def tick(due: float) -> None:
+            nonlocal handle
+            if due:
+                self.loop_lag.append(max(0.0, loop.time() - due))
+            due = loop.time() + interval
+            handle = loop.call_at(due, tick, due)
+
+        def stop() -> None:
+            if handle is not None:
+                handle.cancel()
+
+        tick(0.0)
+        return stop
+
+    def record_fan_out(self, listeners: int) -> None:
+        if self.enabled:
+            self.fan_out.append(listeners)
+            self.counters["state_writes"] += listeners
+
+    def as_dict(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "polls": len(self.polls),
+            "poll_seconds": percentiles(self.polls),
+            "stage_seconds": {
+                stage: percentiles(samples) for stage, samples in self.stages.items()
+            },
+            "device_parse_seconds": percentiles(self.device_parse.values()),
+            "listener_fan_out": percentiles(self.fan_out),
+            "loop_lag_seconds": {
+                **percentiles(self.loop_lag),
+                "max": max(self.loop_lag, default=None),
+            },
+            "counters": dict(self.counters),
+        }
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from math import cos, floor, radians
+from typing import TYPE_CHECKING, Callable, Iterable, Optional
+
+from homeassistant.core import callback
+
+from .const import (
+    CONF_PROXIMITY,
+    DOMAIN,
+    PROXIMITY_DISTANCE,
+    SEPARATION_DISTANCE,
+    LocationSource,
+)
+from .telemetry import haversine
+
+if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.core import HomeAssistant
+
+    from .coordinator import _365GPSDataUpdateCoordinator
+
+EVENT_PROXIMITY = f"{DOMAIN}_proximity"
+METERS_PER_DEGREE = 111195.0
+
+Pair = tuple[str, str]
+
+
+def find_pairs(
+    positions: dict[str, tuple[float, float]],
+    distance: float,
+) -> dict[Pair, float]:
+    if not positions:
+        return {}
+
+    # Cells at least `distance` wide everywhere, so close pairs are always in
+    # neighbouring cells. Longitude cells are sized for the fleet's highest latitude.
+    cell_lat = distance / METERS_PER_DEGREE
+    widest = max(abs(latitude) for latitude, _ in positions.values())
+    cell_lng = cell_lat / max(cos(radians(min(widest, 89.0))), 0.01)
+
+    grid: defaultdict[tuple[int, int], list[str]] = defaultdict(list)
+    for imei, (latitude, longitude) in positions.items():
+        grid[floor(latitude / cell_lat), floor(longitude / cell_lng)].append(imei)
+
+    pairs = {}
+    for (row, column), members in grid.items():
+        for d_row, d_column in ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1)):
+            # Half of the neighbourhood, the other half sees this cell as its own
+            others = grid.get((row + d_row, column + d_column))
+            if not others:
+                continue
+            for index, first in enumerate(members):
+                candidates = others[index + 1 :] if others is members else others
+                for second in candidates:
+                    meters = 1000 * haversine(*positions[first], *positions[second])
+                    if meters <= distance:
+                        pairs[tuple(sorted((first, second)))] = meters
+    return pairs
+
+
+def find_convoys(pairs: Iterable[Pair]) -> list[set[str]]:
+    parent: dict[str, str] = {}
+
+    def root(imei: str) -> str:
+        parent.setdefault(imei, imei)
+        while parent[imei] != imei:
+            parent[imei] = parent[parent[imei]]
+            imei = parent[imei]
+        return imei
+
+    for first, second in pairs:
+        parent[root(first)] = root(second)
+
+    convoys: defaultdict[str, set[str]] = defaultdict(set)
+    for imei in parent:
+        convoys[root(imei)].add(imei)
+    return list(convoys.values())
+
+
+class ProximityTracker:
+    def __init__(
+        self,
+        distance: float = PROXIMITY_DISTANCE,
+        separation: float = SEPARATION_DISTANCE,
+    ):
+        self.distance = distance
+        self.separation = separation
+        self.pairs: dict[Pair, float] = {}
+        self.convoy_of: dict[str, frozenset[str]] = {}
+
+    def update(
+        self,
+        positions: dict[str, tuple[float, float]],
+    ) -> tuple[set[Pair], set[Pair]]:
+        # Pairs join within `distance` and only separate beyond `separation`, so a
+        # pair hovering around the threshold does not flap
+        candidates = find_pairs(positions, self.separation)
+        pairs = {
+            pair: meters
+            for pair, meters in candidates.items()
+            if meters <= self.distance or pair in self.pairs
+        }
+        # A tracker without a position this time has not moved away
+        pairs.update(
+            (pair, meters)
+            for pair, meters in self.pairs.items()
+            if pair[0] not in positions or pair[1] not in positions
+        )
+        joined = pairs.keys() - self.pairs.keys()
+        separated = self.pairs.keys() - pairs.keys()
+        self.pairs = pairs
+        self.convoy_of = {}
+        for convoy in find_convoys(pairs):
+            members = frozenset(convoy)
+            self.convoy_of.update(dict.fromkeys(members, members))
+        return joined, separated
+
+    def convoy_size(self, imei: str) -> int:
+        return len(self.convoy_of.get(imei, (imei,)))
+
+
+@callback
+def async_setup_proximity(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: _365GPSDataUpdateCoordinator,
+) -> Optional[Callable[[], None]]:
+    if not entry.options.get(CONF_PROXIMITY, False):
+        return None
+
+    tracker = coordinator.proximity = ProximityTracker()
+
+    @callback
+    def update() -> None:
+        positions = {
+            imei: (data.latitude, data.longitude)
+            for imei, data in coordinator.data.items()
+            if data.location_source == LocationSource.GPS
+            and coordinator.is_device_available(imei)
+        }
+        joined, separated = tracker.update(positions)
+        for kind, pairs in (("joined", joined), ("separated", separated)):
+            for pair in pairs:
+                hass.bus.async_fire(
+                    EVENT_PROXIMITY,
+                    {"type": kind, "imei": list(pair)},
+                )
+
+    update()
+    # Registered before the platforms, so entities read this poll's convoys
+    return coordinator.async_add_listener(update)
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional
+
+from aiohttp import web
+from homeassistant.components import webhook
+from homeassistant.core import callback
+
+from .const import (
+    CONF_MQTT_TOPIC,
+    CONF_PUSH_MODE,
+    CONF_WEBHOOK_ID,
+    DEFAULT_MQTT_TOPIC,
+    DOMAIN,
+    PushMode,
+)
+from .coordinator import LOGGER
+
+if TYPE_CHECKING:
+    from homeassistant.components.mqtt import ReceiveMessage
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.core import HomeAssistant
+
+    from .coordinator import _365GPSDataUpdateCoordinator
+
+
+def decode_push_payload(payload: bytes | str) -> list[dict]:
+    content = json.loads(payload)
+    if isinstance(content, dict):
+        content = content.get("devices", [content])
+    if not isinstance(content, list):
+        raise ValueError("Push payload must be a device object or a list of them")
+
+    for raw_device in content:
+        if not isinstance(raw_device, dict) or not raw_device.get("imei"):
+            raise ValueError("Every pushed device needs an imei")
+    return content
+
+
+def webhook_handler(
+    coordinator: _365GPSDataUpdateCoordinator,
+) -> Callable[[HomeAssistant, str, web.Request], Awaitable[web.Response]]:
+    async def handle_webhook(
+        hass: HomeAssistant,
+        webhook_id: str,
+        request: web.Request,
+    ) -> web.Response:
+        try:
+            raw_devices = decode_push_payload(await request.read())
+        except ValueError as exc:
+            LOGGER.warning("Rejected webhook push: %s", exc)
+            return web.Response(status=400, text=str(exc))
+        updated = coordinator.async_push_devices(raw_devices)
+        return web.json_response({"updated": updated})
+
+    return handle_webhook
+
+
+async def async_setup_push(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: _365GPSDataUpdateCoordinator,
+) -> Optional[Callable[[], None]]:
+    push_mode = entry.options.get(CONF_PUSH_MODE, PushMode.DISABLED)
+
+    if push_mode == PushMode.WEBHOOK:
+        webhook_id = entry.options[CONF_WEBHOOK_ID]
+        webhook.async_register(
+            hass,
+            DOMAIN,
+            entry.title,
+            webhook_id,
+            webhook_handler(coordinator),
+            local_only=True,
+            allowed_methods=["POST", "PUT"],
+        )
+        LOGGER.info("Accepting pushes on %s", webhook.async_generate_path(webhook_id))
+        return lambda: webhook.async_unregister(hass, webhook_id)
+
+    if push_mode == PushMode.MQTT:
+        from homeassistant.components import mqtt
+
+        if not await mqtt.async_wait_for_mqtt_client(hass):
+            LOGGER.error("MQTT push mode is enabled but MQTT is not available")
+            return None
+
+        @callback
+        def message_received(message: ReceiveMessage) -> None:
+            try:
+                raw_devices = decode_push_payload(message.payload)
+            except ValueError as exc:
+                LOGGER.warning("Rejected MQTT push on %s: %s", message.topic, exc)
+                return
+            coordinator.async_push_devices(raw_devices)
+
+        topic = entry.options.get(CONF_MQTT_TOPIC, DEFAULT_MQTT_TOPIC)
+        LOGGER.info("Accepting pushes on MQTT topic %s", topic)
+        return await mqtt.async_subscribe(hass, topic, message_received)
+
+    return None
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from enum import IntEnum
+from time import monotonic
+from typing import Callable, ClassVar, Optional
+
+from .const import (
+    COMMAND_BUCKET_CAPACITY,
+    COMMAND_BUCKET_RATE,
+    GOVERNOR_NOTIFY_INTERVAL,
+    READ_BUCKET_CAPACITY,
+    READ_BUCKET_RATE,
+    READ_BUCKET_RESERVE,
+)
+
+
+class Priority(IntEnum):
+    COMMAND = 0
+    READ = 1
+    BACKGROUND = 2
+    # Reads for the first poll, metered but never held back
+    STARTUP = 3
+
+
+class TokenBucket:
+    def __init__(
+        self,
+        capacity: float,
+        rate: float,
+        clock: Callable[[], float] = monotonic,
+    ):
+        self.capacity = capacity
+        self.rate = rate
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def try_take(self, amount: float = 1) -> bool:
+        self._refill()
+        if self._tokens < amount:
+            return False
+        self._tokens -= amount
+        return True
+
+    def wait_time(self, amount: float = 1) -> float:
+        self._refill()
+        return max(0.0, (amount - self._tokens) / self.rate)
+
+
+class RateGovernor:
+    _accounts: ClassVar[dict[str, RateGovernor]] = {}
+
+    def __init__(
+        self,
+        reads: TokenBucket,
+        commands: TokenBucket,
+        reserve: float = READ_BUCKET_RESERVE,
+    ):
+        self.reads = reads
+        self.commands = commands
+        self.reserve = reserve
+        self.peak_queue_depth = 0
+        self._waiting: Counter[Priority] = Counter()
+        self._listeners: list[Callable[[], None]] = []
+        self._notify_handle: Optional[asyncio.TimerHandle] = None
+
+    @classmethod
+    def for_account(cls, username: str) -> RateGovernor:
+        if (governor := cls._accounts.get(username)) is None:
+            governor = cls._accounts[username] = cls(
+                reads=TokenBucket(READ_BUCKET_CAPACITY, READ_BUCKET_RATE),
+                commands=TokenBucket(COMMAND_BUCKET_CAPACITY, COMMAND_BUCKET_RATE),
+            )
+        return governor
+
+    @property
+    def read_budget(self) -> int:
+        return int(self.reads.tokens)
+
+    @property
+    def command_budget(self) -> int:
+        return int(self.commands.tokens)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(self._waiting.values())
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def _changed(self) -> None:
+        self.peak_queue_depth = max(self.peak_queue_depth, self.queue_depth)
+        if not self._listeners or self._notify_handle is not None:
+            return
+        # Coalesced, a poll of a big fleet must not write these states per request
+        self._notify_handle = asyncio.get_running_loop().call_later(
+            GOVERNOR_NOTIFY_INTERVAL,
+            self._notify,
+        )
+
+    def _notify(self) -> None:
+        self._notify_handle = None
+        for listener in list(self._listeners):
+            listener()
+        self.peak_queue_depth = self.queue_depth
+
+    def should_defer(self, priority: Priority) -> bool:
+        if priority != Priority.BACKGROUND:
+            return False
+        return self._waiting[Priority.COMMAND] > 0 or self.reads.tokens < self.reserve
+
+    async def acquire(self, priority: Priority = Priority.READ) -> None:
+        bucket = self.commands if priority == Priority.COMMAND else self.reads
+        if priority == Priority.STARTUP:
+            bucket.try_take()
+            self._changed()
+            return
+
+        self._waiting[priority] += 1
+        self._changed()
+        try:
+            # Only background reads step aside for queued commands, the rest
+            # contend for their own bucket
+            while (
+                priority == Priority.BACKGROUND and self._waiting[Priority.COMMAND]
+            ) or not bucket.try_take():
+                await asyncio.sleep(max(bucket.wait_time(), 0.05))
+        finally:
+            self._waiting[priority] -= 1
+            self._changed()
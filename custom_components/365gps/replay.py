@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import random
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import timedelta
+from pathlib import Path
+from time import monotonic
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional
+from uuid import uuid4
+
+from homeassistant.core import callback
+from homeassistant.exceptions import IntegrationError
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import STORAGE_DIR
+from homeassistant.util import dt as dt_util
+from multidict import CIMultiDict, CIMultiDictProxy
+
+from .api import _365GPSAPI, decode_content
+from .const import CONF_RECORD_TRAFFIC, DOMAIN, TRAFFIC_FLUSH_INTERVAL
+from .ratelimit import Priority
+
+if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.core import HomeAssistant
+
+    from .coordinator import _365GPSDataUpdateCoordinator
+
+DATA_TRAFFIC = f"{DOMAIN}_traffic"
+
+RECORDED_ENDPOINTS = ("wx_ilist.php", "wx_sav.php")
+CLEARED_FIELDS = ("login", "carno", "iccid", "ggkey", "pic", "logo", "google", "baidu")
+DEFAULT_SAVING = [{"saving": "0" * 26, "log": ""}]
+
+
+class Sanitizer:
+    def __init__(self, offset: Optional[tuple[float, float]] = None):
+        # One shift for the whole recording, tracks and distances stay intact
+        self.offset = (
+            offset
+            if offset is not None
+            else (random.uniform(-0.5, 0.5), random.uniform(-0.5, 0.5))
+        )
+        self._imeis: dict[str, str] = {}
+
+    def imei(self, imei: str) -> str:
+        if (pseudonym := self._imeis.get(imei)) is None:
+            pseudonym = self._imeis[imei] = f"{len(self._imeis) + 1:015}"
+        return pseudonym
+
+    def device(self, raw_device: dict) -> dict:
+        device = dict(raw_device)
+        for field in CLEARED_FIELDS:
+            if device.get(field) is not None:
+                device[field] = ""
+        if isinstance(imei := device.get("imei"), str) and imei:
+            device["imei"] = self.imei(imei)
+            device["name"] = f"Tracker {int(device['imei'])}"
+        if isinstance(gps := device.get("gps"), str):
+            device["gps"] = self._shift(gps)
+        return device
+
+    def _shift(self, gps: str) -> str:
+        parts = gps.split(",")
+        for index, delta in zip((1, 2, 5, 6), self.offset * 2):
+            try:
+                value = float(parts[index])
+            except (IndexError, ValueError):
+                # Malformed fixes are kept as they are, they are worth replaying
+                continue
+            if value:
+                parts[index] = f"{value + delta:.6f}"
+        return ",".join(parts)
+
+    def entry(self, endpoint: str, params: dict, status: int, content: bytes) -> dict:
+        entry: dict = {"endpoint": endpoint, "status": status}
+        if endpoint == "wx_sav.php":
+            entry["imei"] = self.imei(params["imei"])
+        if status == 304:
+            return entry
+        try:
+            body = decode_content(content)
+        except IntegrationError:
+            entry["raw"] = content.decode("utf-8", "replace")
+            return entry
+        if endpoint == "wx_ilist.php" and isinstance(body, list):
+            body = [
+                self.device(device) if isinstance(device, dict) else device
+                for device in body
+            ]
+        elif endpoint == "wx_sav.php" and isinstance(body, list):
+            body = [
+                {**item, "log": ""} if isinstance(item, dict) else item for item in body
+            ]
+        entry["body"] = body
+        return entry
+
+
+def append_lines(path: Path, lines: list[str]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(path, "at", encoding="utf-8") as file:
+        file.write("\n".join(lines) + "\n")
+
+
+def read_recording(path: Path) -> Iterator[dict]:
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        try:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile, json.JSONDecodeError):
+            # A flush cut short by a crash ends the recording
+            return
+
+
+# Captures the device list and saving responses with the time they arrived, so
+# real payload quirks can be profiled offline. Identifying fields are cleared,
+# IMEIs replaced and positions shifted before anything is written.
+class TrafficRecorder:
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        path: Path,
+        sanitizer: Optional[Sanitizer] = None,
+    ):
+        self.hass = hass
+        self.path = path
+        self.sanitizer = sanitizer or Sanitizer()
+        self._started: Optional[float] = None
+        self._pending: list[str] = []
+
+    @callback
+    def record(self, endpoint: str, params: dict, status: int, content: bytes) -> None:
+        if endpoint not in RECORDED_ENDPOINTS:
+            return
+        now = monotonic()
+        if self._started is None:
+            self._started = now
+        entry = self.sanitizer.entry(endpoint, params, status, content)
+        entry["time"] = round(now - self._started, 3)
+        self._pending.append(json.dumps(entry, separators=(",", ":")))
+
+    async def async_flush(self, *_) -> None:
+        if not self._pending:
+            return
+        lines, self._pending = self._pending, []
+        await self.hass.async_add_executor_job(append_lines, self.path, lines)
+
+
+@callback
+def async_setup_recording(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: _365GPSDataUpdateCoordinator,
+) -> Optional[Callable[[], None]]:
+    if not entry.options.get(CONF_RECORD_TRAFFIC, False):
+        return None
+
+    started = dt_util.utcnow().strftime("%Y%m%dT%H%M%S")
+    recorder = TrafficRecorder(
+        hass,
+        Path(
+            hass.config.path(
+                STORAGE_DIR,
+                DATA_TRAFFIC,
+                f"{entry.entry_id}-{started}.jsonl.gz",
+            ),
+        ),
+    )
+    coordinator.api.traffic_recorder = recorder.record
+    cancel_flush = async_track_time_interval(
+        hass,
+        recorder.async_flush,
+        timedelta(seconds=TRAFFIC_FLUSH_INTERVAL),
+        cancel_on_shutdown=True,
+    )
+
+    @callback
+    def stop() -> None:
+        coordinator.api.traffic_recorder = None
+        cancel_flush()
+        hass.async_create_task(recorder.async_flush())
+
+    return stop
+
+
+# Serves a recording instead of the server. Everything past _fetch, caching,
+# revisions and parsing, runs as it does against the real thing.
+class ReplayAPI(_365GPSAPI):
+    ilist_cache_ttl = 0
+
+    def __init__(self, entries: Iterable[dict]):
+        super().__init__(f"replay_{uuid4().hex}", "", session=None)
+        self.ilists: list[tuple[float, dict]] = []
+        self._savs: defaultdict[str, list[tuple[float, dict]]] = defaultdict(list)
+        for entry in entries:
+            if entry["endpoint"] == "wx_ilist.php":
+                self.ilists.append((entry["time"], entry))
+            elif entry["endpoint"] == "wx_sav.php":
+                self._savs[entry["imei"]].append((entry["time"], entry))
+        self.clock = 0.0
+        self.current: Optional[dict] = None
+
+    def _saving_at(self, imei: str) -> Optional[dict]:
+        savs = self._savs.get(imei)
+        if not savs:
+            return None
+        # The newest saving recorded before now, or the first one ever seen
+        index = bisect_right(savs, self.clock, key=lambda item: item[0])
+        return savs[max(index - 1, 0)][1]
+
+    async def _fetch(
+        self,
+        path: str,
+        params: dict[str, str],
+        headers: Optional[dict[str, str]] = None,
+        priority: Priority = Priority.READ,
+    ) -> tuple[int, CIMultiDictProxy[str], bytes]:
+        if path == "wx_ilist.php":
+            entry = self.current
+        elif path == "wx_sav.php":
+            entry = self._saving_at(params["imei"]) or {"body": DEFAULT_SAVING}
+        else:
+            entry = {"body": {"result": "ok"}}
+
+        status = entry.get("status", 200)
+        if "raw" in entry:
+            content = entry["raw"].encode()
+        elif "body" in entry:
+            content = json.dumps(entry["body"]).encode()
+        else:
+            content = b""
+        self.transfer_stats.requests += 1
+        self.transfer_stats.decoded_bytes += len(content)
+        return status, CIMultiDictProxy(CIMultiDict()), content
+
+
+async def async_replay(
+    coordinator: _365GPSDataUpdateCoordinator,
+    speed: float = 0,
+) -> int:
+    # speed 1 keeps the recorded pace, 10 is ten times faster, 0 does not wait
+    api: ReplayAPI = coordinator.api
+    previous = None
+    for recorded, entry in api.ilists:
+        if speed and previous is not None:
+            await asyncio.sleep((recorded - previous) / speed)
+        previous = recorded
+        api.clock, api.current = recorded, entry
+        await coordinator.async_refresh()
+    return len(api.ilists)
@@ -2,12 +2,12 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import RestoreSensor, SensorEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 
 from .const import DOMAIN
-from .coordinator import _365GPSEntity
+from .coordinator import _365GPSAccountEntity, _365GPSEntity
 
 if TYPE_CHECKING:
     from homeassistant.config_entries import ConfigEntry
@@ -15,6 +15,7 @@ if TYPE_CHECKING:
     from homeassistant.helpers.entity_platform import AddEntitiesCallback
     from homeassistant.helpers.typing import StateType
 
+    from .commands import Command
     from .coordinator import _365GPSDataUpdateCoordinator
 
 
@@ -33,11 +34,129 @@ async def async_setup_entry(
                 for desc in coordinator.sensor_descriptions
             ],
         )
+        devices.extend(
+            _365GPSTelemetrySensor(coordinator, imei, desc)
+            for desc in coordinator.telemetry_descriptions
+        )
+        devices.append(
+            _365GPSCommandSensor(
+                coordinator, imei, coordinator.last_command_description
+            ),
+        )
+        devices.extend(
+            _365GPSExpirySensor(coordinator, imei, desc)
+            for desc in coordinator.expiry_descriptions
+        )
+        if coordinator.proximity is not None:
+            devices.append(
+                _365GPSConvoySensor(coordinator, imei, coordinator.convoy_description),
+            )
+        if coordinator.geocoder is not None:
+            devices.append(
+                _365GPSAddressSensor(
+                    coordinator, imei, coordinator.address_description
+                ),
+            )
+    devices.extend(
+        _365GPSGovernorSensor(coordinator, desc)
+        for desc in coordinator.governor_descriptions
+    )
 
     async_add_entities(devices)
 
 
-class _365GPSSensorEntity(SensorEntity, _365GPSEntity):
+class _365GPSSensorEntity(_365GPSEntity, SensorEntity):
     @property
     def native_value(self) -> StateType:
         return getattr(self.coordinator.data[self._imei], self.entity_description.key)
+
+
+class _365GPSTelemetrySensor(_365GPSEntity, RestoreSensor):
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        if (
+            self.entity_description.key == "odometer"
+            and (last := await self.async_get_last_sensor_data()) is not None
+            and last.native_value is not None
+        ):
+            # Distance covered since startup is already counted on top
+            self.coordinator.device_telemetry(self._imei).odometer += float(
+                last.native_value,
+            )
+
+    @property
+    def native_value(self) -> StateType:
+        return getattr(
+            self.coordinator.device_telemetry(self._imei),
+            self.entity_description.key,
+        )
+
+
+class _365GPSAddressSensor(_365GPSEntity, SensorEntity):
+    @property
+    def native_value(self) -> StateType:
+        data = self.coordinator.data[self._imei]
+        return self.coordinator.geocoder.lookup(data.latitude, data.longitude)
+
+
+class _365GPSExpirySensor(_365GPSEntity, SensorEntity):
+    @property
+    def native_value(self) -> StateType:
+        subscription = self.coordinator.expiry.subscriptions.get(self._imei)
+        return getattr(subscription, self.entity_description.key, None)
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        subscription = self.coordinator.expiry.subscriptions.get(self._imei)
+        if subscription is None:
+            return {}
+        return {"started": subscription.started, "iccid": subscription.iccid}
+
+
+class _365GPSCommandSensor(_365GPSEntity, SensorEntity):
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.commands.async_add_listener(self._handle_command),
+        )
+
+    @callback
+    def _handle_command(self, command: Command) -> None:
+        if command.imei == self._imei:
+            self.async_write_ha_state()
+
+    @property
+    def native_value(self) -> StateType:
+        command = self.coordinator.commands.latest.get(self._imei)
+        return command.state if command is not None else None
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        command = self.coordinator.commands.latest.get(self._imei)
+        if command is None:
+            return {}
+        return {"id": command.id, "action": command.action, "error": command.error}
+
+
+class _365GPSConvoySensor(_365GPSEntity, SensorEntity):
+    @property
+    def native_value(self) -> StateType:
+        return self.coordinator.proximity.convoy_size(self._imei)
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        convoy = self.coordinator.proximity.convoy_of.get(self._imei, ())
+        return {"imei": sorted(convoy)}
+
+
+class _365GPSGovernorSensor(_365GPSAccountEntity, SensorEntity):
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        # Budget and queue move with every request, not only with changed polls
+        self.async_on_remove(
+            self.coordinator.api.governor.add_listener(self.async_write_ha_state),
+        )
+
+    @property
+    def native_value(self) -> StateType:
+        return getattr(self.coordinator.api.governor, self.entity_description.key)
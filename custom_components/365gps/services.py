@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import asdict
+from math import inf
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import voluptuous as vol
+from homeassistant.const import ATTR_DEVICE_ID
+from homeassistant.core import ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import device_registry as dr
+from homeassistant.util import dt as dt_util
+
+from .api import Saving
+from .const import BULK_COMMAND_CONCURRENCY, DOMAIN, UPDATE_INTERVAL_MODES
+from .coordinator import LOGGER, _365GPSDataUpdateCoordinator
+from .replay import ReplayAPI, async_replay, read_recording
+from .tracks import DATA_TRACKS
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+
+SERVICE_BULK_COMMAND = "bulk_command"
+SERVICE_EXPORT_TRACKS = "export_tracks"
+SERVICE_IMPORT_TRACKS = "import_tracks"
+SERVICE_REPLAY_TRAFFIC = "replay_traffic"
+
+ATTR_IMEI = "imei"
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_ACTION = "action"
+ATTR_VALUE = "value"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_PATH = "path"
+ATTR_SPEED = "speed"
+ATTR_OFFLOAD = "offload"
+
+SAVING_FIELDS = (
+    "power_saving",
+    "remote",
+    "power_saving_on_time",
+    "power_saving_off_time",
+)
+ACTIONS = ("set_utime", "set_sav", "led", "speaker", "find", "reboot", "shutdown")
+
+BULK_COMMAND_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_IMEI, default=[]): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_DEVICE_ID, default=[]): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_CONFIG_ENTRY_ID, default=[]): vol.All(
+            cv.ensure_list,
+            [cv.string],
+        ),
+        vol.Required(ATTR_ACTION): vol.In(ACTIONS),
+        vol.Optional(ATTR_VALUE): vol.Any(
+            vol.In(UPDATE_INTERVAL_MODES),
+            vol.All(vol.Coerce(int), vol.Range(min=10, max=65535)),
+            cv.boolean,
+        ),
+        vol.Optional("power_saving"): cv.boolean,
+        vol.Optional("remote"): cv.boolean,
+        vol.Optional("power_saving_on_time"): cv.time,
+        vol.Optional("power_saving_off_time"): cv.time,
+    },
+)
+
+EXPORT_TRACKS_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_START): cv.datetime,
+        vol.Required(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_IMEI, default=[]): vol.All(cv.ensure_list, [cv.string]),
+        vol.Required(ATTR_PATH): cv.string,
+    },
+)
+IMPORT_TRACKS_SCHEMA = vol.Schema({vol.Required(ATTR_PATH): cv.string})
+REPLAY_TRAFFIC_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_PATH): cv.string,
+        vol.Optional(ATTR_SPEED, default=0): vol.All(
+            vol.Coerce(float),
+            vol.Range(min=0),
+        ),
+        vol.Optional(ATTR_OFFLOAD): cv.boolean,
+    },
+)
+
+
+def resolve_targets(
+    hass: HomeAssistant,
+    data: dict[str, Any],
+) -> dict[str, _365GPSDataUpdateCoordinator]:
+    coordinators: dict[str, _365GPSDataUpdateCoordinator] = hass.data[DOMAIN]
+    imeis = set(data[ATTR_IMEI])
+
+    device_registry = dr.async_get(hass) if data[ATTR_DEVICE_ID] else None
+    for device_id in data[ATTR_DEVICE_ID]:
+        if (device := device_registry.async_get(device_id)) is None:
+            raise ServiceValidationError(f"Unknown device {device_id}")
+        imeis.update(
+            identifier
+            for domain, identifier in device.identifiers
+            if domain == DOMAIN and not identifier.startswith("account_")
+        )
+
+    targets = {}
+    for entry_id in data[ATTR_CONFIG_ENTRY_ID]:
+        if (coordinator := coordinators.get(entry_id)) is None:
+            raise ServiceValidationError(f"Unknown config entry {entry_id}")
+        targets.update(dict.fromkeys(coordinator.data, coordinator))
+    for coordinator in coordinators.values():
+        targets.update(dict.fromkeys(imeis & coordinator.data.keys(), coordinator))
+
+    if unknown := imeis - targets.keys():
+        raise ServiceValidationError(f"Unknown IMEIs {', '.join(sorted(unknown))}")
+    if not targets:
+        raise ServiceValidationError("No devices selected")
+    return targets
+
+
+def validate_command(data: dict[str, Any]) -> None:
+    action = data[ATTR_ACTION]
+    value = data.get(ATTR_VALUE)
+
+    if action == "set_utime" and (value is None or isinstance(value, bool)):
+        raise ServiceValidationError("set_utime needs an interval or a mode")
+    if action == "set_sav" and not any(field in data for field in SAVING_FIELDS):
+        raise ServiceValidationError("set_sav needs at least one saving field")
+    if action in ("led", "speaker", "find") and not isinstance(value, bool):
+        raise ServiceValidationError(f"{action} needs a boolean value")
+
+
+async def async_run_command(
+    coordinator: _365GPSDataUpdateCoordinator,
+    imei: str,
+    data: dict[str, Any],
+) -> dict:
+    action = data[ATTR_ACTION]
+    value = data.get(ATTR_VALUE)
+    api = coordinator.api
+
+    if action == "set_utime":
+        return await api.set_utime(
+            imei=imei,
+            value=UPDATE_INTERVAL_MODES.get(value, value),
+        )
+
+    if action == "set_sav":
+        saving = Saving(str(coordinator.data[imei].saving))
+        for field in SAVING_FIELDS:
+            if field in data:
+                setattr(saving, field, data[field])
+        _, result = await api.set_sav(imei=imei, saving=saving)
+        return result
+
+    if action in ("led", "speaker", "find"):
+        setter = {"led": api.set_led, "speaker": api.set_speaker, "find": api.set_find}
+        return await setter[action](imei, value=value)
+
+    if action == "reboot":
+        return await api.reboot(imei)
+    return await api.shutdown(imei)
+
+
+async def async_bulk_command(hass: HomeAssistant, data: dict[str, Any]) -> dict:
+    validate_command(data)
+    targets = resolve_targets(hass, data)
+    action = data[ATTR_ACTION]
+    semaphore = asyncio.Semaphore(BULK_COMMAND_CONCURRENCY)
+
+    async def run(imei: str, coordinator: _365GPSDataUpdateCoordinator):
+        async with semaphore:
+            LOGGER.debug("[%s] Running %s", imei, action)
+            try:
+                result = await async_run_command(coordinator, imei, data)
+            except Exception as exc:
+                LOGGER.warning("[%s] %s failed: %r", imei, action, exc)
+                return imei, {"success": False, "error": str(exc)}
+            return imei, {"success": True, "result": result}
+
+    results = dict(
+        await asyncio.gather(
+            *(run(imei, coordinator) for imei, coordinator in targets.items()),
+        ),
+    )
+
+    for coordinator in set(targets.values()):
+        await coordinator.async_request_refresh()
+
+    return {"results": results}
+
+
+def allowed_path(hass: HomeAssistant, path: str) -> Path:
+    if not hass.config.is_allowed_path(path):
+        raise ServiceValidationError(f"{path} is not in an allowed directory")
+    return Path(path)
+
+
+async def async_export_tracks(hass: HomeAssistant, data: dict[str, Any]) -> dict:
+    path = allowed_path(hass, data[ATTR_PATH])
+    start = dt_util.as_utc(data[ATTR_START])
+    end = dt_util.as_utc(data[ATTR_END])
+    if start >= end:
+        raise ServiceValidationError("start must be before end")
+
+    recorder = hass.data[DATA_TRACKS]
+    # Fixes still buffered in memory belong in the export as well
+    await recorder.async_flush()
+    rows = await hass.async_add_executor_job(
+        recorder.archive.export,
+        path,
+        start,
+        end,
+        set(data[ATTR_IMEI]),
+    )
+    return {"path": str(path), "rows": rows}
+
+
+async def async_import_tracks(hass: HomeAssistant, data: dict[str, Any]) -> dict:
+    path = allowed_path(hass, data[ATTR_PATH])
+    if not await hass.async_add_executor_job(path.is_file):
+        raise ServiceValidationError(f"{path} does not exist")
+
+    recorder = hass.data[DATA_TRACKS]
+    rows = await hass.async_add_executor_job(recorder.archive.import_file, path)
+    return {"rows": rows}
+
+
+async def async_replay_traffic(hass: HomeAssistant, data: dict[str, Any]) -> dict:
+    path = allowed_path(hass, data[ATTR_PATH])
+    if not await hass.async_add_executor_job(path.is_file):
+        raise ServiceValidationError(f"{path} does not exist")
+
+    entries = await hass.async_add_executor_job(lambda: list(read_recording(path)))
+    api = ReplayAPI(entries)
+    # A coordinator of its own, the recording never touches the live entities
+    coordinator = _365GPSDataUpdateCoordinator(api=api, hass=hass)
+    coordinator.profiler.enabled = True
+    if ATTR_OFFLOAD in data:
+        # Forced either way, to compare the loop lag with and without
+        coordinator.offload_threshold = 0 if data[ATTR_OFFLOAD] else inf
+    stop_monitor = coordinator.profiler.monitor_loop(hass.loop)
+    try:
+        polls = await async_replay(coordinator, data[ATTR_SPEED])
+    finally:
+        stop_monitor()
+    return {
+        "polls": polls,
+        "devices": len(coordinator.data or {}),
+        "profiling": coordinator.profiler.as_dict(),
+        "transfer": asdict(api.transfer_stats),
+    }
+
+
+async def async_setup_services(hass: HomeAssistant) -> None:
+    async def handle_bulk_command(call: ServiceCall) -> ServiceResponse:
+        return await async_bulk_command(hass, call.data)
+
+    async def handle_export_tracks(call: ServiceCall) -> ServiceResponse:
+        return await async_export_tracks(hass, call.data)
+
+    async def handle_import_tracks(call: ServiceCall) -> ServiceResponse:
+        return await async_import_tracks(hass, call.data)
+
+    async def handle_replay_traffic(call: ServiceCall) -> ServiceResponse:
+        return await async_replay_traffic(hass, call.data)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BULK_COMMAND,
+        handle_bulk_command,
+        schema=BULK_COMMAND_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT_TRACKS,
+        handle_export_tracks,
+        schema=EXPORT_TRACKS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_IMPORT_TRACKS,
+        handle_import_tracks,
+        schema=IMPORT_TRACKS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_REPLAY_TRAFFIC,
+        handle_replay_traffic,
+        schema=REPLAY_TRAFFIC_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
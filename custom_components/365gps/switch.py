@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from functools import partial
 from typing import TYPE_CHECKING
 
 from homeassistant.components.switch import SwitchEntity
@@ -62,7 +63,7 @@ async def async_setup_entry(
     async_add_entities(entities, update_before_add=True)
 
 
-class LedSwitch(SwitchEntity, _365GPSEntity):
+class LedSwitch(_365GPSEntity, SwitchEntity):
     @property
     def is_on(self) -> bool:
         return getattr(self.coordinator.data[self._imei], self.entity_description.key)
@@ -71,18 +72,24 @@ class LedSwitch(SwitchEntity, _365GPSEntity):
     def icon(self) -> str:
         return "mdi:led-on" if self.is_on else "mdi:led-off"
 
+    def _set(self, value: bool) -> None:
+        self.coordinator.commands.async_submit(
+            self._imei,
+            "led",
+            partial(self.coordinator.api.set_led, self._imei, value=value),
+            expect=lambda data: data.led == value,
+        )
+
     async def async_turn_on(self):
         LOGGER.debug(f"Setting {self.entity_description.key} ON")
-        await self.coordinator.api.set_led(self._imei, value=True)
-        await self.coordinator.async_request_refresh()
+        self._set(True)
 
     async def async_turn_off(self):
         LOGGER.debug(f"Setting {self.entity_description.key} OFF")
-        await self.coordinator.api.set_led(self._imei, value=False)
-        await self.coordinator.async_request_refresh()
+        self._set(False)
 
 
-class SpeakerSwitch(SwitchEntity, _365GPSEntity):
+class SpeakerSwitch(_365GPSEntity, SwitchEntity):
     @property
     def is_on(self) -> bool:
         return getattr(self.coordinator.data[self._imei], self.entity_description.key)
@@ -91,76 +98,100 @@ class SpeakerSwitch(SwitchEntity, _365GPSEntity):
     def icon(self) -> str:
         return "mdi:volume-high" if self.is_on else "mdi:volume-low"
 
+    def _set(self, value: bool) -> None:
+        self.coordinator.commands.async_submit(
+            self._imei,
+            "speaker",
+            partial(self.coordinator.api.set_speaker, self._imei, value=value),
+            expect=lambda data: data.speaker == value,
+        )
+
     async def async_turn_on(self):
         LOGGER.debug(f"Setting {self.entity_description.key} ON")
-        await self.coordinator.api.set_speaker(self._imei, value=True)
-        await self.coordinator.async_request_refresh()
+        self._set(True)
 
     async def async_turn_off(self):
         LOGGER.debug(f"Setting {self.entity_description.key} OFF")
-        await self.coordinator.api.set_speaker(self._imei, value=False)
-        await self.coordinator.async_request_refresh()
+        self._set(False)
 
 
-class FindSwitch(SwitchEntity, _365GPSEntity):
+class FindSwitch(_365GPSEntity, SwitchEntity):
     async def async_turn_on(self):
         LOGGER.debug(f"Setting {self.entity_description.key} ON")
-        await self.coordinator.api.set_find(self._imei, value=True)
+        self.coordinator.commands.async_submit(
+            self._imei,
+            "find",
+            partial(self.coordinator.api.set_find, self._imei, value=True),
+        )
 
     async def async_turn_off(self):
         LOGGER.debug(f"Setting {self.entity_description.key} OFF")
-        await self.coordinator.api.set_find(self._imei, value=False)
+        self.coordinator.commands.async_submit(
+            self._imei,
+            "find",
+            partial(self.coordinator.api.set_find, self._imei, value=False),
+        )
 
 
-class PowerSavingSwitch(SwitchEntity, _365GPSEntity):
+class PowerSavingSwitch(_365GPSEntity, SwitchEntity):
     @property
     def is_on(self) -> bool:
         return self.coordinator.data[self._imei].saving.power_saving
 
+    def _set(self, value: bool) -> None:
+        saving = self.coordinator.commands.next_saving(self._imei)
+        saving.power_saving = value
+        self.coordinator.commands.async_submit(
+            self._imei,
+            "set_sav",
+            partial(self.coordinator.api.set_sav, imei=self._imei, saving=saving),
+            expect=lambda data: data.saving == saving,
+            value=saving,
+        )
+
     async def async_turn_on(self):
         LOGGER.debug(f"Setting {self.entity_description.key} ON")
-        saving = self.coordinator.data[self._imei].saving
-        saving.power_saving = True
-        await self.coordinator.api.set_sav(imei=self._imei, saving=saving)
-        await self.coordinator.async_request_refresh()
+        self._set(True)
 
     async def async_turn_off(self):
         LOGGER.debug(f"Setting {self.entity_description.key} OFF")
-        saving = self.coordinator.data[self._imei].saving
-        saving.power_saving = False
-        await self.coordinator.api.set_sav(imei=self._imei, saving=saving)
-        await self.coordinator.async_request_refresh()
+        self._set(False)
 
 
-class RemoteSwitch(SwitchEntity, _365GPSEntity):
+class RemoteSwitch(_365GPSEntity, SwitchEntity):
     @property
     def is_on(self) -> bool:
         return self.coordinator.data[self._imei].saving.remote
 
+    def _set(self, value: bool) -> None:
+        saving = self.coordinator.commands.next_saving(self._imei)
+        saving.remote = value
+        self.coordinator.commands.async_submit(
+            self._imei,
+            "set_sav",
+            partial(self.coordinator.api.set_sav, imei=self._imei, saving=saving),
+            expect=lambda data: data.saving == saving,
+            value=saving,
+        )
+
     async def async_turn_on(self):
         LOGGER.debug(f"Setting {self.entity_description.key} ON")
-        saving = self.coordinator.data[self._imei].saving
-        saving.remote = True
-        await self.coordinator.api.set_sav(imei=self._imei, saving=saving)
-        await self.coordinator.async_request_refresh()
+        self._set(True)
 
     async def async_turn_off(self):
         LOGGER.debug(f"Setting {self.entity_description.key} OFF")
-        saving = self.coordinator.data[self._imei].saving
-        saving.remote = False
-        await self.coordinator.api.set_sav(imei=self._imei, saving=saving)
-        await self.coordinator.async_request_refresh()
+        self._set(False)
 
 
-class IgnoreLBSSwitch(SwitchEntity, _365GPSEntity):
+class IgnoreLBSSwitch(_365GPSEntity, SwitchEntity):
     @property
     def is_on(self) -> bool:
         return self.coordinator.data[self._imei].ignore_lbs
 
     async def async_turn_on(self):
         LOGGER.debug(f"Setting {self.entity_description.key} ON")
-        self.coordinator.data[self._imei].ignore_lbs = True
+        self.coordinator.async_set_ignore_lbs(self._imei, True)
 
     async def async_turn_off(self):
         LOGGER.debug(f"Setting {self.entity_description.key} OFF")
-        self.coordinator.data[self._imei].ignore_lbs = False
+        self.coordinator.async_set_ignore_lbs(self._imei, False)
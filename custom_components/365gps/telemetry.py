@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from collections import deque
+from datetime import date, datetime
+from math import asin, cos, radians, sin, sqrt
+from typing import TYPE_CHECKING, Optional
+
+from .const import (
+    BATTERY_DRAIN_MIN_SPAN,
+    BATTERY_DRAIN_WINDOW,
+    ODOMETER_MIN_DISTANCE,
+    TELEMETRY_RESOLUTION,
+    TELEMETRY_WINDOW,
+    LocationSource,
+)
+
+if TYPE_CHECKING:
+    from .coordinator import DeviceData
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    lat1, lng1, lat2, lng2 = map(radians, (lat1, lng1, lat2, lng2))
+    a = (
+        sin((lat2 - lat1) / 2) ** 2
+        + cos(lat1) * cos(lat2) * sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * asin(sqrt(a))
+
+
+# Mean and max over the last `window` seconds. Samples are folded into buckets of
+# `resolution` seconds, so memory stays fixed however often a device reports.
+class SlidingWindow:
+    def __init__(self, window: float, resolution: float):
+        self.window = window
+        self.resolution = resolution
+        # (bucket, [sum, count]), and a decreasing deque of (bucket, max)
+        self._buckets: deque[tuple[int, list[float]]] = deque()
+        self._maxima: deque[tuple[int, float]] = deque()
+        self._total = 0.0
+        self._count = 0
+
+    def add(self, timestamp: float, value: float) -> None:
+        bucket = int(timestamp // self.resolution)
+        if self._buckets and self._buckets[-1][0] == bucket:
+            self._buckets[-1][1][0] += value
+            self._buckets[-1][1][1] += 1
+        else:
+            self._buckets.append((bucket, [value, 1]))
+        self._total += value
+        self._count += 1
+
+        while self._maxima and self._maxima[-1][1] <= value:
+            self._maxima.pop()
+        if not self._maxima or self._maxima[-1][0] != bucket:
+            self._maxima.append((bucket, value))
+
+        cutoff = int((timestamp - self.window) // self.resolution)
+        while self._buckets and self._buckets[0][0] <= cutoff:
+            _, (total, count) = self._buckets.popleft()
+            self._total -= total
+            self._count -= count
+        while self._maxima and self._maxima[0][0] <= cutoff:
+            self._maxima.popleft()
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self._total / self._count if self._count else None
+
+    @property
+    def maximum(self) -> Optional[float]:
+        return self._maxima[0][1] if self._maxima else None
+
+
+class DeviceTelemetry:
+    def __init__(self):
+        self.odometer = 0.0
+        self.daily_distance = 0.0
+        self.last_gps_fix: Optional[datetime] = None
+
+        self._speeds = SlidingWindow(TELEMETRY_WINDOW, TELEMETRY_RESOLUTION)
+        # Battery levels only when they change, the first one is the anchor
+        self._battery: deque[tuple[float, int]] = deque()
+        self._battery_latest: Optional[tuple[float, int]] = None
+        self._last_fix: Optional[datetime] = None
+        self._last_position: Optional[tuple[float, float]] = None
+        self._day: Optional[date] = None
+
+    def update(self, data: DeviceData, day: date) -> bool:
+        if self._last_fix is not None and data.update_time <= self._last_fix:
+            return False
+        self._last_fix = data.update_time
+        timestamp = data.update_time.timestamp()
+
+        if day != self._day:
+            self._day = day
+            self.daily_distance = 0.0
+
+        if data.location_source == LocationSource.GPS:
+            self.last_gps_fix = data.update_time
+            position = (data.latitude, data.longitude)
+            if self._last_position is None:
+                self._last_position = position
+            else:
+                # Parked GPS jitter stays below the threshold and is not counted
+                distance = haversine(*self._last_position, *position)
+                if distance >= ODOMETER_MIN_DISTANCE:
+                    self.odometer += distance
+                    self.daily_distance += distance
+                    self._last_position = position
+
+        if data.speed is not None:
+            self._speeds.add(timestamp, data.speed)
+        if data.battery_level is not None:
+            self._add_battery(timestamp, data.battery_level)
+        return True
+
+    def _add_battery(self, timestamp: float, level: int) -> None:
+        if self._battery and level > self._battery[-1][1]:
+            # Charging, measure the drain from here on
+            self._battery.clear()
+        if not self._battery or level != self._battery[-1][1]:
+            self._battery.append((timestamp, level))
+        self._battery_latest = (timestamp, level)
+
+        cutoff = timestamp - BATTERY_DRAIN_WINDOW
+        while len(self._battery) > 1 and self._battery[1][0] <= cutoff:
+            self._battery.popleft()
+
+    @property
+    def average_speed(self) -> Optional[float]:
+        return self._speeds.mean
+
+    @property
+    def max_speed(self) -> Optional[float]:
+        return self._speeds.maximum
+
+    @property
+    def battery_drain(self) -> Optional[float]:
+        if not self._battery or self._battery_latest is None:
+            return None
+        started, level = self._battery[0]
+        now, latest = self._battery_latest
+        if now - started < BATTERY_DRAIN_MIN_SPAN:
+            return None
+        return (level - latest) * 3600 / (now - started)
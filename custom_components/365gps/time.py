@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from datetime import time
+from functools import partial
 from typing import TYPE_CHECKING
 
 from homeassistant.components.time import TimeEntity
@@ -53,8 +54,13 @@ class _365GPSPowerSavingTime(_365GPSEntity, TimeEntity):
 
     async def async_set_value(self, value: time):
         LOGGER.debug(f"[{self._imei}] Setting {self.entity_description.key} to {value}")
-        saving = self.coordinator.data[self._imei].saving
+        saving = self.coordinator.commands.next_saving(self._imei)
         setattr(saving, self.entity_description.key, value)
 
-        await self.coordinator.api.set_sav(imei=self._imei, saving=saving)
-        await self.coordinator.async_request_refresh()
+        self.coordinator.commands.async_submit(
+            self._imei,
+            "set_sav",
+            partial(self.coordinator.api.set_sav, imei=self._imei, saving=saving),
+            expect=lambda data: data.saving == saving,
+            value=saving,
+        )
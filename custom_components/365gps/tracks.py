@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import csv
+import gzip
+from collections import defaultdict
+from datetime import UTC, date, datetime, timedelta
+from itertools import islice
+from math import cos, hypot, radians
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional, Sequence
+
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import STORAGE_DIR
+
+from .const import (
+    CONF_TRACKS,
+    DOMAIN,
+    TRACK_FLUSH_INTERVAL,
+    TRACK_IMPORT_CHUNK,
+    TRACK_MAX_BUFFER,
+    TRACK_MAX_GAP,
+    TRACK_TOLERANCE,
+)
+
+if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.core import Event, HomeAssistant
+
+    from .coordinator import DeviceData, _365GPSDataUpdateCoordinator
+
+DATA_TRACKS = f"{DOMAIN}_tracks"
+
+EARTH_RADIUS_M = 6371008.8
+
+TRACK_FIELDS = (
+    "time",
+    "imei",
+    "latitude",
+    "longitude",
+    "speed",
+    "altitude",
+    "direction",
+    "location_source",
+    "battery_level",
+)
+
+
+def fix_row(data: DeviceData) -> tuple:
+    return (
+        int(data.update_time.timestamp()),
+        data.imei,
+        data.latitude,
+        data.longitude,
+        data.speed,
+        data.altitude,
+        data.direction,
+        data.location_source,
+        data.battery_level,
+    )
+
+
+def deviation(start: Sequence, end: Sequence, point: Sequence) -> float:
+    # Meters from point to the segment start-end, on a local flat projection
+    scale = cos(radians(start[2]))
+
+    def project(row: Sequence) -> tuple[float, float]:
+        return (
+            radians(row[3] - start[3]) * scale * EARTH_RADIUS_M,
+            radians(row[2] - start[2]) * EARTH_RADIUS_M,
+        )
+
+    (x2, y2), (x, y) = project(end), project(point)
+    length = x2 * x2 + y2 * y2
+    t = 0.0 if length == 0 else max(0.0, min(1.0, (x * x2 + y * y2) / length))
+    return hypot(x - t * x2, y - t * y2)
+
+
+# Opening window simplification, the streaming form of Douglas-Peucker. Fixes
+# are held back while the segment from the last kept fix to the newest one
+# passes within `tolerance` meters of all of them. A parked tracker still keeps
+# one fix per `max_gap` seconds, and the window never grows past `max_buffer`.
+class TrackSimplifier:
+    def __init__(
+        self,
+        tolerance: float = TRACK_TOLERANCE,
+        max_gap: float = TRACK_MAX_GAP,
+        max_buffer: int = TRACK_MAX_BUFFER,
+    ):
+        self.tolerance = tolerance
+        self.max_gap = max_gap
+        self.max_buffer = max_buffer
+        self._anchor: Optional[Sequence] = None
+        self._buffer: list[Sequence] = []
+
+    def add(self, row: Sequence) -> list[Sequence]:
+        anchor = self._anchor
+        if anchor is None:
+            self._anchor = row
+            return [row]
+
+        if (
+            len(self._buffer) < self.max_buffer
+            and row[0] - anchor[0] < self.max_gap
+            and all(
+                deviation(anchor, row, held) <= self.tolerance for held in self._buffer
+            )
+        ):
+            self._buffer.append(row)
+            return []
+
+        if not self._buffer:
+            self._anchor = row
+            return [row]
+        kept, self._buffer = self._buffer[-1], []
+        self._anchor = kept
+        return [kept, *self.add(row)]
+
+    def flush(self) -> list[Sequence]:
+        if not self._buffer:
+            return []
+        kept, self._buffer = self._buffer[-1], []
+        self._anchor = kept
+        return [kept]
+
+
+def _open(path: Path, mode: str):
+    if path.suffix == ".gz":
+        return gzip.open(path, mode, newline="")
+    return open(path, mode, newline="")
+
+
+# One gzip CSV per UTC day, appended to by flushes and read back row by row, so
+# neither recording nor exporting ever holds more than a chunk in memory
+class TrackArchive:
+    def __init__(self, directory: Path):
+        self.directory = directory
+
+    def _day_path(self, day: date) -> Path:
+        return self.directory / f"{day.isoformat()}.csv.gz"
+
+    def append(self, rows: Iterable[Sequence]) -> int:
+        by_day: defaultdict[date, list[Sequence]] = defaultdict(list)
+        for row in rows:
+            by_day[datetime.fromtimestamp(int(row[0]), UTC).date()].append(row)
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for day, day_rows in by_day.items():
+            # Every append is a new gzip member, concatenated members are valid gzip
+            with gzip.open(self._day_path(day), "at", newline="") as file:
+                csv.writer(file).writerows(day_rows)
+        return sum(len(day_rows) for day_rows in by_day.values())
+
+    def iter_rows(
+        self,
+        start: datetime,
+        end: datetime,
+        imeis: Optional[set[str]] = None,
+    ) -> Iterator[list[str]]:
+        day = start.astimezone(UTC).date()
+        last_day = end.astimezone(UTC).date()
+        while day <= last_day:
+            if (path := self._day_path(day)).exists():
+                yield from self._read(path, start.timestamp(), end.timestamp(), imeis)
+            day += timedelta(days=1)
+
+    def _read(
+        self,
+        path: Path,
+        start: float,
+        end: float,
+        imeis: Optional[set[str]],
+    ) -> Iterator[list[str]]:
+        with gzip.open(path, "rt", newline="") as file:
+            try:
+                for row in csv.reader(file):
+                    if len(row) != len(TRACK_FIELDS) or not row[0].isdigit():
+                        continue
+                    if start <= int(row[0]) < end and (not imeis or row[1] in imeis):
+                        yield row
+            except (EOFError, gzip.BadGzipFile):
+                # A flush in progress, or one cut short by a crash, ends the file
+                return
+
+    def export(
+        self,
+        path: Path,
+        start: datetime,
+        end: datetime,
+        imeis: Optional[set[str]] = None,
+    ) -> int:
+        exported = 0
+        with _open(path, "wt") as file:
+            writer = csv.writer(file)
+            writer.writerow(TRACK_FIELDS)
+            for row in self.iter_rows(start, end, imeis):
+                writer.writerow(row)
+                exported += 1
+        return exported
+
+    def import_file(self, path: Path) -> int:
+        imported = 0
+        with _open(path, "rt") as file:
+            rows = (
+                row
+                for row in csv.reader(file)
+                if len(row) == len(TRACK_FIELDS) and row[0].isdigit()
+            )
+            while chunk := list(islice(rows, TRACK_IMPORT_CHUNK)):
+                imported += self.append(chunk)
+        return imported
+
+
+class TrackRecorder:
+    def __init__(self, hass: HomeAssistant, archive: TrackArchive):
+        self.hass = hass
+        self.archive = archive
+        self._pending: list[tuple] = []
+        self._simplifiers: dict[str, TrackSimplifier] = {}
+
+    @callback
+    def async_add_fixes(self, fixes: list[DeviceData]) -> None:
+        for data in fixes:
+            if (simplifier := self._simplifiers.get(data.imei)) is None:
+                simplifier = self._simplifiers[data.imei] = TrackSimplifier()
+            self._pending.extend(simplifier.add(fix_row(data)))
+
+    async def async_flush(self, *_) -> None:
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        await self.hass.async_add_executor_job(self.archive.append, rows)
+
+    async def async_close(self) -> None:
+        # The fixes held back by simplification are the latest positions
+        for simplifier in self._simplifiers.values():
+            self._pending.extend(simplifier.flush())
+        await self.async_flush()
+
+
+async def async_setup_tracks(hass: HomeAssistant) -> TrackRecorder:
+    recorder = TrackRecorder(
+        hass,
+        TrackArchive(Path(hass.config.path(STORAGE_DIR, DATA_TRACKS))),
+    )
+    async_track_time_interval(
+        hass,
+        recorder.async_flush,
+        timedelta(seconds=TRACK_FLUSH_INTERVAL),
+        cancel_on_shutdown=True,
+    )
+
+    async def flush_on_stop(event: Event) -> None:
+        await recorder.async_close()
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_FINAL_WRITE, flush_on_stop)
+    hass.data[DATA_TRACKS] = recorder
+    return recorder
+
+
+@callback
+def async_record_tracks(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: _365GPSDataUpdateCoordinator,
+) -> Optional[Callable[[], None]]:
+    if not entry.options.get(CONF_TRACKS, False):
+        return None
+    return coordinator.async_add_fix_listener(hass.data[DATA_TRACKS].async_add_fixes)
@@ -1,15 +1,155 @@
+import asyncio
+import codecs
+import gzip
+import hashlib
+import json
 import os
+from collections import Counter
+from importlib import import_module
 from pathlib import Path
+from typing import Optional
+from uuid import uuid4
 
 import aiohttp
 import pytest
 import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
 from dotenv import load_dotenv
+from homeassistant.core import HomeAssistant
+
+from tests.helpers import FaultMix
+
+_365GPSAPI = import_module("custom_components.365gps.api")._365GPSAPI
+_365GPSDataUpdateCoordinator = import_module(
+    "custom_components.365gps.coordinator",
+)._365GPSDataUpdateCoordinator
 
 
 load_dotenv(Path(__file__).parent.parent / ".env")
 
 
+class StandInServer:
+    def __init__(self):
+        self.devices: list[dict] = []
+        self.savings: dict[str, str] = {}
+        self.delay = 0.0
+        self.etag = False
+        self.compress = False
+        self.hits: Counter[str] = Counter()
+        self.sav_hits: Counter[str] = Counter()
+        self.failing_sav: set[str] = set()
+        self.failing_commands: set[str] = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.faults: Optional[FaultMix] = None
+        self.faulted: Counter[str] = Counter()
+        self.slow_delay = 1.0
+
+        app = web.Application()
+        app.router.add_post("/{endpoint}", self.handle)
+        self.server = TestServer(app)
+
+    @property
+    def host(self) -> str:
+        return f"{self.server.host}:{self.server.port}"
+
+    async def handle(self, request: web.Request) -> web.Response:
+        endpoint = request.match_info["endpoint"]
+        self.hits[endpoint] += 1
+        fault = self.faults.pick(endpoint) if self.faults is not None else None
+        if fault is not None:
+            self.faulted[request.query.get("imei")] += 1
+
+        # Built on arrival, a delayed response carries the state it was asked for
+        if endpoint == "wx_ilist.php":
+            response = self.ilist(request)
+        elif endpoint == "wx_sav.php":
+            imei = request.query["imei"]
+            self.sav_hits[imei] += 1
+            if imei in self.failing_sav:
+                response = web.Response(status=500)
+            else:
+                saving = self.savings.get(imei, "0" * 26)
+                response = web.json_response([{"saving": saving, "log": ""}])
+        elif request.query.get("imei") in self.failing_commands:
+            response = web.Response(status=500)
+        else:
+            response = web.json_response({"result": "ok"})
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if fault is not None:
+                response = await self.inject(fault, request, response)
+        finally:
+            self.in_flight -= 1
+        return response
+
+    async def inject(
+        self,
+        fault: str,
+        request: web.Request,
+        response: web.Response,
+    ) -> web.StreamResponse:
+        body = response.body or b""
+        if fault == "slow":
+            await asyncio.sleep(self.slow_delay)
+            return response
+        if fault == "error":
+            return web.Response(status=503)
+        if fault == "html":
+            return web.Response(text="<html>Busy</html>", content_type="text/html")
+        if fault == "bom":
+            return web.Response(
+                body=codecs.BOM_UTF8 + body,
+                content_type="application/json",
+            )
+        if fault == "utf16":
+            return web.Response(
+                body=body.decode().encode("utf-16"),
+                content_type="application/json",
+            )
+        if fault == "truncated_gzip":
+            compressed = gzip.compress(body)
+            return web.Response(
+                body=compressed[: len(compressed) // 2],
+                content_type="application/json",
+                headers={"Content-Encoding": "gzip"},
+            )
+        if fault == "partial":
+            # Promises the whole body, sends half and hangs up
+            partial = web.StreamResponse(headers={"Content-Length": str(len(body))})
+            partial.content_type = "application/json"
+            await partial.prepare(request)
+            await partial.write(body[: len(body) // 2])
+            request.transport.close()
+            return partial
+        if fault == "reset":
+            request.transport.close()
+            return response
+        raise ValueError(fault)
+
+    def ilist(self, request: web.Request) -> web.Response:
+        body = json.dumps(self.devices).encode()
+        headers = {}
+        if self.etag:
+            headers["ETag"] = f'"{hashlib.md5(body).hexdigest()}"'
+            if request.headers.get("If-None-Match") == headers["ETag"]:
+                return web.Response(status=304, headers=headers)
+
+        response = web.Response(
+            body=body,
+            content_type="application/json",
+            headers=headers,
+        )
+        if self.compress:
+            response.enable_compression()
+        return response
+
+
 @pytest.fixture
 def credentials():
     username = os.environ.get("TEST_USERNAME")
@@ -23,3 +163,41 @@ def credentials():
 async def session():
     async with aiohttp.ClientSession() as session:
         yield session
+
+
+@pytest_asyncio.fixture
+async def stand_in_server():
+    server = StandInServer()
+    await server.server.start_server()
+    yield server
+    await server.server.close()
+
+
+@pytest_asyncio.fixture
+async def stand_in_mirror(stand_in_server):
+    # Another host serving the same account
+    mirror = StandInServer()
+    await mirror.server.start_server()
+    yield mirror
+    await mirror.server.close()
+
+
+@pytest.fixture
+def local_api(stand_in_server, session):
+    # Unique username, so every test gets a fresh per-account rate governor
+    api = _365GPSAPI(uuid4().hex, "password", session)
+    api.hosts = (stand_in_server.host,)
+    api.scheme = "http"
+    return api
+
+
+@pytest_asyncio.fixture
+async def hass(tmp_path):
+    # Bare instance, enough to host a coordinator without starting Home Assistant
+    return HomeAssistant(str(tmp_path))
+
+
+@pytest.fixture
+def coordinator(hass, local_api):
+    local_api.ilist_cache_ttl = 0
+    return _365GPSDataUpdateCoordinator(api=local_api, hass=hass, config_entry=None)
@@ -0,0 +1,71 @@
+import random
+from collections import Counter
+from typing import Collection, Optional
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_devices(count: int) -> list[dict]:
+    return [
+        {
+            "login": "",
+            "imei": f"{860000000000000 + i}",
+            "name": f"Tracker {i}",
+            "carno": "",
+            "gps": f"2024-05-01 12:00:00,0,0,0,90,{55 + i / 1e4},{37 + i / 1e4},150",
+            "log": "IN",
+            "speed": float(i % 50),
+            "bat": "80",
+            "device": "TK",
+            "ver": "1.0;build",
+            "sec": "10",
+            "level": "4",
+            "onoff": "1",
+            "expdate": None,
+            "iccid": "",
+            "startdate": "2024-01-01",
+        }
+        for i in range(count)
+    ]
+
+
+class FaultMix:
+    # Draws the fault for each request from a seeded generator, a run always
+    # injects the same faults in the same order
+    def __init__(
+        self,
+        weights: dict[str, float],
+        seed: int = 0,
+        endpoints: Optional[Collection[str]] = None,
+    ):
+        self.weights = weights
+        self.seed = seed
+        self.endpoints = endpoints
+        self.injected: Counter[str] = Counter()
+        self._random = random.Random(seed)
+
+    def _draw(self, generator: random.Random) -> Optional[str]:
+        point = generator.random()
+        for fault, weight in self.weights.items():
+            if point < weight:
+                return fault
+            point -= weight
+        return None
+
+    def plan(self, count: int) -> list[Optional[str]]:
+        # The faults the first `count` requests will see
+        generator = random.Random(self.seed)
+        return [self._draw(generator) for _ in range(count)]
+
+    def pick(self, endpoint: str) -> Optional[str]:
+        if self.endpoints is not None and endpoint not in self.endpoints:
+            return None
+        if (fault := self._draw(self._random)) is not None:
+            self.injected[fault] += 1
+        return fault
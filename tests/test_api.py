@@ -1,10 +1,16 @@
-from datetime import datetime, time, UTC
+import asyncio
+from datetime import UTC, datetime, time
 from importlib import import_module
 
+import aiohttp
 import pytest
 from homeassistant.exceptions import IntegrationError
 
+from tests.helpers import make_devices
+
 api_module = import_module("custom_components.365gps.api")
+AK_EPOCH = api_module.AK_EPOCH
+AK_RESYNC_INTERVAL = import_module("custom_components.365gps.const").AK_RESYNC_INTERVAL
 Saving = api_module.Saving
 _365GPSAPI = api_module._365GPSAPI
 decode_content = api_module.decode_content
@@ -23,16 +29,30 @@ class TestDecodeContent:
         content = b'\xef\xbb\xbf{"result": "ok"}'
         assert decode_content(content) == {"result": "ok"}
 
+    def test_utf16_bom(self):
+        content = '{"result": "ok"}'.encode("utf-16")
+        assert decode_content(content) == {"result": "ok"}
+
     def test_invalid_json_raises_integration_error(self):
         with pytest.raises(IntegrationError):
             decode_content(b"not json")
 
+    def test_undecodable_bytes_raise_integration_error(self):
+        content = b'{"result": "\xff"}'
+        with pytest.raises(IntegrationError) as info:
+            decode_content(content)
+        assert info.value.args == (content,)
+
 
 class TestSaving:
     def test_str(self):
         saving = Saving("00000000000000000000000000")
         assert str(saving) == "00000000000000000000000000"
 
+    def test_equality(self):
+        assert Saving("0" * 26) == Saving("0" * 26)
+        assert Saving("0" * 26) != Saving("1" * 26)
+
     def test_remote_true(self):
         saving = Saving("00000000000000000000000000")
         assert saving.remote is True
@@ -85,6 +105,49 @@ class TestSaving:
         assert str(saving)[22:26] == "0745"
 
 
+class TestRequestTemplate:
+    def test_ak(self, monkeypatch):
+        monkeypatch.setattr(api_module, "wall_time", lambda: AK_EPOCH + 0x100)
+        api = _365GPSAPI("user", "password", None)
+        assert api.ak == "10070"
+
+        # Carried on the monotonic clock until the next resync
+        monkeypatch.setattr(api_module, "wall_time", lambda: AK_EPOCH + 0x200)
+        assert api.ak == "10070"
+        api._ak_synced -= AK_RESYNC_INTERVAL
+        assert api.ak == "20070"
+
+    def test_ak_follows_the_wall_clock(self):
+        api = _365GPSAPI("user", "password", None)
+        elapsed = datetime.now(UTC).timestamp() - AK_EPOCH
+        assert api.ak.endswith("70")
+        assert abs(int(api.ak[:-2], 16) - elapsed) <= 1
+
+    def test_query(self):
+        api = _365GPSAPI("user", "password", None)
+        template = api._template("wx_sav.php")
+        assert template.urls == tuple(
+            f"https://{host}/wx_sav.php" for host in _365GPSAPI.hosts
+        )
+        query = api._query(template, {"imei": "1"})
+        assert query == {
+            "ver": "2.0",
+            "app": "wx",
+            "ak": api.ak,
+            "hw": "web",
+            "imei": "1",
+        }
+        assert template.params["ak"] == ""
+        assert api._template("wx_sav.php") is template
+
+    def test_templates_follow_hosts(self):
+        api = _365GPSAPI("user", "password", None)
+        api._template("wx_sav.php")
+        api.hosts = ("127.0.0.1:8080",)
+        api.scheme = "http"
+        assert api._template("wx_sav.php").urls == ("http://127.0.0.1:8080/wx_sav.php",)
+
+
 @pytest.mark.asyncio
 @pytest.mark.flaky(reruns=5, reruns_exceptions=(TimeoutError,))
 class TestAPI:
@@ -162,3 +225,133 @@ class TestAPI:
         result = await api.clear_notifications()
         assert isinstance(result, dict)
         assert "result" in result
+
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+    async def test_concurrent_ilist_shares_one_request(
+        self, stand_in_server, local_api
+    ):
+        stand_in_server.devices = make_devices(3)
+        stand_in_server.delay = 0.05
+        results = await asyncio.gather(*(local_api.get_ilist() for _ in range(10)))
+        assert stand_in_server.hits["wx_ilist.php"] == 1
+        assert all(result == stand_in_server.devices for result in results)
+
+    async def test_ilist_cache_window(self, stand_in_server, local_api):
+        await local_api.get_ilist()
+        await local_api.get_ilist()
+        assert stand_in_server.hits["wx_ilist.php"] == 1
+
+        local_api.ilist_cache_ttl = 0
+        await local_api.get_ilist()
+        assert stand_in_server.hits["wx_ilist.php"] == 2
+
+    async def test_command_invalidates_cache(self, stand_in_server, local_api):
+        await local_api.get_ilist()
+        await local_api.set_utime("1", 600)
+        await local_api.get_ilist()
+        assert stand_in_server.hits["wx_ilist.php"] == 2
+
+    async def test_concurrent_sav_is_keyed_by_imei(self, stand_in_server, local_api):
+        stand_in_server.delay = 0.05
+        await asyncio.gather(
+            local_api.get_sav("1"),
+            local_api.get_sav("1"),
+            local_api.get_sav("2"),
+        )
+        assert stand_in_server.hits["wx_sav.php"] == 2
+
+    async def test_cancelled_caller_does_not_cancel_shared_read(
+        self,
+        stand_in_server,
+        local_api,
+    ):
+        stand_in_server.delay = 0.05
+        first = asyncio.ensure_future(local_api.get_ilist())
+        second = asyncio.ensure_future(local_api.get_ilist())
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == []
+        assert stand_in_server.hits["wx_ilist.php"] == 1
+
+    async def test_failure_is_shared(self, stand_in_server, local_api):
+        local_api.hosts = ("127.0.0.1:1",)
+        results = await asyncio.gather(
+            local_api.get_ilist(),
+            local_api.get_ilist(),
+            return_exceptions=True,
+        )
+        assert all(isinstance(result, aiohttp.ClientError) for result in results)
+        assert local_api._inflight == {}
+
+
+@pytest.mark.asyncio
+class TestConditionalTransfer:
+    @pytest.fixture
+    def fleet(self, stand_in_server, local_api):
+        stand_in_server.devices = make_devices(5000)
+        local_api.ilist_cache_ttl = 0
+        return stand_in_server.devices
+
+    async def test_unchanged_content_keeps_revision(self, fleet, local_api):
+        first = await local_api.get_ilist()
+        revision = local_api.ilist_revision
+        second = await local_api.get_ilist()
+        assert second is first
+        assert local_api.ilist_revision == revision
+        assert local_api.transfer_stats.unchanged == 1
+
+    async def test_etag_not_modified(self, fleet, stand_in_server, local_api):
+        stand_in_server.etag = True
+        first = await local_api.get_ilist()
+        second = await local_api.get_ilist()
+        assert second is first
+        assert len(second) == 5000
+        assert local_api.transfer_stats.not_modified == 1
+
+    async def test_changed_content_bumps_revision(
+        self,
+        fleet,
+        stand_in_server,
+        local_api,
+    ):
+        stand_in_server.etag = True
+        await local_api.get_ilist()
+        revision = local_api.ilist_revision
+        fleet[0]["bat"] = "79"
+        result = await local_api.get_ilist()
+        assert local_api.ilist_revision == revision + 1
+        assert result[0]["bat"] == "79"
+
+    async def test_command_forgets_validators(self, fleet, stand_in_server, local_api):
+        stand_in_server.etag = True
+        await local_api.get_ilist()
+        revision = local_api.ilist_revision
+        await local_api.set_utime(fleet[0]["imei"], 600)
+        await local_api.get_ilist()
+        assert local_api.ilist_revision == revision + 1
+        assert local_api.transfer_stats.not_modified == 0
+
+    async def test_compressed_transfer(self, fleet, stand_in_server, local_api):
+        stand_in_server.compress = True
+        await local_api.get_ilist()
+        stats = local_api.transfer_stats
+        assert stats.encodings["identity"] == 0
+        assert stats.wire_bytes < stats.decoded_bytes
+        assert stats.compression_ratio > 5
+
+    async def test_command_during_fetch_is_not_cached(self, stand_in_server, local_api):
+        stand_in_server.devices = make_devices(1)
+        stand_in_server.delay = 0.05
+        stale = asyncio.ensure_future(local_api.get_ilist())
+        await asyncio.sleep(0.01)
+        stand_in_server.delay = 0
+        await local_api.set_utime(stand_in_server.devices[0]["imei"], 600)
+        stand_in_server.devices[0]["sec"] = "600"
+
+        fresh = await local_api.get_ilist()
+        assert fresh[0]["sec"] == "600"
+        assert (await stale)[0]["sec"] == "10"
+        assert (await local_api.get_ilist())[0]["sec"] == "600"
+        assert stand_in_server.hits["wx_ilist.php"] == 2
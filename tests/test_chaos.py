@@ -0,0 +1,257 @@
+import random
+from collections import Counter
+from importlib import import_module
+from time import monotonic
+
+import aiohttp
+import pytest
+from homeassistant.exceptions import IntegrationError
+
+from tests.helpers import FaultMix, make_devices
+
+api_module = import_module("custom_components.365gps.api")
+
+POLLS = 20
+TIMEOUT = 0.2
+# Fixed seed, every run sees the same faults in the same order
+SEED = 1
+# Served as usual once the client has decoded them
+HARMLESS = (None, "bom", "utf16")
+
+MIXES = {
+    "timeouts": {"slow": 0.3},
+    "errors": {"error": 0.3},
+    "disconnects": {"reset": 0.15, "partial": 0.15},
+    "garbage": {"html": 0.15, "truncated_gzip": 0.15},
+    "encodings": {"bom": 0.3, "utf16": 0.3},
+    "everything": {
+        fault: 0.05
+        for fault in (
+            "slow",
+            "error",
+            "reset",
+            "partial",
+            "html",
+            "truncated_gzip",
+            "bom",
+            "utf16",
+        )
+    },
+}
+
+
+@pytest.fixture
+def chaos_api(local_api, stand_in_server):
+    stand_in_server.devices = make_devices(5)
+    stand_in_server.slow_delay = TIMEOUT * 3
+    local_api.timeout = TIMEOUT
+    local_api.ilist_cache_ttl = 0
+    return local_api
+
+
+@pytest.mark.asyncio
+class TestFaults:
+    @pytest.mark.parametrize(
+        ("fault", "error"),
+        [
+            ("slow", TimeoutError),
+            ("error", aiohttp.ClientResponseError),
+            ("reset", aiohttp.ServerDisconnectedError),
+            ("partial", aiohttp.ClientPayloadError),
+            ("html", IntegrationError),
+            ("truncated_gzip", IntegrationError),
+        ],
+    )
+    async def test_fault_fails_one_request(
+        self,
+        chaos_api,
+        stand_in_server,
+        fault,
+        error,
+    ):
+        stand_in_server.faults = FaultMix({fault: 1}, endpoints={"wx_ilist.php"})
+        with pytest.raises(error):
+            await chaos_api.get_ilist()
+        assert stand_in_server.faults.injected == {fault: 1}
+
+        # The connection pool and the cache recover on the next request
+        stand_in_server.faults = None
+        assert len(await chaos_api.get_ilist()) == 5
+        assert chaos_api.ilist_revision == 1
+
+    @pytest.mark.parametrize("fault", ["bom", "utf16"])
+    async def test_byte_order_marks(self, chaos_api, stand_in_server, fault):
+        stand_in_server.faults = FaultMix({fault: 1})
+        assert await chaos_api.get_ilist() == stand_in_server.devices
+        assert (await chaos_api.get_sav(stand_in_server.devices[0]["imei"]))[0][
+            "saving"
+        ] == "0" * 26
+
+    async def test_non_json_keeps_the_raw_body(self, chaos_api, stand_in_server):
+        stand_in_server.faults = FaultMix({"html": 1})
+        with pytest.raises(IntegrationError) as info:
+            await chaos_api.get_ilist()
+        assert info.value.__cause__.args == (b"<html>Busy</html>",)
+
+    async def test_slow_request_is_bounded_by_the_timeout(
+        self,
+        chaos_api,
+        stand_in_server,
+    ):
+        stand_in_server.faults = FaultMix({"slow": 1})
+        started = monotonic()
+        with pytest.raises(TimeoutError):
+            await chaos_api.get_ilist()
+        assert monotonic() - started < TIMEOUT + 0.3
+
+
+@pytest.fixture
+def chaos_coordinator(coordinator, chaos_api):
+    coordinator.profiler.enabled = True
+    return coordinator
+
+
+def assert_available(coordinator, imeis):
+    assert coordinator.last_update_success
+    assert coordinator.data.keys() == imeis
+    assert all(coordinator.is_device_available(imei) for imei in imeis)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("weights", MIXES.values(), ids=MIXES.keys())
+async def test_polls_under_fault_mix(chaos_coordinator, stand_in_server, weights):
+    coordinator = chaos_coordinator
+    imeis = {device["imei"] for device in stand_in_server.devices}
+    stand_in_server.faults = FaultMix(weights, seed=SEED, endpoints={"wx_ilist.php"})
+    # One device list per poll, so the plan says which polls are hit
+    plan = stand_in_server.faults.plan(POLLS)
+
+    lags = []
+    started = monotonic()
+    for fault in plan:
+        previous = coordinator.data
+        poll_started = monotonic()
+        await coordinator.async_refresh()
+        lags.append(monotonic() - poll_started)
+
+        if fault in HARMLESS:
+            # A good poll brings everything back at once
+            assert_available(coordinator, imeis)
+        else:
+            assert not coordinator.last_update_success
+            assert not any(coordinator.is_device_available(imei) for imei in imeis)
+            assert coordinator.data is previous
+    elapsed = monotonic() - started
+
+    assert stand_in_server.faults.injected == Counter(
+        fault for fault in plan if fault is not None
+    )
+    assert coordinator.profiler.as_dict()["polls"] == POLLS
+    # Poll lag: no fault holds a poll past the request timeout
+    assert max(lags) < TIMEOUT + 0.3
+    # Throughput: only the timed out polls wait, the rest run at full speed
+    assert elapsed < plan.count("slow") * TIMEOUT + POLLS * 0.1
+
+
+@pytest.mark.asyncio
+async def test_sluggish_server_keeps_every_poll(chaos_coordinator, stand_in_server):
+    coordinator = chaos_coordinator
+    imeis = {device["imei"] for device in stand_in_server.devices}
+    stand_in_server.slow_delay = TIMEOUT / 4
+    stand_in_server.faults = FaultMix({"slow": 0.5}, seed=SEED)
+
+    started = monotonic()
+    for _ in range(POLLS):
+        await coordinator.async_refresh()
+        assert_available(coordinator, imeis)
+    elapsed = monotonic() - started
+
+    slow = stand_in_server.faults.injected["slow"]
+    assert slow >= POLLS / 4
+    assert elapsed < slow * stand_in_server.slow_delay + POLLS * 0.1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "weights",
+    [
+        MIXES["timeouts"],
+        MIXES["errors"],
+        MIXES["disconnects"],
+        MIXES["garbage"],
+        {"slow": 0.1, "error": 0.1, "reset": 0.1, "html": 0.1},
+    ],
+    ids=["timeouts", "errors", "disconnects", "garbage", "mixed"],
+)
+async def test_saving_faults_stay_with_their_device(
+    chaos_coordinator,
+    stand_in_server,
+    weights,
+):
+    coordinator = chaos_coordinator
+    imeis = {device["imei"] for device in stand_in_server.devices}
+    stand_in_server.faults = FaultMix(weights, seed=SEED, endpoints={"wx_sav.php"})
+
+    for _ in range(POLLS):
+        before = Counter(stand_in_server.faulted)
+        await coordinator.async_refresh()
+        hit = set(stand_in_server.faulted - before)
+        if not coordinator.last_update_success:
+            # Only a poll losing every device fails as a whole
+            assert hit == imeis
+            continue
+        # Devices failing on the first poll have no snapshot to fall back on
+        assert coordinator.data.keys() >= imeis - hit
+        for imei in imeis:
+            if imei in hit:
+                assert not coordinator.is_device_available(imei)
+            elif imei in coordinator.unavailable:
+                # Left out until the breaker lets a probe through
+                assert coordinator.breaker.is_open(imei)
+            else:
+                assert coordinator.is_device_available(imei)
+
+    assert stand_in_server.faults.injected
+
+
+@pytest.mark.asyncio
+async def test_one_failing_mirror(
+    chaos_coordinator,
+    chaos_api,
+    stand_in_server,
+    stand_in_mirror,
+    monkeypatch,
+):
+    coordinator = chaos_coordinator
+    imeis = {device["imei"] for device in stand_in_server.devices}
+    stand_in_mirror.devices = stand_in_server.devices
+    stand_in_mirror.faults = FaultMix({"error": 1})
+    chaos_api.hosts = (stand_in_server.host, stand_in_mirror.host)
+    # Seeded mirror choice
+    monkeypatch.setattr(api_module, "random", random.Random(SEED))
+
+    for _ in range(POLLS):
+        before = stand_in_mirror.hits["wx_ilist.php"]
+        saving_before = Counter(stand_in_mirror.sav_hits)
+        await coordinator.async_refresh()
+        if stand_in_mirror.hits["wx_ilist.php"] > before:
+            assert not coordinator.last_update_success
+            continue
+        hit = set(stand_in_mirror.sav_hits - saving_before)
+        if hit == imeis:
+            assert not coordinator.last_update_success
+            continue
+        assert coordinator.last_update_success
+        for imei in imeis:
+            if imei in hit:
+                assert not coordinator.is_device_available(imei)
+            elif imei not in coordinator.unavailable:
+                assert coordinator.is_device_available(imei)
+
+    # The healthy mirror carried the polls the broken one did not
+    assert stand_in_mirror.hits["wx_ilist.php"]
+    assert stand_in_server.hits["wx_ilist.php"]
+    assert (
+        stand_in_server.hits["wx_ilist.php"] + stand_in_mirror.hits["wx_ilist.php"]
+        == POLLS
+    )
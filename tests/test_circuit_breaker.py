@@ -0,0 +1,60 @@
+from importlib import import_module
+
+from tests.helpers import FakeClock
+
+CircuitBreaker = import_module(
+    "custom_components.365gps.circuit_breaker"
+).CircuitBreaker
+
+
+class TestCircuitBreaker:
+    def test_closed_by_default(self):
+        breaker = CircuitBreaker(threshold=3, probe_interval=300, clock=FakeClock())
+        assert breaker.allow("imei") is True
+        assert breaker.is_open("imei") is False
+
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker(threshold=3, probe_interval=300, clock=FakeClock())
+        for _ in range(2):
+            breaker.record_failure("imei")
+            assert breaker.allow("imei") is True
+        breaker.record_failure("imei")
+        assert breaker.is_open("imei") is True
+        assert breaker.allow("imei") is False
+
+    def test_success_resets_failures(self):
+        breaker = CircuitBreaker(threshold=3, probe_interval=300, clock=FakeClock())
+        breaker.record_failure("imei")
+        breaker.record_failure("imei")
+        breaker.record_success("imei")
+        breaker.record_failure("imei")
+        assert breaker.failures("imei") == 1
+        assert breaker.allow("imei") is True
+
+    def test_half_open_single_probe(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(threshold=1, probe_interval=300, clock=clock)
+        breaker.record_failure("imei")
+        clock.now = 299
+        assert breaker.allow("imei") is False
+        clock.now = 300
+        assert breaker.allow("imei") is True
+        assert breaker.allow("imei") is False
+
+    def test_failed_probe_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(threshold=1, probe_interval=300, clock=clock)
+        breaker.record_failure("imei")
+        clock.now = 300
+        assert breaker.allow("imei") is True
+        breaker.record_failure("imei")
+        clock.now = 599
+        assert breaker.allow("imei") is False
+        clock.now = 600
+        assert breaker.allow("imei") is True
+
+    def test_keys_are_isolated(self):
+        breaker = CircuitBreaker(threshold=1, probe_interval=300, clock=FakeClock())
+        breaker.record_failure("bad")
+        assert breaker.allow("bad") is False
+        assert breaker.allow("good") is True
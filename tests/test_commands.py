@@ -0,0 +1,154 @@
+import asyncio
+from functools import partial
+from importlib import import_module
+
+import pytest
+import pytest_asyncio
+
+from tests.helpers import make_devices
+
+commands_module = import_module("custom_components.365gps.commands")
+const_module = import_module("custom_components.365gps.const")
+CommandState = const_module.CommandState
+EVENT_COMMAND = commands_module.EVENT_COMMAND
+
+
+@pytest.mark.asyncio
+class TestCommandExecutor:
+    @pytest_asyncio.fixture
+    async def imei(self, coordinator, stand_in_server):
+        stand_in_server.devices = make_devices(1)
+        stand_in_server.devices[0]["onoff"] = "0"
+        await coordinator.async_refresh()
+        return stand_in_server.devices[0]["imei"]
+
+    @pytest.fixture
+    def events(self, hass):
+        events = []
+        hass.bus.async_listen(EVENT_COMMAND, lambda event: events.append(event.data))
+        return events
+
+    def submit_led(self, coordinator, imei, value=True):
+        return coordinator.commands.async_submit(
+            imei,
+            "led",
+            partial(coordinator.api.set_led, imei, value=value),
+            expect=lambda data: data.led == value,
+        )
+
+    async def test_submit_returns_before_the_request(
+        self,
+        coordinator,
+        stand_in_server,
+        imei,
+    ):
+        stand_in_server.delay = 0.2
+        command = self.submit_led(coordinator, imei)
+        assert command.state == CommandState.PENDING
+        assert not command.task.done()
+        assert coordinator.commands.latest[imei] is command
+        coordinator.commands.async_cancel_all()
+
+    async def test_confirmed_by_a_later_poll(
+        self,
+        hass,
+        coordinator,
+        stand_in_server,
+        imei,
+        events,
+    ):
+        coordinator.commands.confirm_timeout = 5
+        command = self.submit_led(coordinator, imei)
+        await asyncio.sleep(0.1)
+        assert command.state == CommandState.PENDING
+
+        stand_in_server.devices[0]["onoff"] = "1"
+        await coordinator.async_refresh()
+        await command.task
+        await hass.async_block_till_done()
+        assert command.state == CommandState.CONFIRMED
+        assert events == [command.as_dict()]
+
+    async def test_not_confirmed(self, coordinator, imei):
+        coordinator.commands.confirm_timeout = 0.1
+        command = self.submit_led(coordinator, imei)
+        await command.task
+        assert command.state == CommandState.FAILED
+        assert command.error == "not confirmed by the device"
+
+    async def test_already_applied(self, coordinator, imei):
+        command = self.submit_led(coordinator, imei, value=False)
+        await command.task
+        assert command.state == CommandState.CONFIRMED
+
+    async def test_request_failure(self, coordinator, stand_in_server, imei):
+        stand_in_server.failing_commands.add(imei)
+        command = self.submit_led(coordinator, imei)
+        await command.task
+        assert command.state == CommandState.FAILED
+        assert command.error
+
+    async def test_timed_out_request_is_cancelled(
+        self,
+        coordinator,
+        stand_in_server,
+        imei,
+    ):
+        stand_in_server.delay = 1
+        coordinator.commands.timeout = 0.05
+        command = self.submit_led(coordinator, imei)
+        await command.task
+        assert command.state == CommandState.FAILED
+        assert command.error == "timed out"
+
+    async def test_without_expectation(self, coordinator, imei):
+        command = coordinator.commands.async_submit(
+            imei,
+            "reboot",
+            partial(coordinator.api.reboot, imei),
+        )
+        await command.task
+        assert command.state == CommandState.CONFIRMED
+
+    async def test_newer_command_supersedes(self, coordinator, stand_in_server, imei):
+        stand_in_server.delay = 0.2
+        first = self.submit_led(coordinator, imei)
+        second = self.submit_led(coordinator, imei, value=False)
+        await asyncio.sleep(0)
+        assert first.state == CommandState.CANCELLED
+        assert first.task.cancelled()
+        assert coordinator.commands.latest[imei] is second
+        await second.task
+        assert second.state == CommandState.CONFIRMED
+
+    async def test_cancel(self, coordinator, stand_in_server, imei):
+        stand_in_server.delay = 0.2
+        command = self.submit_led(coordinator, imei)
+        assert coordinator.commands.async_cancel(command.id)
+        assert not coordinator.commands.async_cancel(command.id)
+        await asyncio.sleep(0)
+        assert command.state == CommandState.CANCELLED
+        assert command.task.cancelled()
+        assert coordinator.commands.pending == []
+
+    async def test_next_saving_builds_on_pending_writes(
+        self,
+        coordinator,
+        stand_in_server,
+        imei,
+    ):
+        stand_in_server.delay = 0.2
+        saving = coordinator.commands.next_saving(imei)
+        saving.power_saving = True
+        coordinator.commands.async_submit(
+            imei,
+            "set_sav",
+            partial(coordinator.api.set_sav, imei=imei, saving=saving),
+            expect=lambda data: data.saving == saving,
+            value=saving,
+        )
+        following = coordinator.commands.next_saving(imei)
+        assert following.power_saving
+        assert following is not saving
+        assert not coordinator.data[imei].saving.power_saving
+        coordinator.commands.async_cancel_all()
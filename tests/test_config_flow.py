@@ -0,0 +1,72 @@
+from importlib import import_module
+from time import monotonic
+
+import pytest
+
+from tests.helpers import FaultMix, make_devices
+
+config_flow_module = import_module("custom_components.365gps.config_flow")
+DATA_LOGINS = config_flow_module.DATA_LOGINS
+LOGIN_CACHE_TTL = import_module("custom_components.365gps.const").LOGIN_CACHE_TTL
+_365GPSAPI = import_module("custom_components.365gps.api")._365GPSAPI
+async_check_login = config_flow_module.async_check_login
+pop_login = config_flow_module.pop_login
+
+
+@pytest.mark.asyncio
+class TestCheckLogin:
+    async def test_valid(self, local_api, stand_in_server):
+        stand_in_server.devices = make_devices(2)
+        assert await async_check_login(local_api) == (None, stand_in_server.devices)
+
+    async def test_refused(self, local_api, stand_in_server):
+        stand_in_server.devices = {"result": "fail"}
+        assert await async_check_login(local_api) == ("invalid_auth", [])
+
+    async def test_unreachable(self, local_api):
+        local_api.hosts = ("127.0.0.1:1",)
+        assert await async_check_login(local_api) == ("cannot_connect", [])
+
+    async def test_server_error(self, local_api, stand_in_server):
+        stand_in_server.faults = FaultMix({"error": 1})
+        assert await async_check_login(local_api) == ("cannot_connect", [])
+
+    async def test_unreadable(self, local_api, stand_in_server):
+        stand_in_server.faults = FaultMix({"html": 1})
+        assert await async_check_login(local_api) == ("invalid_response", [])
+
+
+@pytest.mark.asyncio
+async def test_first_refresh_reuses_the_checked_list(
+    hass,
+    coordinator,
+    stand_in_server,
+):
+    stand_in_server.devices = make_devices(2)
+    hass.data[DATA_LOGINS] = {"user": (monotonic(), stand_in_server.devices)}
+
+    coordinator.api.prime_ilist(pop_login(hass, "user"))
+    await coordinator.async_refresh()
+    assert stand_in_server.hits["wx_ilist.php"] == 0
+    assert coordinator.data.keys() == {
+        device["imei"] for device in stand_in_server.devices
+    }
+    assert pop_login(hass, "user") is None
+
+    # Served once, the next refresh asks the server again
+    await coordinator.async_refresh()
+    assert stand_in_server.hits["wx_ilist.php"] == 1
+
+
+def test_stale_login_is_dropped(hass):
+    hass.data[DATA_LOGINS] = {"user": (monotonic() - LOGIN_CACHE_TTL - 1, [])}
+    assert pop_login(hass, "user") is None
+    assert hass.data[DATA_LOGINS] == {}
+
+
+@pytest.mark.asyncio
+async def test_invalidation_drops_the_primed_list(local_api, stand_in_server):
+    stand_in_server.devices = make_devices(1)
+    local_api.prime_ilist([])
+    local_api.invalidate_cache()
+    assert await local_api.get_ilist() == stand_in_server.devices
@@ -0,0 +1,320 @@
+from dataclasses import FrozenInstanceError
+from datetime import UTC, datetime
+from importlib import import_module
+
+import pytest
+from homeassistant.components.sensor import SensorStateClass
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from tests.helpers import make_devices
+
+api_module = import_module("custom_components.365gps.api")
+coordinator_module = import_module("custom_components.365gps.coordinator")
+const_module = import_module("custom_components.365gps.const")
+datum_module = import_module("custom_components.365gps.datum")
+profiling_module = import_module("custom_components.365gps.profiling")
+Saving = api_module.Saving
+parse_device_info = coordinator_module.parse_device_info
+parse_devices = coordinator_module.parse_devices
+_365GPSDataUpdateCoordinator = coordinator_module._365GPSDataUpdateCoordinator
+Datum = const_module.Datum
+LocationSource = const_module.LocationSource
+PollProfiler = profiling_module.PollProfiler
+CIRCUIT_BREAKER_THRESHOLD = const_module.CIRCUIT_BREAKER_THRESHOLD
+SAVING_REFRESH_INTERVAL = const_module.SAVING_REFRESH_INTERVAL
+
+
+@pytest.fixture
+def raw_device():
+    return {
+        "imei": "123456789012345",
+        "name": "Tracker",
+        "device": "TK",
+        "ver": "1.0;build",
+        "gps": "2024-05-01 12:00:00,55.75,37.61,0,90,55.7512,37.6184,150",
+        "log": "IN",
+        "speed": 12.0,
+        "bat": "80",
+        "level": "4",
+        "sec": "10",
+        "onoff": "3",
+    }
+
+
+class TestParseDeviceInfo:
+    def test_valid_device(self, raw_device):
+        saving = Saving("00000000000000000000000000")
+        data = parse_device_info(raw_device, saving=saving, sw_version="2.0")
+        assert data.imei == "123456789012345"
+        assert data.hw_version == "1.0"
+        assert data.update_time == datetime(2024, 5, 1, 12, 0, 0, tzinfo=UTC)
+        assert data.latitude == 55.7512
+        assert data.longitude == 37.6184
+        assert data.status == "Moving"
+        assert data.location_source == LocationSource.GPS
+        assert data.battery_level == 80
+        assert data.led is True
+        assert data.speaker is True
+
+    def test_lbs_fix(self, raw_device):
+        raw_device["gps"] = "2024-05-01 12:00:00,55.75,37.61,0,0,55.7512,37.6184,0"
+        raw_device["speed"] = None
+        data = parse_device_info(raw_device, saving=Saving("0" * 26), sw_version="2.0")
+        assert data.location_source == LocationSource.LBS
+
+    def test_snapshot_is_frozen(self, raw_device):
+        data = parse_device_info(raw_device, saving=Saving("0" * 26), sw_version="2.0")
+        assert data.ignore_lbs is False
+        with pytest.raises(FrozenInstanceError):
+            data.ignore_lbs = True
+        assert data.status == "Static"
+
+    @pytest.mark.parametrize(
+        ("key", "value"),
+        [
+            ("gps", "2024-05-01 12:00:00,55.75"),
+            ("gps", "garbage"),
+            ("bat", None),
+            ("onoff", "zz"),
+        ],
+    )
+    def test_malformed_device_raises(self, raw_device, key, value):
+        raw_device[key] = value
+        with pytest.raises((ValueError, TypeError, IndexError)):
+            parse_device_info(raw_device, saving=Saving("0" * 26), sw_version="2.0")
+
+
+@pytest.mark.asyncio
+class TestDeviceIsolation:
+    @pytest.fixture
+    def fleet(self, stand_in_server):
+        stand_in_server.devices = make_devices(3)
+        return stand_in_server.devices
+
+    async def test_bad_record_does_not_fail_others(self, coordinator, fleet):
+        fleet[1]["gps"] = "garbage"
+        fleet[2]["bat"] = None
+        devices = await coordinator.get_device_data()
+        assert devices.keys() == {fleet[0]["imei"]}
+        assert coordinator.unavailable == {fleet[1]["imei"], fleet[2]["imei"]}
+
+    async def test_record_without_imei_is_skipped(self, coordinator, fleet):
+        fleet.append({"name": "no imei"})
+        fleet.append("not a record")
+        devices = await coordinator.get_device_data()
+        assert len(devices) == 3
+
+    async def test_bad_device_keeps_previous_snapshot(
+        self,
+        coordinator,
+        stand_in_server,
+        fleet,
+    ):
+        coordinator.data = await coordinator.get_device_data()
+        previous = coordinator.data[fleet[1]["imei"]]
+
+        stand_in_server.failing_sav.add(fleet[1]["imei"])
+        fleet[0]["bat"] = "70"
+        devices = await coordinator.get_device_data()
+        assert devices[fleet[1]["imei"]] is previous
+        assert devices[fleet[0]["imei"]].battery_level == 70
+        assert coordinator.unavailable == {fleet[1]["imei"]}
+        coordinator.data = devices
+        assert coordinator.is_device_available(fleet[0]["imei"]) is True
+        assert coordinator.is_device_available(fleet[1]["imei"]) is False
+
+    async def test_open_circuit_skips_get_sav(
+        self,
+        coordinator,
+        stand_in_server,
+        fleet,
+    ):
+        bad = fleet[1]["imei"]
+        stand_in_server.failing_sav.add(bad)
+        for _ in range(CIRCUIT_BREAKER_THRESHOLD):
+            coordinator.data = await coordinator.get_device_data()
+        assert coordinator.breaker.is_open(bad)
+        assert stand_in_server.sav_hits[bad] == CIRCUIT_BREAKER_THRESHOLD
+
+        fleet[0]["bat"] = "70"
+        coordinator.data = await coordinator.get_device_data()
+        assert stand_in_server.sav_hits[bad] == CIRCUIT_BREAKER_THRESHOLD
+        assert bad in coordinator.unavailable
+
+    async def test_all_devices_failing_raises(
+        self,
+        coordinator,
+        stand_in_server,
+        fleet,
+    ):
+        stand_in_server.failing_sav.update(device["imei"] for device in fleet)
+        with pytest.raises(UpdateFailed):
+            await coordinator.get_device_data()
+
+    async def test_failed_poll_is_profiled(self, coordinator, stand_in_server, fleet):
+        coordinator.profiler = PollProfiler(enabled=True)
+        stand_in_server.failing_sav.update(device["imei"] for device in fleet)
+        with pytest.raises(UpdateFailed):
+            await coordinator.get_device_data()
+        assert len(coordinator.profiler.polls) == 1
+
+    async def test_single_device_failing_raises(
+        self,
+        coordinator,
+        stand_in_server,
+        fleet,
+    ):
+        del fleet[1:]
+        stand_in_server.failing_sav.add(fleet[0]["imei"])
+        with pytest.raises(UpdateFailed):
+            await coordinator.get_device_data()
+
+
+@pytest.mark.asyncio
+class TestUnchangedPoll:
+    @pytest.fixture
+    def fleet(self, stand_in_server):
+        stand_in_server.devices = make_devices(3)
+        return stand_in_server.devices
+
+    @pytest.fixture
+    def later(self, monkeypatch):
+        def advance():
+            now = coordinator_module.monotonic() + SAVING_REFRESH_INTERVAL
+            monkeypatch.setattr(coordinator_module, "monotonic", lambda: now)
+
+        return advance
+
+    async def test_snapshots_are_reused(self, coordinator, stand_in_server, fleet):
+        coordinator.data = await coordinator.get_device_data()
+        devices = await coordinator.get_device_data()
+        assert devices == coordinator.data
+        assert all(devices[imei] is coordinator.data[imei] for imei in devices)
+        assert sum(stand_in_server.sav_hits.values()) == len(fleet)
+
+    async def test_saving_refreshes_on_its_own_schedule(
+        self,
+        coordinator,
+        stand_in_server,
+        fleet,
+        later,
+    ):
+        coordinator.data = await coordinator.get_device_data()
+        imei = fleet[0]["imei"]
+        stand_in_server.savings[imei] = "1" * 26
+
+        later()
+        devices = await coordinator.get_device_data()
+        assert sum(stand_in_server.sav_hits.values()) == 2 * len(fleet)
+        assert str(devices[imei].saving) == "1" * 26
+        assert devices[fleet[1]["imei"]] is coordinator.data[fleet[1]["imei"]]
+
+    async def test_availability_change_notifies(
+        self,
+        coordinator,
+        stand_in_server,
+        fleet,
+        later,
+        monkeypatch,
+    ):
+        notified = []
+        monkeypatch.setattr(
+            coordinator,
+            "async_update_listeners",
+            lambda: notified.append(set(coordinator.unavailable)),
+        )
+        coordinator.data = await coordinator.get_device_data()
+        stand_in_server.failing_sav.add(fleet[1]["imei"])
+
+        later()
+        devices = await coordinator.get_device_data()
+        assert devices == coordinator.data
+        assert notified == [{fleet[1]["imei"]}]
+
+
+@pytest.mark.asyncio
+async def test_positions_in_china_are_converted(coordinator, stand_in_server):
+    stand_in_server.devices = make_devices(2)
+    stand_in_server.devices[0]["gps"] = "2024-05-01 12:00:00,0,0,0,90,39.915,116.404,50"
+    devices = await coordinator.get_device_data()
+    china, elsewhere = devices.values()
+    assert (china.latitude, china.longitude) == pytest.approx(
+        datum_module.gcj02_to_wgs84(39.915, 116.404),
+    )
+    assert (elsewhere.latitude, elsewhere.longitude) == (55.0, 37.0)
+
+
+@pytest.mark.asyncio
+async def test_ignore_lbs_survives_polls(coordinator, stand_in_server):
+    stand_in_server.devices = make_devices(2)
+    first, second = (device["imei"] for device in stand_in_server.devices)
+    await coordinator.async_refresh()
+    before = coordinator.data
+
+    coordinator.async_set_ignore_lbs(first, True)
+    assert coordinator.data[first].ignore_lbs is True
+    assert before[first].ignore_lbs is False
+    assert coordinator.data[second] is before[second]
+
+    stand_in_server.devices[0]["bat"] = "50"
+    await coordinator.async_refresh()
+    assert coordinator.data[first].battery_level == 50
+    assert coordinator.data[first].ignore_lbs is True
+    assert coordinator.data[second].ignore_lbs is False
+
+
+@pytest.mark.asyncio
+async def test_polls_fill_the_fix_history(coordinator, stand_in_server):
+    stand_in_server.devices = make_devices(1)
+    imei = stand_in_server.devices[0]["imei"]
+    await coordinator.async_refresh()
+    await coordinator.async_refresh()
+    assert len(coordinator.fix_history(imei)) == 1
+
+    stand_in_server.devices[0]["gps"] = "2024-05-01 12:00:10,0,0,0,90,55.1,37.1,150"
+    await coordinator.async_refresh()
+    history = coordinator.fix_history(imei)
+    assert history.positions() == [(55.0, 37.0), (55.1, 37.1)]
+
+
+def test_parse_devices():
+    fleet = make_devices(3)
+    fleet[1]["bat"] = None
+    fleet[2]["gps"] = "2024-05-01 12:00:00,0,0,0,90,39.915,116.404,50"
+    pending = {device["imei"]: (device, Saving("0" * 26)) for device in fleet}
+    result = parse_devices(
+        pending,
+        "2.0",
+        frozenset({fleet[0]["imei"]}),
+        Datum.GCJ02,
+        timed=True,
+    )
+    assert list(result.parsed) == [fleet[0]["imei"], fleet[2]["imei"]]
+    assert result.failed.keys() == {fleet[1]["imei"]}
+    assert result.seconds.keys() == pending.keys()
+    assert result.parsed[fleet[0]["imei"]].ignore_lbs is True
+    assert result.parsed[fleet[2]["imei"]].latitude == pytest.approx(
+        datum_module.gcj02_to_wgs84(39.915, 116.404)[0],
+    )
+
+
+@pytest.mark.asyncio
+async def test_big_batches_are_offloaded(coordinator, stand_in_server):
+    stand_in_server.devices = make_devices(5)
+    inline = await coordinator.get_device_data()
+
+    coordinator.offload_threshold = 5
+    coordinator.profiler.enabled = True
+    coordinator.api.invalidate_cache()
+    offloaded = await coordinator.get_device_data()
+    assert coordinator.profiler.counters["offloaded_parses"] == 1
+    assert offloaded == inline
+
+
+def test_numeric_sensors_keep_statistics():
+    measured = {
+        description.key
+        for description in _365GPSDataUpdateCoordinator.sensor_descriptions
+        if description.state_class == SensorStateClass.MEASUREMENT
+    }
+    assert measured == {"speed", "altitude", "battery_level", "cellular_signal"}
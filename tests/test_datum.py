@@ -0,0 +1,61 @@
+from importlib import import_module
+
+import pytest
+
+const_module = import_module("custom_components.365gps.const")
+datum_module = import_module("custom_components.365gps.datum")
+Datum = const_module.Datum
+bd09_to_gcj02 = datum_module.bd09_to_gcj02
+convert = datum_module.convert
+gcj02_to_bd09 = datum_module.gcj02_to_bd09
+gcj02_to_wgs84 = datum_module.gcj02_to_wgs84
+wgs84_to_gcj02 = datum_module.wgs84_to_gcj02
+
+BEIJING = (39.915, 116.404)
+
+
+# Reference values published with the common coordtransform implementations
+@pytest.mark.parametrize(
+    ("function", "expected"),
+    [
+        (wgs84_to_gcj02, (39.91640428150164, 116.41024449916938)),
+        (gcj02_to_bd09, (39.92133699351021, 116.41036949371029)),
+        (bd09_to_gcj02, (39.90865673957631, 116.39762729119315)),
+    ],
+)
+def test_reference_points(function, expected):
+    assert function(*BEIJING) == pytest.approx(expected, abs=1e-9)
+
+
+@pytest.mark.parametrize(
+    "point",
+    [BEIJING, (31.2304, 121.4737), (22.5431, 114.0579), (43.8256, 87.6168)],
+)
+def test_gcj02_round_trip(point):
+    # Under a millimeter, the single step inverse is only good to a few meters
+    assert wgs84_to_gcj02(*gcj02_to_wgs84(*point)) == pytest.approx(point, abs=1e-8)
+
+
+def test_bd09_round_trip():
+    assert bd09_to_gcj02(*gcj02_to_bd09(*BEIJING)) == pytest.approx(BEIJING, abs=1e-6)
+
+
+@pytest.mark.parametrize("point", [(55.7558, 37.6173), (-33.8688, 151.2093)])
+def test_outside_china_is_unchanged(point):
+    assert wgs84_to_gcj02(*point) == point
+    assert gcj02_to_wgs84(*point) == point
+
+
+class TestConvert:
+    def test_batch_matches_single_points(self):
+        points = [BEIJING, (55.7558, 37.6173)]
+        assert convert(points, Datum.GCJ02, Datum.WGS84) == [
+            gcj02_to_wgs84(*point) for point in points
+        ]
+
+    def test_chains_through_gcj02(self):
+        result = convert([BEIJING], Datum.WGS84, Datum.BD09)
+        assert result == [gcj02_to_bd09(*wgs84_to_gcj02(*BEIJING))]
+
+    def test_same_datum(self):
+        assert convert([BEIJING], Datum.BD09, Datum.BD09) == [BEIJING]
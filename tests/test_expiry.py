@@ -0,0 +1,80 @@
+from datetime import date
+from importlib import import_module
+
+import pytest
+
+expiry_module = import_module("custom_components.365gps.expiry")
+ExpiryIndex = expiry_module.ExpiryIndex
+parse_date = expiry_module.parse_date
+
+TODAY = date(2024, 5, 1)
+
+
+def raw(expdate=None, gexpdate=None):
+    return {
+        "expdate": expdate,
+        "gexpdate": gexpdate,
+        "startdate": "2024-01-01",
+        "iccid": "8970",
+    }
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("2024-06-01", date(2024, 6, 1)),
+        ("2024-06-01 00:00:00", date(2024, 6, 1)),
+        ("2024/06/01", date(2024, 6, 1)),
+        ("", None),
+        (None, None),
+        ("0000-00-00", None),
+    ],
+)
+def test_parse_date(value, expected):
+    assert parse_date(value) == expected
+
+
+class TestExpiryIndex:
+    def test_fields_are_parsed_once(self):
+        index = ExpiryIndex()
+        assert index.update("1", raw("2024-06-01")) is True
+        assert index.update("1", raw("2024-06-01")) is False
+        subscription = index.subscriptions["1"]
+        assert subscription.expires == date(2024, 6, 1)
+        assert subscription.started == date(2024, 1, 1)
+        assert subscription.iccid == "8970"
+
+    def test_next_expiry_is_the_earliest(self):
+        index = ExpiryIndex()
+        index.update("1", raw("2024-06-01", "2024-05-10"))
+        assert index.subscriptions["1"].next_expiry == date(2024, 5, 10)
+
+    def test_warning_then_expired_once_each(self):
+        index = ExpiryIndex(warning_days=30)
+        index.update("soon", raw("2024-05-20"))
+        index.update("later", raw("2025-01-01"))
+        index.update("never", raw())
+
+        assert [(imei, stage) for imei, stage, _ in index.check(TODAY)] == [
+            ("soon", 1),
+        ]
+        assert list(index.check(TODAY)) == []
+        assert [(imei, stage) for imei, stage, _ in index.check(date(2024, 5, 21))] == [
+            ("soon", 2),
+        ]
+        assert list(index.check(date(2024, 5, 22))) == []
+
+    def test_renewal_starts_over(self):
+        index = ExpiryIndex(warning_days=30)
+        index.update("1", raw("2024-05-20"))
+        list(index.check(TODAY))
+        index.update("1", raw("2024-05-25"))
+        assert [stage for _, stage, _ in index.check(TODAY)] == [1]
+        assert index._index == [(date(2024, 5, 25), "1")]
+
+    def test_index_is_sorted_by_next_expiry(self):
+        index = ExpiryIndex()
+        index.update("b", raw("2024-07-01"))
+        index.update("a", raw("2024-08-01", "2024-06-01"))
+        index.update("c", raw())
+        assert index._index == [(date(2024, 6, 1), "a"), (date(2024, 7, 1), "b")]
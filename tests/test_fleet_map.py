@@ -0,0 +1,109 @@
+import json
+from importlib import import_module
+
+import pytest
+
+from tests.helpers import make_devices
+
+api_module = import_module("custom_components.365gps.api")
+coordinator_module = import_module("custom_components.365gps.coordinator")
+fleet_map = import_module("custom_components.365gps.fleet_map")
+BINARY_RECORD = fleet_map.BINARY_RECORD
+FleetIndex = fleet_map.FleetIndex
+cluster = fleet_map.cluster
+map_point = fleet_map.map_point
+parse_bbox = fleet_map.parse_bbox
+project = fleet_map.project
+to_binary = fleet_map.to_binary
+to_geojson = fleet_map.to_geojson
+
+
+def make_points(positions):
+    points = []
+    for device, (latitude, longitude) in zip(
+        make_devices(len(positions)),
+        positions,
+    ):
+        device["gps"] = f"2024-05-01 12:00:00,0,0,0,90,{latitude},{longitude},150"
+        data = coordinator_module.parse_device_info(
+            device,
+            saving=api_module.Saving("0" * 26),
+            sw_version="2.0",
+        )
+        points.append(map_point(data, available=True))
+    return points
+
+
+def test_project():
+    assert project(0, 0) == pytest.approx((0.5, 0.5))
+    assert project(0, -180) == pytest.approx((0.0, 0.5))
+    # Poles are clamped to the edge of the square
+    assert project(90, 0)[1] == pytest.approx(0.0, abs=1e-9)
+    assert project(-90, 0)[1] == pytest.approx(1.0, abs=1e-9)
+
+
+def test_parse_bbox():
+    assert parse_bbox(None) is None
+    assert parse_bbox("30,50,40,60") == (30.0, 50.0, 40.0, 60.0)
+    with pytest.raises(ValueError):
+        parse_bbox("30,50,40")
+    with pytest.raises(ValueError):
+        parse_bbox("30,60,40,50")
+
+
+class TestFleetIndex:
+    def test_bbox(self):
+        points = make_points([(55.0, 37.0), (59.9, 30.3), (40.7, -74.0)])
+        moscow, petersburg, _ = (point.imei for point in points)
+        index = FleetIndex()
+        index.update(points)
+        assert {point.imei for point in index.query((29, 50, 38, 61))} == {
+            moscow,
+            petersburg,
+        }
+        assert [point.imei for point in index.query((36, 54, 38, 56))] == [moscow]
+        assert index.query((0, 0, 1, 1)) == []
+        assert len(index.query()) == 3
+
+    def test_bbox_across_the_antimeridian(self):
+        index = FleetIndex()
+        index.update(make_points([(64.7, 177.5), (64.5, -172.3), (55.0, 37.0)]))
+        assert {point.longitude for point in index.query((170, 60, -170, 70))} == {
+            177.5,
+            -172.3,
+        }
+
+
+class TestCluster:
+    def test_zoom(self):
+        points = make_points([(55.0, 37.0), (55.001, 37.001), (59.9, 30.3)])
+        assert sorted(len(group) for group in cluster(points, 5)) == [1, 2]
+        assert sorted(len(group) for group in cluster(points, 17)) == [1, 1, 1]
+        assert sorted(len(group) for group in cluster(points, None)) == [1, 1, 1]
+
+
+def test_geojson():
+    points = make_points([(55.0, 37.0), (55.002, 37.002), (59.9, 30.3)])
+    collection = json.loads(to_geojson(cluster(points, 5)))
+    assert collection["type"] == "FeatureCollection"
+    single, grouped = sorted(
+        collection["features"],
+        key=lambda feature: "cluster" in feature["properties"],
+    )
+    assert single["id"] == points[2].imei
+    assert single["geometry"]["coordinates"] == [30.3, 59.9]
+    assert single["properties"]["available"] is True
+    assert grouped["properties"] == {"cluster": True, "point_count": 2}
+    assert grouped["geometry"]["coordinates"] == pytest.approx([37.001, 55.001])
+
+
+def test_binary():
+    points = make_points([(55.0, 37.0), (55.002, 37.002), (59.9, 30.3)])
+    payload = to_binary(cluster(points, 5))
+    records = sorted(BINARY_RECORD.iter_unpack(payload), key=lambda record: record[3])
+    assert len(payload) == 2 * BINARY_RECORD.size
+    (imei, longitude, latitude, count), grouped = records
+    assert (imei, count) == (int(points[2].imei), 1)
+    assert (latitude, longitude) == pytest.approx((59.9, 30.3))
+    assert grouped[0] == 0
+    assert grouped[3] == 2
@@ -0,0 +1,87 @@
+from importlib import import_module
+
+import pytest
+
+geocode_module = import_module("custom_components.365gps.geocode")
+PlaceIndex = geocode_module.PlaceIndex
+ReverseGeocoder = geocode_module.ReverseGeocoder
+geohash = geocode_module.geohash
+read_places = geocode_module.read_places
+
+PLACES = [
+    ("Moscow", 55.7558, 37.6173),
+    ("Khimki", 55.8970, 37.4297),
+    ("Podolsk", 55.4242, 37.5547),
+    ("Saint Petersburg", 59.9386, 30.3141),
+]
+
+
+@pytest.fixture
+def index():
+    return PlaceIndex(PLACES)
+
+
+def test_geohash():
+    assert geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert geohash(57.64911, 10.40744, 6) == "u4pruy"
+
+
+class TestPlaceIndex:
+    def test_nearest(self, index):
+        name, distance = index.nearest(55.88, 37.45)
+        assert name == "Khimki"
+        assert distance < 3
+
+    def test_nearest_across_cells(self, index):
+        # Closer to Moscow, in the cell south of it
+        name, _ = index.nearest(55.74, 37.62)
+        assert name == "Moscow"
+
+    def test_nothing_within_max_distance(self, index):
+        assert index.nearest(57.5, 34.0, max_distance=50) is None
+
+    def test_matches_brute_force(self, index):
+        haversine = geocode_module.haversine
+        for latitude in (55.3, 55.6, 55.9, 56.2):
+            for longitude in (37.2, 37.5, 37.8):
+                expected = min(
+                    PLACES,
+                    key=lambda place: haversine(latitude, longitude, *place[1:]),
+                )
+                result = index.nearest(latitude, longitude, max_distance=500)
+                assert result[0] == expected[0]
+
+
+class TestReverseGeocoder:
+    def test_lookups_are_cached_per_cell(self, index):
+        geocoder = ReverseGeocoder(index)
+        assert geocoder.lookup(55.7558, 37.6173) == "Moscow"
+        assert geocoder.lookup(55.7559, 37.6174) == "Moscow"
+        assert (geocoder.hits, geocoder.misses) == (1, 1)
+
+    def test_cache_is_bounded(self, index):
+        geocoder = ReverseGeocoder(index, cache_size=2)
+        for latitude in (55.70, 55.75, 55.80):
+            geocoder.lookup(latitude, 37.6)
+        assert len(geocoder._cache) == 2
+
+    def test_misses_are_cached(self, index):
+        geocoder = ReverseGeocoder(index)
+        assert geocoder.lookup(0, 0) is None
+        assert geocoder.lookup(0, 0) is None
+        assert geocoder.misses == 1
+
+
+def test_read_places(tmp_path):
+    path = tmp_path / "places.txt"
+    path.write_text(
+        "524901\tMoscow\tMoscow\t\t55.75222\t37.61556\tP\tPPLC\tRU\n"
+        "name,latitude,longitude\n"
+        "Depot,55.1,37.2\n"
+        "broken\n",
+        encoding="utf-8",
+    )
+    assert list(read_places(path)) == [
+        ("Moscow, RU", 55.75222, 37.61556),
+        ("Depot", 55.1, 37.2),
+    ]
@@ -0,0 +1,78 @@
+from datetime import UTC, datetime
+from importlib import import_module
+from math import isnan
+from types import SimpleNamespace
+
+import pytest
+
+history_module = import_module("custom_components.365gps.history")
+FixHistory = history_module.FixHistory
+
+
+def filled(capacity, count):
+    history = FixHistory(capacity)
+    for i in range(count):
+        history.append(i, 55.0 + i, 37.0 + i, float(i))
+    return history
+
+
+class TestFixHistory:
+    def test_empty(self):
+        history = FixHistory(4)
+        assert len(history) == 0
+        assert len(history.window()) == 0
+        assert history.positions() == []
+
+    def test_before_wrapping(self):
+        history = filled(4, 3)
+        assert len(history) == 3
+        assert list(history.window().time) == [0, 1, 2]
+        assert list(history.window(2).time) == [1, 2]
+
+    @pytest.mark.parametrize("count", [4, 5, 7, 8, 9, 100])
+    def test_window_is_the_newest_fixes_in_order(self, count):
+        history = filled(4, count)
+        assert len(history) == 4
+        for size in range(5):
+            expected = list(range(count - size, count))
+            assert list(history.window(size).time) == expected
+        assert history.positions(2) == [
+            (55.0 + count - 2, 37.0 + count - 2),
+            (55.0 + count - 1, 37.0 + count - 1),
+        ]
+
+    def test_window_is_a_view(self):
+        history = filled(4, 6)
+        window = history.window()
+        assert isinstance(window.latitude, memoryview)
+        assert window.latitude.contiguous
+        assert window.latitude.obj is history._columns["latitude"]
+
+    def test_oversized_window(self):
+        assert list(filled(4, 2).window(10).time) == [0, 1]
+
+    def test_missing_speed(self):
+        history = FixHistory(4)
+        history.append(0, 55.0, 37.0, None)
+        history.append(1, 55.0, 37.0, 12.0)
+        assert isnan(history.window().speed[0])
+        assert history.speeds() == [None, 12.0]
+
+    def test_fixed_footprint(self):
+        history = FixHistory(128)
+        before = history.nbytes
+        for i in range(1000):
+            history.append(i, 0.0, 0.0, 0.0)
+        assert history.nbytes == before == 2 * 128 * 4 * 8
+
+    def test_add_device_data(self):
+        history = FixHistory(4)
+        history.add(
+            SimpleNamespace(
+                update_time=datetime(2024, 5, 1, tzinfo=UTC),
+                latitude=55.0,
+                longitude=37.0,
+                speed=None,
+            ),
+        )
+        assert list(history.window().time) == [1714521600]
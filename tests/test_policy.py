@@ -0,0 +1,59 @@
+from datetime import time
+from importlib import import_module
+from types import SimpleNamespace
+
+import pytest
+
+const_module = import_module("custom_components.365gps.const")
+policy_module = import_module("custom_components.365gps.policy")
+POLICY_IDLE_INTERVAL = const_module.POLICY_IDLE_INTERVAL
+UPDATE_INTERVAL_MODES = const_module.UPDATE_INTERVAL_MODES
+PolicyTarget = policy_module.PolicyTarget
+choose_target = policy_module.choose_target
+in_quiet_hours = policy_module.in_quiet_hours
+
+NOON = time(12)
+PRECISION = UPDATE_INTERVAL_MODES["precision_mode"]
+POWER_SAVING = UPDATE_INTERVAL_MODES["power_saving_mode"]
+
+
+def device(battery=80, status="Static"):
+    return SimpleNamespace(battery_level=battery, status=status)
+
+
+@pytest.mark.parametrize(
+    ("now", "expected"),
+    [(time(22, 59), False), (time(23), True), (time(3), True), (time(6), False)],
+)
+def test_quiet_hours(now, expected):
+    assert in_quiet_hours(now) is expected
+
+
+class TestChooseTarget:
+    def test_moving(self):
+        target = choose_target(device(status="Moving"), False, NOON, False)
+        assert target == PolicyTarget(PRECISION)
+
+    def test_parked(self):
+        assert choose_target(device(), False, NOON, False) == PolicyTarget(
+            POLICY_IDLE_INTERVAL,
+        )
+
+    @pytest.mark.parametrize(("in_zone", "now"), [(True, NOON), (False, time(2))])
+    def test_parked_in_zone_or_at_night(self, in_zone, now):
+        target = choose_target(device(), in_zone, now, False)
+        assert target == PolicyTarget(POWER_SAVING)
+
+    def test_low_battery_wins(self):
+        target = choose_target(device(battery=15, status="Moving"), False, NOON, False)
+        assert target == PolicyTarget(POWER_SAVING, True)
+
+    def test_power_saving_hysteresis(self):
+        assert choose_target(device(battery=25), False, NOON, True).power_saving
+        assert (
+            choose_target(device(battery=25), False, NOON, False).power_saving is None
+        )
+
+    def test_recovered_battery_turns_power_saving_off(self):
+        target = choose_target(device(battery=50, status="Moving"), False, NOON, True)
+        assert target == PolicyTarget(PRECISION, False)
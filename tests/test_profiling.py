@@ -0,0 +1,88 @@
+import asyncio
+import time
+from importlib import import_module
+
+import pytest
+
+profiling = import_module("custom_components.365gps.profiling")
+PollProfiler = profiling.PollProfiler
+percentiles = profiling.percentiles
+
+
+class TestPercentiles:
+    def test_empty(self):
+        assert percentiles([]) == {"p50": None, "p90": None, "p99": None}
+
+    def test_values(self):
+        result = percentiles(range(100))
+        assert result == {"p50": 50, "p90": 90, "p99": 99}
+
+    def test_single_value(self):
+        assert percentiles([3.0], (50, 99)) == {"p50": 3.0, "p99": 3.0}
+
+
+class TestPollProfiler:
+    def test_disabled_records_nothing(self):
+        profiler = PollProfiler()
+        profiler.begin_poll()
+        with profiler.stage("http"):
+            pass
+        with profiler.stage("parse", imei="1"):
+            pass
+        profiler.end_poll()
+        profiler.record_fan_out(10)
+        assert len(profiler.polls) == 0
+        assert profiler.device_parse == {}
+        assert len(profiler.fan_out) == 0
+
+    def test_stages_accumulate_per_poll(self):
+        profiler = PollProfiler(enabled=True)
+        profiler.begin_poll()
+        for imei in ("1", "2"):
+            with profiler.stage("http"):
+                pass
+            with profiler.stage("parse", imei=imei):
+                pass
+        profiler.end_poll()
+        with profiler.stage("state_write"):
+            pass
+        profiler.record_fan_out(12)
+
+        assert len(profiler.polls) == 1
+        assert len(profiler.stages["http"]) == 1
+        assert len(profiler.stages["parse"]) == 1
+        assert len(profiler.stages["state_write"]) == 1
+        assert profiler.device_parse.keys() == {"1", "2"}
+        assert profiler.counters["state_writes"] == 12
+
+    def test_samples_are_bounded(self):
+        profiler = PollProfiler(enabled=True, samples=3)
+        for _ in range(10):
+            profiler.begin_poll()
+            profiler.end_poll()
+        assert len(profiler.polls) == 3
+
+    def test_as_dict(self):
+        profiler = PollProfiler(enabled=True)
+        profiler.begin_poll()
+        profiler.end_poll()
+        result = profiler.as_dict()
+        assert result["polls"] == 1
+        assert set(result["stage_seconds"]) == {"http", "parse", "state_write"}
+
+
+@pytest.mark.asyncio
+async def test_loop_lag():
+    profiler = PollProfiler(enabled=True)
+    stop = profiler.monitor_loop(asyncio.get_running_loop(), interval=0.01)
+    await asyncio.sleep(0.03)
+    # Holds the loop like a slow parse would
+    time.sleep(0.1)
+    await asyncio.sleep(0.03)
+    stop()
+    samples = len(profiler.loop_lag)
+    await asyncio.sleep(0.03)
+
+    assert len(profiler.loop_lag) == samples
+    assert max(profiler.loop_lag) >= 0.09
+    assert profiler.as_dict()["loop_lag_seconds"]["max"] == max(profiler.loop_lag)
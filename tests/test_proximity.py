@@ -0,0 +1,81 @@
+import random
+from importlib import import_module
+
+proximity_module = import_module("custom_components.365gps.proximity")
+telemetry_module = import_module("custom_components.365gps.telemetry")
+ProximityTracker = proximity_module.ProximityTracker
+find_convoys = proximity_module.find_convoys
+find_pairs = proximity_module.find_pairs
+haversine = telemetry_module.haversine
+
+# About 111 m of latitude
+STEP = 0.001
+
+
+class TestFindPairs:
+    def test_close_and_far(self):
+        positions = {"a": (55.0, 37.0), "b": (55.0 + STEP, 37.0), "c": (55.1, 37.0)}
+        assert find_pairs(positions, 200).keys() == {("a", "b")}
+
+    def test_matches_brute_force(self):
+        generator = random.Random(1)
+        positions = {
+            str(index): (55 + generator.random() / 50, 37 + generator.random() / 30)
+            for index in range(300)
+        }
+        expected = {
+            (first, second)
+            for first in positions
+            for second in positions
+            if first < second
+            and haversine(*positions[first], *positions[second]) * 1000 <= 150
+        }
+        assert find_pairs(positions, 150).keys() == expected
+
+    def test_empty(self):
+        assert find_pairs({}, 200) == {}
+
+
+def test_find_convoys():
+    convoys = find_convoys([("a", "b"), ("b", "c"), ("x", "y")])
+    assert sorted(map(sorted, convoys)) == [["a", "b", "c"], ["x", "y"]]
+
+
+class TestProximityTracker:
+    def test_join_and_separate_with_hysteresis(self):
+        tracker = ProximityTracker(distance=200, separation=300)
+        joined, _ = tracker.update({"a": (55.0, 37.0), "b": (55.0 + STEP, 37.0)})
+        assert joined == {("a", "b")}
+
+        # 250 m, between the two thresholds
+        joined, separated = tracker.update(
+            {"a": (55.0, 37.0), "b": (55.0 + 2.25 * STEP, 37.0)},
+        )
+        assert (joined, separated) == (set(), set())
+        assert tracker.convoy_size("a") == 2
+
+        _, separated = tracker.update({"a": (55.0, 37.0), "b": (55.0 + 3 * STEP, 37.0)})
+        assert separated == {("a", "b")}
+        assert tracker.convoy_size("a") == 1
+
+    def test_missing_position_keeps_the_pair(self):
+        tracker = ProximityTracker()
+        tracker.update({"a": (55.0, 37.0), "b": (55.0 + STEP, 37.0)})
+        joined, separated = tracker.update({"a": (55.0, 37.0)})
+        assert (joined, separated) == (set(), set())
+        joined, _ = tracker.update({"a": (55.0, 37.0), "b": (55.0 + STEP, 37.0)})
+        assert joined == set()
+
+    def test_convoy_membership(self):
+        tracker = ProximityTracker()
+        tracker.update(
+            {
+                "a": (55.0, 37.0),
+                "b": (55.0 + STEP, 37.0),
+                "c": (55.0 + 2 * STEP, 37.0),
+                "d": (56.0, 37.0),
+            },
+        )
+        assert tracker.convoy_of["a"] == {"a", "b", "c"}
+        assert tracker.convoy_size("c") == 3
+        assert tracker.convoy_size("d") == 1
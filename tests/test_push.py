@@ -0,0 +1,109 @@
+from importlib import import_module
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from tests.helpers import make_devices
+
+push_module = import_module("custom_components.365gps.push")
+decode_push_payload = push_module.decode_push_payload
+webhook_handler = push_module.webhook_handler
+
+
+class TestDecodePushPayload:
+    def test_single_device(self):
+        assert decode_push_payload(b'{"imei": "1", "bat": "80"}') == [
+            {"imei": "1", "bat": "80"},
+        ]
+
+    def test_device_list(self):
+        assert decode_push_payload('[{"imei": "1"}, {"imei": "2"}]') == [
+            {"imei": "1"},
+            {"imei": "2"},
+        ]
+
+    def test_devices_envelope(self):
+        assert decode_push_payload(b'{"devices": [{"imei": "1"}]}') == [{"imei": "1"}]
+
+    def test_utf8_payload(self):
+        assert decode_push_payload('{"imei": "1", "name": "Трекер"}'.encode()) == [
+            {"imei": "1", "name": "Трекер"},
+        ]
+
+    @pytest.mark.parametrize(
+        "payload",
+        [b"not json", b'"string"', b'[{"bat": "80"}]', b"[1, 2]", b'{"imei": ""}'],
+    )
+    def test_invalid_payload_raises(self, payload):
+        with pytest.raises(ValueError):
+            decode_push_payload(payload)
+
+
+@pytest.mark.asyncio
+class TestPushDevices:
+    @pytest_asyncio.fixture
+    async def polled(self, coordinator, stand_in_server):
+        stand_in_server.devices = make_devices(2)
+        coordinator.data = await coordinator.get_device_data()
+        return coordinator
+
+    async def test_partial_push_is_merged(self, polled):
+        imei = make_devices(1)[0]["imei"]
+        previous = polled.data[imei]
+        assert polled.async_push_devices([{"imei": imei, "bat": "42"}]) == 1
+        assert polled.data[imei].battery_level == 42
+        assert polled.data[imei].latitude == previous.latitude
+        assert polled.data[imei].saving is previous.saving
+
+    async def test_unknown_imei_is_ignored(self, polled):
+        data = polled.data
+        assert polled.async_push_devices([{"imei": "unknown", "bat": "42"}]) == 0
+        assert polled.data is data
+
+    async def test_malformed_push_leaves_data(self, polled):
+        data = polled.data
+        imei = make_devices(1)[0]["imei"]
+        assert polled.async_push_devices([{"imei": imei, "gps": "garbage"}]) == 0
+        assert polled.data is data
+
+    async def test_push_clears_unavailable(self, polled):
+        imei = make_devices(1)[0]["imei"]
+        polled.unavailable.add(imei)
+        polled.async_push_devices([{"imei": imei, "bat": "42"}])
+        assert imei not in polled.unavailable
+
+    async def test_before_first_poll(self, coordinator):
+        assert coordinator.async_push_devices([{"imei": "1"}]) == 0
+
+
+@pytest.mark.asyncio
+class TestWebhook:
+    @pytest_asyncio.fixture
+    async def client(self, hass, coordinator, stand_in_server):
+        stand_in_server.devices = make_devices(1)
+        coordinator.data = await coordinator.get_device_data()
+        handler = webhook_handler(coordinator)
+
+        async def handle(request: web.Request) -> web.Response:
+            return await handler(hass, "webhook_id", request)
+
+        app = web.Application()
+        app.router.add_post("/api/webhook/webhook_id", handle)
+        async with TestClient(TestServer(app)) as client:
+            yield client
+
+    async def test_accepted(self, client, coordinator):
+        imei = make_devices(1)[0]["imei"]
+        response = await client.post(
+            "/api/webhook/webhook_id",
+            json={"imei": imei, "bat": "42"},
+        )
+        assert response.status == 200
+        assert await response.json() == {"updated": 1}
+        assert coordinator.data[imei].battery_level == 42
+
+    async def test_rejected(self, client):
+        response = await client.post("/api/webhook/webhook_id", data=b"not json")
+        assert response.status == 400
@@ -0,0 +1,121 @@
+import asyncio
+from importlib import import_module
+
+import pytest
+
+from tests.helpers import FakeClock
+
+ratelimit = import_module("custom_components.365gps.ratelimit")
+Priority = ratelimit.Priority
+RateGovernor = ratelimit.RateGovernor
+TokenBucket = ratelimit.TokenBucket
+
+
+class TestTokenBucket:
+    def test_starts_full(self):
+        bucket = TokenBucket(capacity=5, rate=1, clock=FakeClock())
+        assert bucket.tokens == 5
+
+    def test_take_and_refill(self):
+        clock = FakeClock()
+        bucket = TokenBucket(capacity=2, rate=0.5, clock=clock)
+        assert bucket.try_take() is True
+        assert bucket.try_take() is True
+        assert bucket.try_take() is False
+        assert bucket.wait_time() == 2
+        clock.now = 2
+        assert bucket.try_take() is True
+
+    def test_refill_is_capped(self):
+        clock = FakeClock()
+        bucket = TokenBucket(capacity=3, rate=10, clock=clock)
+        bucket.try_take()
+        clock.now = 100
+        assert bucket.tokens == 3
+
+
+class TestRateGovernor:
+    def test_shared_per_account(self):
+        assert RateGovernor.for_account("a") is RateGovernor.for_account("a")
+        assert RateGovernor.for_account("a") is not RateGovernor.for_account("b")
+
+    def test_background_deferred_when_budget_low(self):
+        clock = FakeClock()
+        governor = RateGovernor(
+            reads=TokenBucket(capacity=20, rate=1, clock=clock),
+            commands=TokenBucket(capacity=5, rate=1, clock=clock),
+            reserve=10,
+        )
+        assert governor.should_defer(Priority.BACKGROUND) is False
+        for _ in range(11):
+            governor.reads.try_take()
+        assert governor.should_defer(Priority.BACKGROUND) is True
+        assert governor.should_defer(Priority.READ) is False
+
+    @pytest.mark.asyncio
+    async def test_background_yields_to_commands(self):
+        governor = RateGovernor(
+            reads=TokenBucket(capacity=5, rate=20),
+            commands=TokenBucket(capacity=1, rate=20),
+        )
+        governor.commands.try_take()
+        order = []
+
+        async def request(priority):
+            await governor.acquire(priority)
+            order.append(priority)
+
+        command = asyncio.ensure_future(request(Priority.COMMAND))
+        await asyncio.sleep(0)
+        assert governor.queue_depth == 1
+        assert governor.should_defer(Priority.BACKGROUND) is True
+        await asyncio.gather(command, request(Priority.BACKGROUND))
+        assert order == [Priority.COMMAND, Priority.BACKGROUND]
+        assert governor.queue_depth == 0
+        assert governor.peak_queue_depth == 2
+
+    @pytest.mark.asyncio
+    async def test_reads_not_starved_by_command_backlog(self):
+        governor = RateGovernor(
+            reads=TokenBucket(capacity=5, rate=2),
+            commands=TokenBucket(capacity=1, rate=0.5),
+        )
+        governor.commands.try_take()
+        commands = [
+            asyncio.ensure_future(governor.acquire(Priority.COMMAND)) for _ in range(30)
+        ]
+        await asyncio.sleep(0)
+        assert governor.queue_depth == 30
+        await asyncio.wait_for(governor.acquire(Priority.READ), timeout=0.5)
+        for command in commands:
+            command.cancel()
+        await asyncio.gather(*commands, return_exceptions=True)
+        assert governor.queue_depth == 0
+
+    @pytest.mark.asyncio
+    async def test_startup_never_waits(self):
+        governor = RateGovernor(
+            reads=TokenBucket(capacity=1, rate=0.001),
+            commands=TokenBucket(capacity=1, rate=0.001),
+        )
+        for _ in range(100):
+            await asyncio.wait_for(governor.acquire(Priority.STARTUP), timeout=0.5)
+        assert governor.read_budget == 0
+
+    @pytest.mark.asyncio
+    async def test_listeners_are_coalesced(self, monkeypatch):
+        monkeypatch.setattr(ratelimit, "GOVERNOR_NOTIFY_INTERVAL", 0.01)
+        governor = RateGovernor(
+            reads=TokenBucket(capacity=50, rate=1),
+            commands=TokenBucket(capacity=1, rate=1),
+        )
+        calls = []
+        remove = governor.add_listener(lambda: calls.append(governor.read_budget))
+        for _ in range(20):
+            await governor.acquire(Priority.READ)
+        await asyncio.sleep(0.05)
+        assert calls == [30]
+        remove()
+        await governor.acquire(Priority.READ)
+        await asyncio.sleep(0.05)
+        assert calls == [30]
@@ -0,0 +1,132 @@
+from importlib import import_module
+
+import pytest
+
+from tests.helpers import make_devices
+
+coordinator_module = import_module("custom_components.365gps.coordinator")
+replay_module = import_module("custom_components.365gps.replay")
+ReplayAPI = replay_module.ReplayAPI
+Sanitizer = replay_module.Sanitizer
+TrafficRecorder = replay_module.TrafficRecorder
+append_lines = replay_module.append_lines
+async_replay = replay_module.async_replay
+read_recording = replay_module.read_recording
+_365GPSDataUpdateCoordinator = coordinator_module._365GPSDataUpdateCoordinator
+
+
+class TestSanitizer:
+    def test_device(self):
+        sanitizer = Sanitizer(offset=(0.5, -0.25))
+        device = {
+            **make_devices(1)[0],
+            "iccid": "8970",
+            "carno": "A123BC",
+            "ggkey": None,
+            "gps": "2024-05-01 12:00:00,0,0,0,90,55.0,37.0,150",
+        }
+        sanitized = sanitizer.device(device)
+        assert sanitized["imei"] == "000000000000001"
+        assert sanitized["name"] == "Tracker 1"
+        assert sanitized["iccid"] == sanitized["carno"] == ""
+        assert sanitized["ggkey"] is None
+        assert (
+            sanitized["gps"] == "2024-05-01 12:00:00,0,0,0,90,55.500000,36.750000,150"
+        )
+        assert sanitized["speed"] == device["speed"]
+        assert device["iccid"] == "8970"
+
+    def test_imeis_are_stable(self):
+        sanitizer = Sanitizer()
+        assert sanitizer.imei("b") == "000000000000001"
+        assert sanitizer.imei("a") == "000000000000002"
+        assert sanitizer.imei("b") == "000000000000001"
+
+    def test_malformed_fix_is_kept(self):
+        device = Sanitizer().device({"imei": "1", "gps": "garbage"})
+        assert device["gps"] == "garbage"
+
+    def test_entries(self):
+        sanitizer = Sanitizer()
+        saving = sanitizer.entry(
+            "wx_sav.php",
+            {"imei": "860000000000000"},
+            200,
+            b'[{"saving": "1", "log": "secret"}]',
+        )
+        assert saving == {
+            "endpoint": "wx_sav.php",
+            "status": 200,
+            "imei": "000000000000001",
+            "body": [{"saving": "1", "log": ""}],
+        }
+        assert sanitizer.entry("wx_ilist.php", {}, 304, b"") == {
+            "endpoint": "wx_ilist.php",
+            "status": 304,
+        }
+        assert sanitizer.entry("wx_ilist.php", {}, 200, b"<html>")["raw"] == "<html>"
+
+
+def test_truncated_recording(tmp_path):
+    path = tmp_path / "traffic.jsonl.gz"
+    append_lines(path, ['{"time": 0}', '{"time": 1}'])
+    flushed = path.stat().st_size
+    append_lines(path, ['{"time": 2}'])
+    assert [entry["time"] for entry in read_recording(path)] == [0, 1, 2]
+
+    # Only the header of the second flush made it to disk
+    path.write_bytes(path.read_bytes()[: flushed + 12])
+    assert [entry["time"] for entry in read_recording(path)] == [0, 1]
+
+
+@pytest.mark.asyncio
+async def test_record_and_replay(hass, coordinator, stand_in_server, tmp_path):
+    stand_in_server.devices = make_devices(3)
+    stand_in_server.devices[1]["speed"] = None
+    stand_in_server.devices[2].update(log="OUT", speed=0.0)
+    stand_in_server.savings[stand_in_server.devices[0]["imei"]] = "1" * 26
+
+    recorder = TrafficRecorder(hass, tmp_path / "traffic.jsonl.gz")
+    coordinator.api.traffic_recorder = recorder.record
+    await coordinator.async_refresh()
+    stand_in_server.devices[0]["bat"] = "50"
+    await coordinator.async_refresh()
+    coordinator.api.traffic_recorder = None
+    await recorder.async_flush()
+
+    entries = list(read_recording(recorder.path))
+    assert [entry["endpoint"] for entry in entries].count("wx_ilist.php") == 2
+    assert all(
+        device["imei"].startswith("0000")
+        for entry in entries
+        if entry["endpoint"] == "wx_ilist.php"
+        for device in entry["body"]
+    )
+    assert entries == sorted(entries, key=lambda entry: entry["time"])
+
+    replayed = _365GPSDataUpdateCoordinator(ReplayAPI(entries), hass)
+    replayed.profiler.enabled = True
+    assert await async_replay(replayed) == 2
+    assert replayed.profiler.as_dict()["polls"] == 2
+
+    live = list(coordinator.data.values())
+    copies = list(replayed.data.values())
+    assert [data.battery_level for data in copies] == [50, 80, 80]
+    assert copies[1].speed is None
+    assert copies[2].status == "Offline"
+    assert str(copies[0].saving) == "1" * 26
+    assert [data.imei for data in copies] != [data.imei for data in live]
+
+
+def test_replay_api_serves_the_saving_of_the_moment():
+    api = ReplayAPI(
+        [
+            {"time": 0, "endpoint": "wx_sav.php", "imei": "1", "body": "first"},
+            {"time": 10, "endpoint": "wx_sav.php", "imei": "1", "body": "second"},
+        ],
+    )
+    api.clock = 5
+    assert api._saving_at("1")["body"] == "first"
+    api.clock = 10
+    assert api._saving_at("1")["body"] == "second"
+    assert api._saving_at("2") is None
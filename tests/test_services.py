@@ -0,0 +1,179 @@
+from datetime import time
+from importlib import import_module
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from homeassistant.exceptions import ServiceValidationError
+
+from tests.helpers import make_devices
+
+api_module = import_module("custom_components.365gps.api")
+const_module = import_module("custom_components.365gps.const")
+coordinator_module = import_module("custom_components.365gps.coordinator")
+services_module = import_module("custom_components.365gps.services")
+Saving = api_module.Saving
+_365GPSAPI = api_module._365GPSAPI
+BULK_COMMAND_CONCURRENCY = const_module.BULK_COMMAND_CONCURRENCY
+DOMAIN = const_module.DOMAIN
+_365GPSDataUpdateCoordinator = coordinator_module._365GPSDataUpdateCoordinator
+parse_device_info = coordinator_module.parse_device_info
+BULK_COMMAND_SCHEMA = services_module.BULK_COMMAND_SCHEMA
+async_bulk_command = services_module.async_bulk_command
+async_run_command = services_module.async_run_command
+resolve_targets = services_module.resolve_targets
+validate_command = services_module.validate_command
+
+
+class TestBulkCommandSchema:
+    def test_defaults(self):
+        data = BULK_COMMAND_SCHEMA({"action": "reboot", "imei": "1"})
+        assert data["imei"] == ["1"]
+        assert data["device_id"] == []
+        assert data["config_entry_id"] == []
+
+    @pytest.mark.parametrize(
+        ("value", "expected"),
+        [("sleep_mode", "sleep_mode"), ("600", 600), (600, 600), ("on", True)],
+    )
+    def test_value_coercion(self, value, expected):
+        data = BULK_COMMAND_SCHEMA({"action": "set_utime", "value": value})
+        assert data["value"] == expected
+
+    def test_saving_fields(self):
+        data = BULK_COMMAND_SCHEMA(
+            {"action": "set_sav", "power_saving_on_time": "22:30"},
+        )
+        assert data["power_saving_on_time"] == time(22, 30)
+
+
+class TestValidateCommand:
+    @pytest.mark.parametrize(
+        "data",
+        [
+            {"action": "set_utime"},
+            {"action": "set_utime", "value": True},
+            {"action": "set_sav"},
+            {"action": "led", "value": 600},
+        ],
+    )
+    def test_invalid(self, data):
+        with pytest.raises(ServiceValidationError):
+            validate_command(data)
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            {"action": "set_utime", "value": "sleep_mode"},
+            {"action": "set_sav", "remote": False},
+            {"action": "speaker", "value": False},
+            {"action": "reboot"},
+        ],
+    )
+    def test_valid(self, data):
+        validate_command(data)
+
+
+@pytest.mark.asyncio
+class TestBulkCommand:
+    @pytest_asyncio.fixture
+    async def accounts(self, hass, session, stand_in_server, monkeypatch):
+        fleet = make_devices(12)
+        stand_in_server.devices = fleet
+        coordinators = {}
+        for entry_id, devices in (("first", fleet[:8]), ("second", fleet[8:])):
+            api = _365GPSAPI(uuid4().hex, "password", session)
+            api.hosts = (stand_in_server.host,)
+            api.scheme = "http"
+            coordinator = _365GPSDataUpdateCoordinator(api, hass, config_entry=None)
+            coordinator.data = {
+                device["imei"]: parse_device_info(
+                    device,
+                    saving=Saving("0" * 26),
+                    sw_version="2.0",
+                )
+                for device in devices
+            }
+            coordinator.refreshes = 0
+
+            async def request_refresh(coordinator=coordinator):
+                coordinator.refreshes += 1
+
+            monkeypatch.setattr(coordinator, "async_request_refresh", request_refresh)
+            coordinators[entry_id] = coordinator
+        hass.data[DOMAIN] = coordinators
+        return coordinators
+
+    async def test_resolve_by_imei_and_entry(self, hass, accounts):
+        imei = next(iter(accounts["second"].data))
+        targets = resolve_targets(
+            hass,
+            BULK_COMMAND_SCHEMA(
+                {"action": "reboot", "imei": imei, "config_entry_id": "first"},
+            ),
+        )
+        assert len(targets) == 9
+        assert targets[imei] is accounts["second"]
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            {"action": "reboot"},
+            {"action": "reboot", "imei": "unknown"},
+            {"action": "reboot", "config_entry_id": "unknown"},
+        ],
+    )
+    async def test_resolve_invalid(self, hass, accounts, data):
+        with pytest.raises(ServiceValidationError):
+            resolve_targets(hass, BULK_COMMAND_SCHEMA(data))
+
+    async def test_concurrency_and_single_refresh(
+        self,
+        hass,
+        accounts,
+        stand_in_server,
+    ):
+        stand_in_server.delay = 0.02
+        response = await async_bulk_command(
+            hass,
+            BULK_COMMAND_SCHEMA(
+                {
+                    "action": "set_utime",
+                    "value": "sleep_mode",
+                    "config_entry_id": ["first", "second"],
+                },
+            ),
+        )
+        assert len(response["results"]) == 12
+        assert all(result["success"] for result in response["results"].values())
+        assert stand_in_server.hits["api_utime.php"] == 12
+        assert stand_in_server.max_in_flight == BULK_COMMAND_CONCURRENCY
+        assert accounts["first"].refreshes == 1
+        assert accounts["second"].refreshes == 1
+
+    async def test_per_device_failure(self, hass, accounts, stand_in_server):
+        imeis = list(accounts["first"].data)[:2]
+        stand_in_server.failing_commands.add(imeis[0])
+        response = await async_bulk_command(
+            hass,
+            BULK_COMMAND_SCHEMA({"action": "led", "value": True, "imei": imeis}),
+        )
+        assert response["results"][imeis[0]]["success"] is False
+        assert response["results"][imeis[1]] == {
+            "success": True,
+            "result": {"result": "ok"},
+        }
+        assert accounts["first"].refreshes == 1
+        assert accounts["second"].refreshes == 0
+
+    async def test_set_sav_does_not_mutate_snapshot(self, hass, accounts):
+        imei = next(iter(accounts["first"].data))
+        saving = accounts["first"].data[imei].saving
+        await async_run_command(
+            accounts["first"],
+            imei,
+            BULK_COMMAND_SCHEMA(
+                {"action": "set_sav", "power_saving": True, "imei": imei},
+            ),
+        )
+        assert str(saving) == "0" * 26
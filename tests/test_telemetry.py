@@ -0,0 +1,113 @@
+from datetime import UTC, date, datetime, timedelta
+from importlib import import_module
+from types import SimpleNamespace
+
+import pytest
+
+const_module = import_module("custom_components.365gps.const")
+telemetry_module = import_module("custom_components.365gps.telemetry")
+LocationSource = const_module.LocationSource
+BATTERY_DRAIN_WINDOW = const_module.BATTERY_DRAIN_WINDOW
+DeviceTelemetry = telemetry_module.DeviceTelemetry
+SlidingWindow = telemetry_module.SlidingWindow
+haversine = telemetry_module.haversine
+
+START = datetime(2024, 5, 1, 12, tzinfo=UTC)
+
+
+def fix(seconds, latitude=55.75, longitude=37.61, speed=0, battery=80, gps=True):
+    return SimpleNamespace(
+        update_time=START + timedelta(seconds=seconds),
+        latitude=latitude,
+        longitude=longitude,
+        speed=speed,
+        battery_level=battery,
+        location_source=LocationSource.GPS if gps else LocationSource.LBS,
+    )
+
+
+class TestHaversine:
+    def test_zero(self):
+        assert haversine(55.75, 37.61, 55.75, 37.61) == 0
+
+    def test_one_degree_of_latitude(self):
+        assert haversine(0, 0, 1, 0) == pytest.approx(111.2, abs=0.1)
+
+
+class TestSlidingWindow:
+    def test_mean_and_max(self):
+        window = SlidingWindow(window=60, resolution=10)
+        for timestamp, value in ((0, 10), (5, 30), (20, 20)):
+            window.add(timestamp, value)
+        assert window.mean == 20
+        assert window.maximum == 30
+
+    def test_old_buckets_expire(self):
+        window = SlidingWindow(window=60, resolution=10)
+        window.add(0, 100)
+        window.add(30, 10)
+        window.add(75, 20)
+        assert window.mean == 15
+        assert window.maximum == 20
+
+    def test_memory_is_bounded(self):
+        window = SlidingWindow(window=3600, resolution=60)
+        for timestamp in range(0, 7200, 10):
+            window.add(timestamp, timestamp % 50)
+        assert len(window._buckets) <= 61
+        assert window.maximum == 40
+
+
+class TestDeviceTelemetry:
+    def test_odometer_and_daily_distance(self):
+        telemetry = DeviceTelemetry()
+        telemetry.update(fix(0, latitude=0), date(2024, 5, 1))
+        telemetry.update(fix(10, latitude=0.01), date(2024, 5, 1))
+        assert telemetry.odometer == pytest.approx(1.112, abs=0.001)
+        assert telemetry.daily_distance == telemetry.odometer
+
+        telemetry.update(fix(20, latitude=0.02), date(2024, 5, 2))
+        assert telemetry.odometer == pytest.approx(2.224, abs=0.001)
+        assert telemetry.daily_distance == pytest.approx(1.112, abs=0.001)
+
+    def test_jitter_and_lbs_are_not_counted(self):
+        telemetry = DeviceTelemetry()
+        telemetry.update(fix(0), date(2024, 5, 1))
+        telemetry.update(fix(10, latitude=55.7501), date(2024, 5, 1))
+        telemetry.update(fix(20, latitude=56, gps=False), date(2024, 5, 1))
+        assert telemetry.odometer == 0
+        assert telemetry.last_gps_fix == START + timedelta(seconds=10)
+
+    def test_same_fix_is_ignored(self):
+        telemetry = DeviceTelemetry()
+        assert telemetry.update(fix(0, speed=10), date(2024, 5, 1)) is True
+        assert telemetry.update(fix(0, speed=10), date(2024, 5, 1)) is False
+        assert telemetry.average_speed == 10
+
+    def test_speeds(self):
+        telemetry = DeviceTelemetry()
+        for seconds, speed in ((0, 10), (10, 50), (20, 30)):
+            telemetry.update(fix(seconds, speed=speed), date(2024, 5, 1))
+        assert telemetry.average_speed == 30
+        assert telemetry.max_speed == 50
+
+    def test_battery_drain(self):
+        telemetry = DeviceTelemetry()
+        telemetry.update(fix(0, battery=80), date(2024, 5, 1))
+        assert telemetry.battery_drain is None
+        telemetry.update(fix(3600, battery=78), date(2024, 5, 1))
+        assert telemetry.battery_drain == 2
+
+    def test_charging_restarts_drain(self):
+        telemetry = DeviceTelemetry()
+        telemetry.update(fix(0, battery=80), date(2024, 5, 1))
+        telemetry.update(fix(3600, battery=90), date(2024, 5, 1))
+        telemetry.update(fix(7200, battery=89), date(2024, 5, 1))
+        assert telemetry.battery_drain == 1
+
+    def test_battery_window_slides(self):
+        telemetry = DeviceTelemetry()
+        telemetry.update(fix(0, battery=90), date(2024, 5, 1))
+        telemetry.update(fix(3600, battery=80), date(2024, 5, 1))
+        telemetry.update(fix(3600 + BATTERY_DRAIN_WINDOW, battery=74), date(2024, 5, 1))
+        assert telemetry.battery_drain == 1
@@ -0,0 +1,159 @@
+import csv
+import gzip
+from datetime import UTC, datetime, timedelta
+from importlib import import_module
+
+import pytest
+
+tracks_module = import_module("custom_components.365gps.tracks")
+TRACK_FIELDS = tracks_module.TRACK_FIELDS
+TrackArchive = tracks_module.TrackArchive
+TrackSimplifier = tracks_module.TrackSimplifier
+deviation = tracks_module.deviation
+
+START = datetime(2024, 5, 1, 23, 59, 50, tzinfo=UTC)
+
+
+def rows(count, imei="1", start=START):
+    timestamp = int(start.timestamp())
+    return [
+        (timestamp + 10 * index, imei, 55.75, 37.61, 0, 150, 90, "gps", 80)
+        for index in range(count)
+    ]
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return TrackArchive(tmp_path / "archive")
+
+
+class TestTrackArchive:
+    def test_rows_are_split_by_day(self, archive):
+        assert archive.append(rows(3)) == 3
+        assert sorted(path.name for path in archive.directory.iterdir()) == [
+            "2024-05-01.csv.gz",
+            "2024-05-02.csv.gz",
+        ]
+
+    def test_appends_are_read_back_in_order(self, archive):
+        archive.append(rows(2))
+        archive.append(rows(2, start=START + timedelta(seconds=20)))
+        result = list(archive.iter_rows(START, START + timedelta(hours=1)))
+        assert [int(row[0]) for row in result] == [
+            int(START.timestamp()) + 10 * index for index in range(4)
+        ]
+
+    def test_range_and_imei_filter(self, archive):
+        archive.append(rows(5) + rows(5, imei="2"))
+        result = list(
+            archive.iter_rows(
+                START + timedelta(seconds=10),
+                START + timedelta(seconds=30),
+                {"2"},
+            ),
+        )
+        assert [(row[1], int(row[0]) - int(START.timestamp())) for row in result] == [
+            ("2", 10),
+            ("2", 20),
+        ]
+
+    def test_truncated_member_ends_the_file(self, archive):
+        archive.append(rows(1))
+        path = archive.directory / "2024-05-01.csv.gz"
+        data = path.read_bytes()
+        path.write_bytes(data + data[: len(data) // 2])
+        assert len(list(archive.iter_rows(START, START + timedelta(seconds=5)))) >= 1
+
+    @pytest.mark.parametrize("name", ["tracks.csv", "tracks.csv.gz"])
+    def test_export_and_import(self, archive, tmp_path, name):
+        archive.append(rows(20) + rows(20, imei="2"))
+        path = tmp_path / name
+        exported = archive.export(path, START, START + timedelta(days=1), {"1"})
+        assert exported == 20
+
+        opener = gzip.open if name.endswith(".gz") else open
+        with opener(path, "rt", newline="") as file:
+            header, *body = csv.reader(file)
+        assert tuple(header) == TRACK_FIELDS
+        assert len(body) == 20
+
+        restored = TrackArchive(tmp_path / "restored")
+        assert restored.import_file(path) == 20
+        assert list(restored.iter_rows(START, START + timedelta(days=1))) == body
+
+    def test_import_is_chunked(self, archive, tmp_path, monkeypatch):
+        archive.append(rows(25))
+        path = tmp_path / "tracks.csv"
+        archive.export(path, START, START + timedelta(days=1))
+
+        appends = []
+        restored = TrackArchive(tmp_path / "restored")
+        monkeypatch.setattr(tracks_module, "TRACK_IMPORT_CHUNK", 10)
+        original = restored.append
+        monkeypatch.setattr(
+            restored,
+            "append",
+            lambda chunk: appends.append(len(chunk)) or original(chunk),
+        )
+        assert restored.import_file(path) == 25
+        assert appends == [10, 10, 5]
+
+
+def fix(seconds, latitude, longitude):
+    return (int(START.timestamp()) + seconds, "1", latitude, longitude)
+
+
+class TestDeviation:
+    def test_on_segment(self):
+        assert deviation(fix(0, 0, 0), fix(20, 0, 0.002), fix(10, 0, 0.001)) < 0.01
+
+    def test_off_segment(self):
+        # 0.0001 degrees of latitude is about 11 m
+        result = deviation(fix(0, 0, 0), fix(20, 0, 0.002), fix(10, 0.0001, 0.001))
+        assert result == pytest.approx(11.1, abs=0.1)
+
+    def test_past_the_end(self):
+        result = deviation(fix(0, 0, 0), fix(10, 0, 0.001), fix(20, 0, 0.002))
+        assert result == pytest.approx(111.2, abs=0.1)
+
+
+class TestTrackSimplifier:
+    def simplify(self, simplifier, fixes):
+        kept = [row for row in fixes for row in simplifier.add(row)]
+        return kept + simplifier.flush()
+
+    def test_straight_line_keeps_the_ends(self):
+        fixes = [fix(10 * index, 0, 0.0005 * index) for index in range(30)]
+        kept = self.simplify(TrackSimplifier(), fixes)
+        assert kept == [fixes[0], fixes[-1]]
+
+    def test_turn_is_kept(self):
+        fixes = [fix(10 * index, 0, 0.0005 * index) for index in range(10)]
+        fixes += [
+            fix(100 + 10 * index, 0.0005 * index, 0.0045) for index in range(1, 10)
+        ]
+        kept = self.simplify(TrackSimplifier(), fixes)
+        assert kept == [fixes[0], fixes[9], fixes[-1]]
+
+    def test_dropped_fixes_are_within_tolerance(self):
+        fixes = [
+            fix(10 * index, 0.00003 * (index % 4), 0.0003 * index)
+            for index in range(60)
+        ]
+        simplifier = TrackSimplifier(tolerance=10)
+        kept = self.simplify(simplifier, fixes)
+        assert len(kept) < len(fixes)
+        for start, end in zip(kept, kept[1:]):
+            for row in fixes:
+                if start[0] < row[0] < end[0]:
+                    assert deviation(start, end, row) <= 10
+
+    def test_parked_tracker_keeps_one_fix_per_gap(self):
+        fixes = [fix(10 * index, 55.75, 37.61) for index in range(181)]
+        kept = self.simplify(TrackSimplifier(max_gap=600), fixes)
+        assert [row[0] - fixes[0][0] for row in kept] == [0, 590, 1180, 1770, 1800]
+
+    def test_window_is_bounded(self):
+        fixes = [fix(index, 55.75, 37.61) for index in range(50)]
+        kept = self.simplify(TrackSimplifier(max_buffer=10), fixes)
+        assert len(kept) == 6